@@ -0,0 +1,142 @@
+"""
+Batch generation: run many task.yaml specs through the pipeline with bounded concurrency.
+
+    python -m app.batch specs/*.yaml bundle.zip > results.ndjson
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import zipfile
+from collections import defaultdict
+
+from app.cache import make_cache_key
+from app.config import BATCH_MAX_BYTES, BATCH_MAX_CONCURRENCY, BATCH_MAX_SPECS, MODEL_NAME, UPLOAD_MAX_BYTES
+from app.governor import BATCH, request_priority
+from app.util import log_channel, logger
+
+SPEC_EXTENSIONS = (".yaml", ".yml")
+
+
+class BatchTooLarge(Exception):
+    """
+    Raised when a batch holds more specs than BATCH_MAX_SPECS or more bytes than BATCH_MAX_BYTES.
+    """
+
+
+def read_specs(filename, data):
+    """
+    Return the (name, text) specs of an uploaded file, expanding zip archives into their task.yaml files.
+    Callers read at most BATCH_MAX_BYTES + 1 bytes of a file, archives are unpacked under the same
+    budget with each spec capped at UPLOAD_MAX_BYTES, whatever sizes the zip headers claim.
+    """
+    if len(data) > BATCH_MAX_BYTES:
+        raise BatchTooLarge(f"{filename} is larger than {BATCH_MAX_BYTES} bytes")
+    if not zipfile.is_zipfile(io.BytesIO(data)):
+        return [(filename, data.decode("utf-8"))]
+    specs = []
+    unpacked = 0
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(SPEC_EXTENSIONS):
+                continue
+            if len(specs) >= BATCH_MAX_SPECS:
+                raise BatchTooLarge(f"{filename} holds more than {BATCH_MAX_SPECS} specs")
+            with archive.open(info) as entry:
+                spec = entry.read(UPLOAD_MAX_BYTES + 1)
+            unpacked += len(spec)
+            if len(spec) > UPLOAD_MAX_BYTES:
+                raise BatchTooLarge(f"{filename}/{info.filename} is larger than {UPLOAD_MAX_BYTES} bytes")
+            if unpacked > BATCH_MAX_BYTES:
+                raise BatchTooLarge(f"{filename} unpacks to more than {BATCH_MAX_BYTES} bytes")
+            specs.append((f"{filename}/{info.filename}", spec.decode("utf-8")))
+    return specs
+
+
+async def run_batch(specs, model=None, temperature=None, concurrency=BATCH_MAX_CONCURRENCY):
+    """
+    Generate a UI for every (name, content) spec and yield one result dict per spec as soon as it is known.
+    Identical specs are generated once, other specs only share the stage outputs the stage memo
+    already reuses for identical prompts.
+    """
+    # Deferred so `python -m app.batch --help` does not load TextGrad
+    from app.service import generate_ui
+
+    if len(specs) > BATCH_MAX_SPECS:
+        raise BatchTooLarge(f"A batch holds at most {BATCH_MAX_SPECS} specs, got {len(specs)}")
+    model_name = model or MODEL_NAME
+    temperature = 0 if temperature is None else temperature
+    # Batch work yields the Groq budget to interactive requests
+    request_priority.set(BATCH)
+
+    groups = defaultdict(list)
+    unique = {}
+    for name, content in specs:
+        key = make_cache_key(content, model_name=model_name, temperature=temperature)
+        groups[key].append(name)
+        unique.setdefault(key, content)
+    logger.info('[Batch] - %s specs, %s unique', len(specs), len(unique))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    results = asyncio.Queue()
+
+    async def run_one(key, content):
+        names = groups[key]
+        async with semaphore:
+            log_channel.set(f"batch:{key[:12]}")
+            try:
+                url = await generate_ui(content, model=model_name, temperature=temperature)
+                result = {"url": url}
+            except Exception as e:
+                logger.error('[Batch] - %s failed: %s', names[0], e)
+                result = {"error": str(e)}
+        for index, name in enumerate(names):
+            entry = {"name": name, **result}
+            if index:
+                entry["duplicate_of"] = names[0]
+            await results.put(entry)
+
+    tasks = [asyncio.create_task(run_one(key, content)) for key, content in unique.items()]
+    try:
+        for _ in range(len(specs)):
+            yield await results.get()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _main(args):
+    from app.clients import client_registry
+    from app.executor import optimization_executor
+    from app.storage import storage
+
+    specs = []
+    for path in args.paths:
+        with open(path, "rb") as f:
+            specs.extend(read_specs(os.path.basename(path), f.read(BATCH_MAX_BYTES + 1)))
+    client_registry.start()
+    try:
+        async for result in run_batch(specs, model=args.model, temperature=args.temperature,
+                                      concurrency=args.concurrency):
+            sys.stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+            sys.stdout.flush()
+    finally:
+        await client_registry.close()
+        await storage.close()
+        optimization_executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="task.yaml files or zip archives of them")
+    parser.add_argument("--model")
+    parser.add_argument("--temperature", type=float)
+    parser.add_argument("--concurrency", type=int, default=BATCH_MAX_CONCURRENCY)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
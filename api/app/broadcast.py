@@ -0,0 +1,102 @@
+import asyncio
+from collections import OrderedDict, deque
+
+ALL_CHANNEL = "all"
+
+
+class Subscription:
+    """
+    A single /logs client: a bounded ring buffer that drops its oldest entry when full,
+    so a slow client never makes memory grow.
+    """
+
+    def __init__(self, channel, buffer_size):
+        self.channel = channel
+        self.buffer = deque(maxlen=buffer_size)
+        self.dropped = 0
+        self._ready = asyncio.Event()
+
+    def push(self, entry):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(entry)
+        self._ready.set()
+
+    async def get(self, timeout=None):
+        """
+        Return the oldest buffered entry, waiting up to `timeout` seconds (raises asyncio.TimeoutError).
+        """
+        while not self.buffer:
+            self._ready.clear()
+            await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+        return self.buffer.popleft()
+
+
+class LogBroadcaster:
+    """
+    Fans every log entry out to all subscribers of its channel and of the "all" channel.
+    The last `replay_size` entries of each channel are kept for clients that connect later,
+    for at most `max_channels` channels, so memory stays flat with or without subscribers.
+    """
+
+    def __init__(self, buffer_size=1000, replay_size=100, max_channels=256):
+        self.buffer_size = buffer_size
+        self.replay_size = replay_size
+        self.max_channels = max_channels
+        self._history = OrderedDict()
+        self._subscribers = {}
+        self._loop = None
+
+    def _remember(self, channel, entry):
+        history = self._history.get(channel)
+        if history is None:
+            history = self._history[channel] = deque(maxlen=self.replay_size)
+        self._history.move_to_end(channel)
+        history.append(entry)
+        # The "all" channel is always the most recently used, so it is never evicted
+        while len(self._history) > self.max_channels:
+            self._history.popitem(last=False)
+
+    def publish(self, entry, channel=None):
+        channels = (ALL_CHANNEL,) if channel in (None, ALL_CHANNEL) else (channel, ALL_CHANNEL)
+        for name in channels:
+            self._remember(name, entry)
+            for subscription in self._subscribers.get(name, ()):
+                subscription.push(entry)
+
+    def publish_threadsafe(self, entry, channel=None):
+        """
+        Publish from any thread: entries from outside the subscribers' event loop are handed over to it.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            self.publish(entry, channel)
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self.publish(entry, channel)
+        else:
+            loop.call_soon_threadsafe(self.publish, entry, channel)
+
+    def subscribe(self, channel=ALL_CHANNEL, replay=0):
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(channel, self.buffer_size)
+        if replay > 0:
+            for entry in list(self._history.get(channel, ()))[-replay:]:
+                subscription.push(entry)
+        self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscribers = self._subscribers.get(subscription.channel)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.channel]
+
+    def has_subscribers(self, channel=None):
+        return bool(self._subscribers.get(ALL_CHANNEL)) or bool(channel and self._subscribers.get(channel))
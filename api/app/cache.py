@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from os.path import dirname, join
+
+import asyncio
+
+import aiofiles
+
+from app.config import CACHE_DIR, CACHE_MAX_ENTRIES, CACHE_TTL, MODEL_NAME, SHARED_BACKEND
+from app.prompt_registry import prompt_registry
+from app.shared import shared_backend
+from app.util import logger
+
+
+def normalize_content(content):
+    """
+    Normalize the chat content so whitespace-only differences map to the same key.
+    """
+    if not content:
+        return ""
+    lines = content.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def make_cache_key(content, file_bytes=None, model_name=MODEL_NAME, temperature=0, fingerprint=None):
+    """
+    Build the content-addressed key of a /chat request.
+    """
+    digest = hashlib.sha256()
+    for part in (
+        normalize_content(content).encode("utf-8"),
+        file_bytes or b"",
+        (model_name or "").encode("utf-8"),
+        str(temperature).encode("utf-8"),
+        (fingerprint or prompt_registry.fingerprint).encode("utf-8"),
+    ):
+        # Length-prefix every part so concatenations cannot collide
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache mapping a request key to the final HTML and its public URL.
+    The memory tier is a bounded LRU, the disk tier keeps one JSON file per key, or one
+    expiring key in `backend` when given. Entries older than `ttl` seconds are treated as
+    missing in both tiers.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, backend=None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self._memory = OrderedDict()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return join(self.directory, key[:2], f"{key}.json")
+
+    def _expired(self, entry):
+        return self.ttl > 0 and time.time() - entry["created_at"] > self.ttl
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, key):
+        entry = self._memory.get(key)
+        if entry is not None:
+            if not self._expired(entry):
+                self._memory.move_to_end(key)
+                logger.info('[ResultCache] - Memory hit: %s', key)
+                return entry
+            del self._memory[key]
+
+        if self.backend is not None:
+            raw = await asyncio.to_thread(self.backend.get, f"result:{key}")
+            if raw is None:
+                return None
+            entry = json.loads(raw)
+            self._remember(key, entry)
+            logger.info('[ResultCache] - Shared hit: %s', key)
+            return entry
+
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            async with aiofiles.open(path, "r", encoding="utf-8") as f:
+                entry = json.loads(await f.read())
+        except (OSError, ValueError) as e:
+            logger.warning('[ResultCache] - Unreadable entry %s: %s', key, e)
+            return None
+        if self._expired(entry):
+            os.remove(path)
+            return None
+        self._remember(key, entry)
+        logger.info('[ResultCache] - Disk hit: %s', key)
+        return entry
+
+    async def set(self, key, html, url):
+        entry = {"html": html, "url": url, "created_at": time.time()}
+        self._remember(key, entry)
+        if self.backend is not None:
+            await asyncio.to_thread(self.backend.set, f"result:{key}", json.dumps(entry, ensure_ascii=False),
+                                    self.ttl or None)
+            return entry
+        path = self._path(key)
+        os.makedirs(dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        async with aiofiles.open(tmp_path, "w", encoding="utf-8") as f:
+            await f.write(json.dumps(entry, ensure_ascii=False))
+        os.replace(tmp_path, path)
+        return entry
+
+
+# The disk tier is already shared by the workers of one host, Redis also shares it across hosts
+result_cache = ResultCache(backend=shared_backend if SHARED_BACKEND == "redis" else None)
@@ -0,0 +1,67 @@
+import httpx
+import textgrad as tg
+from groq import AsyncGroq
+
+from app.config import (
+    BACKWARD_ENGINE,
+    GROQ_API_KEY,
+    GROQ_MAX_CONNECTIONS,
+    GROQ_MAX_KEEPALIVE_CONNECTIONS,
+    GROQ_TIMEOUT,
+    MODEL_NAME,
+)
+from app.pipeline import LLMPipeline
+from app.util import logger
+
+
+class ClientRegistry:
+    """
+    Application-scoped holder of the AsyncGroq client and the TextGrad backward engine.
+    Both are created once in the FastAPI lifespan and shared by every request,
+    so requests reuse the same HTTP connection pool instead of opening their own.
+    """
+
+    def __init__(self):
+        self.http_client = None
+        self.client = None
+        self.backward_engine = None
+
+    def start(self):
+        if self.client is not None:
+            return
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=GROQ_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            timeout=GROQ_TIMEOUT,
+        )
+        # Retries are handled by the governor, which sees every stage and honours retry-after
+        self.client = AsyncGroq(api_key=GROQ_API_KEY, http_client=self.http_client, max_retries=0)
+        tg.set_backward_engine(BACKWARD_ENGINE, override=True)
+        self.backward_engine = BACKWARD_ENGINE
+        logger.info(
+            '[ClientRegistry] - Started with max_connections=%s, max_keepalive_connections=%s',
+            GROQ_MAX_CONNECTIONS, GROQ_MAX_KEEPALIVE_CONNECTIONS,
+        )
+
+    async def close(self):
+        if self.http_client is not None:
+            await self.http_client.aclose()
+        self.http_client = None
+        self.client = None
+
+    def pipeline(self, model=None, temperature=None):
+        """
+        Build a lightweight per-request pipeline on top of the shared client.
+        """
+        if self.client is None:
+            self.start()
+        return LLMPipeline(
+            client=self.client,
+            model=model or MODEL_NAME,
+            temperature=0 if temperature is None else temperature,
+        )
+
+
+client_registry = ClientRegistry()
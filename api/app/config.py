@@ -10,4 +10,119 @@ GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 
-MODEL_NAME= os.environ.get("GROQ_MODEL_NAME")
\ No newline at end of file
+MODEL_NAME= os.environ.get("GROQ_MODEL_NAME")
+BACKWARD_ENGINE = os.environ.get("BACKWARD_ENGINE", "groq-llama-3.3-70b-versatile")
+
+# Connection pool of the shared AsyncGroq client
+GROQ_MAX_CONNECTIONS = int(os.environ.get("GROQ_MAX_CONNECTIONS", 100))
+GROQ_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("GROQ_MAX_KEEPALIVE_CONNECTIONS", 20))
+GROQ_TIMEOUT = float(os.environ.get("GROQ_TIMEOUT", 120))
+
+# Result cache of the whole /chat pipeline
+CACHE_DIR = os.environ.get("CACHE_DIR", "./cache")
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 256))
+CACHE_TTL = int(os.environ.get("CACHE_TTL", 7 * 24 * 3600))
+
+# Per-stage memoization of agent outputs ("memory", "sqlite" or "shared", the SHARED_BACKEND)
+STAGE_CACHE_BACKEND = os.environ.get("STAGE_CACHE_BACKEND", "memory")
+STAGE_CACHE_PATH = os.environ.get("STAGE_CACHE_PATH", "./cache/stages.sqlite3")
+STAGE_CACHE_MAX_ENTRIES = int(os.environ.get("STAGE_CACHE_MAX_ENTRIES", 1024))
+
+# Thread pool running the blocking TextGrad optimization steps
+OPTIMIZER_MAX_WORKERS = int(os.environ.get("OPTIMIZER_MAX_WORKERS", 4))
+OPTIMIZER_MAX_CONCURRENCY = int(os.environ.get("OPTIMIZER_MAX_CONCURRENCY", OPTIMIZER_MAX_WORKERS))
+
+# Background /chat jobs
+JOB_MAX_WORKERS = int(os.environ.get("JOB_MAX_WORKERS", 4))
+JOB_MAX_IN_FLIGHT = int(os.environ.get("JOB_MAX_IN_FLIGHT", 32))
+JOB_OVERFLOW = os.environ.get("JOB_OVERFLOW", "reject")  # "reject" or "wait"
+JOB_RETENTION = int(os.environ.get("JOB_RETENTION", 3600))
+
+# Storage of the generated HTML ("supabase" or "local")
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "supabase")
+STORAGE_BUCKET = os.environ.get("STORAGE_BUCKET", "visualization-challenge")
+STORAGE_LOCAL_DIR = os.environ.get("STORAGE_LOCAL_DIR", "./template")
+STORAGE_PUBLIC_BASE_URL = os.environ.get("STORAGE_PUBLIC_BASE_URL", "http://localhost:8000/api/files")
+STORAGE_MAX_RETRIES = int(os.environ.get("STORAGE_MAX_RETRIES", 3))
+STORAGE_RETRY_BACKOFF = float(os.environ.get("STORAGE_RETRY_BACKOFF", 0.5))
+
+# /logs fan-out: per-subscriber ring buffer, replay history per channel
+LOG_SUBSCRIBER_BUFFER = int(os.environ.get("LOG_SUBSCRIBER_BUFFER", 1000))
+LOG_REPLAY_SIZE = int(os.environ.get("LOG_REPLAY_SIZE", 100))
+LOG_MAX_CHANNELS = int(os.environ.get("LOG_MAX_CHANNELS", 256))
+# Log arguments longer than this are truncated, the full text goes to LOG_ARTIFACT_DIR when set
+LOG_MAX_PAYLOAD_CHARS = int(os.environ.get("LOG_MAX_PAYLOAD_CHARS", 2000))
+LOG_ARTIFACT_DIR = os.environ.get("LOG_ARTIFACT_DIR")
+
+# Governor shared by all Groq calls, a per-minute limit of 0 disables that bucket
+GROQ_REQUESTS_PER_MINUTE = int(os.environ.get("GROQ_REQUESTS_PER_MINUTE", 0))
+GROQ_TOKENS_PER_MINUTE = int(os.environ.get("GROQ_TOKENS_PER_MINUTE", 0))
+GOVERNOR_MAX_CONCURRENCY = int(os.environ.get("GOVERNOR_MAX_CONCURRENCY", 16))
+GOVERNOR_MAX_RETRIES = int(os.environ.get("GOVERNOR_MAX_RETRIES", 4))
+GOVERNOR_BACKOFF_BASE = float(os.environ.get("GOVERNOR_BACKOFF_BASE", 0.5))
+GOVERNOR_BACKOFF_MAX = float(os.environ.get("GOVERNOR_BACKOFF_MAX", 30))
+GOVERNOR_BREAKER_THRESHOLD = int(os.environ.get("GOVERNOR_BREAKER_THRESHOLD", 8))
+GOVERNOR_BREAKER_RESET_TIMEOUT = float(os.environ.get("GOVERNOR_BREAKER_RESET_TIMEOUT", 30))
+# Completion tokens assumed per call until Groq reports the real usage
+GOVERNOR_COMPLETION_TOKENS = int(os.environ.get("GOVERNOR_COMPLETION_TOKENS", 1500))
+# Builder generations when the output does not validate
+BUILDER_MAX_ATTEMPTS = int(os.environ.get("BUILDER_MAX_ATTEMPTS", 2))
+# Best-of-N: builder candidates generated concurrently and scored locally, 1 disables it
+BUILDER_CANDIDATES = int(os.environ.get("BUILDER_CANDIDATES", 1))
+BUILDER_CANDIDATE_TEMPERATURE = float(os.environ.get("BUILDER_CANDIDATE_TEMPERATURE", 0.7))
+# TextGrad critic: skipped when the builder output passes the local checks, otherwise up to CRITIC_MAX_STEPS
+# steps until it does, within a per-request time (seconds) and estimated token budget, 0 disables a limit
+CRITIC_SKIP_PASSING = os.environ.get("CRITIC_SKIP_PASSING", "true").lower() in ("1", "true", "yes")
+CRITIC_MAX_STEPS = int(os.environ.get("CRITIC_MAX_STEPS", 2))
+CRITIC_TIME_BUDGET = float(os.environ.get("CRITIC_TIME_BUDGET", 60))
+CRITIC_TOKEN_BUDGET = int(os.environ.get("CRITIC_TOKEN_BUDGET", 30000))
+
+# Batch generation
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", 4))
+BATCH_MAX_SPECS = int(os.environ.get("BATCH_MAX_SPECS", 200))
+# Size cap of an uploaded batch file and of everything unpacked from a zip archive
+BATCH_MAX_BYTES = int(os.environ.get("BATCH_MAX_BYTES", 16 * 1024 * 1024))
+
+# Prompt registry drop-in directory, checked for changes every PROMPT_RELOAD_INTERVAL seconds (0 disables)
+PROMPT_DIR = os.environ.get("PROMPT_DIR", "./prompts")
+PROMPT_RELOAD_INTERVAL = float(os.environ.get("PROMPT_RELOAD_INTERVAL", 5))
+
+# Uploads are read in chunks, only the first UPLOAD_MAX_BYTES are kept and summarized
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", 64 * 1024))
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", 1024 * 1024))
+UPLOAD_SAMPLE_ITEMS = int(os.environ.get("UPLOAD_SAMPLE_ITEMS", 5))
+UPLOAD_MAX_STRING = int(os.environ.get("UPLOAD_MAX_STRING", 500))
+UPLOAD_MAX_CHARS = int(os.environ.get("UPLOAD_MAX_CHARS", 6000))
+
+# Render vetted templates for known problem types instead of running the planner, builder and critic
+TEMPLATE_FAST_PATH = os.environ.get("TEMPLATE_FAST_PATH", "true").lower() in ("1", "true", "yes")
+
+# Map well-formed task.yaml specs to the analysis locally instead of calling the Task Analyzer
+LOCAL_SPEC_MAPPING = os.environ.get("LOCAL_SPEC_MAPPING", "true").lower() in ("1", "true", "yes")
+
+# Plan from the raw task.yaml while the Task Analyzer runs, the plan is wasted when the analysis differs
+SPECULATIVE_PLANNER = os.environ.get("SPECULATIVE_PLANNER", "false").lower() in ("1", "true", "yes")
+
+# State shared by the workers of a multi-worker deployment: "memory" (single process), "sqlite" (one host) or "redis"
+SHARED_BACKEND = os.environ.get("SHARED_BACKEND", "memory")
+SHARED_SQLITE_PATH = os.environ.get("SHARED_SQLITE_PATH", "./cache/shared.sqlite3")
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+# Entries kept in the shared log stream and how often each worker reads it
+LOG_STREAM_MAXLEN = int(os.environ.get("LOG_STREAM_MAXLEN", 10000))
+LOG_POLL_INTERVAL = float(os.environ.get("LOG_POLL_INTERVAL", 0.25))
+# How often jobs owned by another worker are polled for events and cancellations
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 0.5))
+
+# Near-duplicate specs (same API and formats, similar descriptions) reuse an earlier page with the texts swapped
+SPEC_INDEX_REUSE = os.environ.get("SPEC_INDEX_REUSE", "true").lower() in ("1", "true", "yes")
+SPEC_INDEX_PATH = os.environ.get("SPEC_INDEX_PATH", "./cache/spec_index.sqlite3")
+SPEC_INDEX_THRESHOLD = float(os.environ.get("SPEC_INDEX_THRESHOLD", 0.8))
+SPEC_INDEX_PERMUTATIONS = int(os.environ.get("SPEC_INDEX_PERMUTATIONS", 64))
+SPEC_INDEX_BANDS = int(os.environ.get("SPEC_INDEX_BANDS", 16))
+SPEC_INDEX_SHINGLE_SIZE = int(os.environ.get("SPEC_INDEX_SHINGLE_SIZE", 3))
+SPEC_INDEX_MAX_PER_SIGNATURE = int(os.environ.get("SPEC_INDEX_MAX_PER_SIGNATURE", 50))
+
+# Edited specs of the same lineage patch their previous page, only changes the local swaps cannot make cost a call
+INCREMENTAL_REGENERATION = os.environ.get("INCREMENTAL_REGENERATION", "true").lower() in ("1", "true", "yes")
+LINEAGE_PATH = os.environ.get("LINEAGE_PATH", "./cache/lineages.sqlite3")
+LINEAGE_MAX_PATCH_CHANGES = int(os.environ.get("LINEAGE_MAX_PATCH_CHANGES", 5))
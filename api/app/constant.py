@@ -8,6 +8,9 @@ class AgentTask(Enum):
     UI_PLANNER = "ui_planner"
     UI_BUILDER = "ui_builder"
     UI_CRITIC = "ui_critic"
+    JSON_REPAIR = "json_repair"
+    SPEC_FILL = "spec_fill"
+    UI_PATCH = "ui_patch"
     
 class ProblemTask(Enum):
     """
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import textgrad as tg
+
+from app.config import CRITIC_TIME_BUDGET, CRITIC_TOKEN_BUDGET, GOVERNOR_COMPLETION_TOKENS
+
+_sessions = threading.local()
+
+
+class CriticSession:
+    """
+    The TGD optimizer and TextLoss of one optimization thread, reused by every critic step the
+    thread runs. Only the evaluation instruction and the optimized variable change between steps.
+    """
+
+    def __init__(self):
+        self.loss_fn = tg.TextLoss("")
+        self.optimizer = tg.TGD(parameters=[])
+
+    def step(self, variable, evaluation_instruction):
+        """
+        One blocking TextGrad step on `variable`: loss, backward pass and update. Returns the loss.
+        """
+        self.loss_fn.eval_system_prompt.set_value(evaluation_instruction)
+        self.optimizer.parameters = [variable]
+        try:
+            loss = self.loss_fn(variable)
+            loss.backward()
+            self.optimizer.step()
+            return loss
+        finally:
+            self.optimizer.zero_grad()
+            self.optimizer.parameters = []
+
+
+def critic_session():
+    # TextGrad objects are not thread-safe, each executor thread keeps its own
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = _sessions.session = CriticSession()
+    return session
+
+
+def estimate_step_tokens(evaluation_instruction, value):
+    """
+    Rough token cost of a step: the loss, gradient and update calls each read the value
+    (about four characters per token) and write up to GOVERNOR_COMPLETION_TOKENS.
+    """
+    return (len(evaluation_instruction) + 3 * len(value)) // 4 + 3 * GOVERNOR_COMPLETION_TOKENS
+
+
+class CriticBudget:
+    """
+    Latency and token budget of the critic loop of one request, 0 disables a limit.
+    """
+
+    def __init__(self, seconds=CRITIC_TIME_BUDGET, tokens=CRITIC_TOKEN_BUDGET):
+        self.seconds = seconds
+        self.tokens = tokens
+        self.started = time.perf_counter()
+        self.spent_tokens = 0
+
+    def remaining_seconds(self):
+        if not self.seconds:
+            return None
+        return max(0.0, self.seconds - (time.perf_counter() - self.started))
+
+    def allows(self, tokens):
+        """
+        Whether a step estimated at `tokens` fits in what is left of the budget.
+        """
+        if self.seconds and self.remaining_seconds() <= 0:
+            return False
+        return not self.tokens or self.spent_tokens + tokens <= self.tokens
+
+    def spend(self, tokens):
+        self.spent_tokens += tokens
@@ -0,0 +1,90 @@
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import OPTIMIZER_MAX_CONCURRENCY, OPTIMIZER_MAX_WORKERS
+from app.metrics import Gauge, registry
+
+
+class OptimizationExecutor:
+    """
+    Runs blocking TextGrad optimization steps on a bounded thread pool, so the
+    event loop keeps serving other requests and the /logs stream meanwhile.
+    A thread pool is used because TextGrad variables and engines are not picklable.
+    """
+
+    def __init__(self, max_workers=OPTIMIZER_MAX_WORKERS, max_concurrency=OPTIMIZER_MAX_CONCURRENCY):
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="textgrad")
+        self._semaphore = None
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _get_semaphore(self):
+        # Created lazily so it binds to the loop serving requests
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        enqueued_at = time.perf_counter()
+        self.queued += 1
+        try:
+            await self._get_semaphore().acquire()
+        finally:
+            self.queued -= 1
+        wait = time.perf_counter() - enqueued_at
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.running += 1
+        # Copy the context so log records from the step keep the request's log channel
+        context = contextvars.copy_context()
+        try:
+            future = self._pool.submit(functools.partial(context.run, fn, *args, **kwargs))
+        except BaseException:
+            self._release()
+            raise
+        # The slot is held until the thread is done, a caller that stops waiting (a timeout) does not free it
+        future.add_done_callback(lambda _: self._release_from_thread(loop))
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def _release_from_thread(self, loop):
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # The loop is closed, nobody is left to wait for the slot
+            pass
+
+    def _release(self):
+        self.running -= 1
+        self.completed += 1
+        self._semaphore.release()
+
+    def stats(self):
+        return {
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "avg_wait_seconds": self.total_wait / self.completed if self.completed else 0.0,
+            "max_wait_seconds": self.max_wait,
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+optimization_executor = OptimizationExecutor()
+
+registry.register(Gauge(
+    "optimizer_queue_depth", "TextGrad steps waiting for a free slot.", lambda: optimization_executor.queued))
+registry.register(Gauge(
+    "optimizer_running", "TextGrad steps currently running.", lambda: optimization_executor.running))
@@ -0,0 +1,272 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from contextvars import ContextVar
+
+import groq
+
+from app.config import (
+    GOVERNOR_BACKOFF_BASE,
+    GOVERNOR_BACKOFF_MAX,
+    GOVERNOR_BREAKER_RESET_TIMEOUT,
+    GOVERNOR_BREAKER_THRESHOLD,
+    GOVERNOR_COMPLETION_TOKENS,
+    GOVERNOR_MAX_CONCURRENCY,
+    GOVERNOR_MAX_RETRIES,
+    GROQ_REQUESTS_PER_MINUTE,
+    GROQ_TOKENS_PER_MINUTE,
+)
+from app.metrics import Gauge, registry, stage_retries
+from app.util import logger
+
+INTERACTIVE = 0
+BATCH = 1
+
+# Priority of the Groq calls made by the current task, batch work yields to interactive requests
+request_priority = ContextVar("request_priority", default=INTERACTIVE)
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised without calling Groq while the circuit breaker is open.
+    """
+
+
+class TokenBucket:
+    """
+    Refills `rate_per_minute` units per minute up to one minute's worth. A rate of 0 disables the limit.
+    """
+
+    def __init__(self, rate_per_minute):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(rate_per_minute)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount=1.0):
+        if self.rate <= 0:
+            return
+        # A single request larger than the bucket may go through once the bucket is full
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, delta):
+        """
+        Correct an earlier estimate once the real usage is known (positive delta consumes more).
+        """
+        if self.rate <= 0:
+            return
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+    def drain(self, seconds):
+        """
+        Empty the bucket for `seconds`, used when Groq tells us to back off.
+        """
+        if self.rate <= 0:
+            return
+        self.tokens = -seconds * self.rate
+        self.updated_at = time.monotonic()
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and lets a single probe through after `reset_timeout` seconds.
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError while open. Returns True when this call is the half-open probe,
+        the caller then has to end it with end_probe() however the call finishes.
+        """
+        state = self.state
+        if state == "open" or (state == "half_open" and self._probing):
+            raise CircuitOpenError("Groq circuit breaker is open, failing fast")
+        if state == "half_open":
+            self._probing = True
+            return True
+        return False
+
+    def end_probe(self):
+        self._probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+            logger.warning('[Governor] - Circuit opened after %s consecutive failures', self.failures)
+
+
+class PriorityGate:
+    """
+    Concurrency limit that hands free slots to the highest priority waiter first.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self._waiters = []
+        self._counter = itertools.count()
+
+    async def acquire(self, priority):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before cancellation, pass it on
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def waiting(self):
+        return len(self._waiters)
+
+
+def _retry_after(error):
+    """
+    Seconds Groq asked us to wait, from the retry-after header of a rate limited response.
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _is_transient(error):
+    if isinstance(error, (groq.RateLimitError, groq.APIConnectionError, groq.APITimeoutError)):
+        return True
+    return isinstance(error, groq.APIStatusError) and error.status_code >= 500
+
+
+def estimate_tokens(messages):
+    # Roughly four characters per token
+    return sum(len(message.get("content") or "") for message in messages) // 4 + GOVERNOR_COMPLETION_TOKENS
+
+
+class GroqGovernor:
+    """
+    Shared gate for every Groq chat completion: request and token buckets, a priority-aware
+    concurrency limit, retries with jittered exponential backoff that honour retry-after,
+    and a circuit breaker that fails fast while Groq keeps erroring.
+    """
+
+    def __init__(self, requests_per_minute=GROQ_REQUESTS_PER_MINUTE, tokens_per_minute=GROQ_TOKENS_PER_MINUTE,
+                 max_concurrency=GOVERNOR_MAX_CONCURRENCY, max_retries=GOVERNOR_MAX_RETRIES,
+                 backoff_base=GOVERNOR_BACKOFF_BASE, backoff_max=GOVERNOR_BACKOFF_MAX,
+                 breaker_threshold=GOVERNOR_BREAKER_THRESHOLD, breaker_reset_timeout=GOVERNOR_BREAKER_RESET_TIMEOUT):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.gate = PriorityGate(max_concurrency)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def _backoff(self, attempt, retry_after=None):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        # Full jitter spreads out workers that were throttled at the same moment
+        delay = random.uniform(0, delay)
+        if retry_after is not None:
+            delay = max(delay, retry_after) + random.uniform(0, self.backoff_base)
+        return delay
+
+    async def call(self, create, messages, stage=None, priority=None):
+        """
+        Run `create()` (a Groq chat completion coroutine factory) under the governor.
+        """
+        priority = request_priority.get() if priority is None else priority
+        estimated_tokens = estimate_tokens(messages)
+        for attempt in range(self.max_retries + 1):
+            probe = self.breaker.before_call()
+            try:
+                await self.gate.acquire(priority)
+                try:
+                    await self.requests.acquire()
+                    await self.tokens.acquire(estimated_tokens)
+                    result = await create()
+                except Exception as e:
+                    if not _is_transient(e):
+                        if isinstance(e, groq.APIStatusError):
+                            # Groq answered, a bad request says nothing about its health
+                            self.breaker.record_success()
+                        raise
+                    self.breaker.record_failure()
+                    if attempt == self.max_retries:
+                        raise
+                    retry_after = _retry_after(e)
+                    if retry_after is not None:
+                        self.requests.drain(retry_after)
+                        self.tokens.drain(retry_after)
+                    delay = self._backoff(attempt, retry_after)
+                    stage_retries.inc(stage=stage or "groq")
+                    logger.warning('[Governor] - %s on %s, retrying in %.2fs', type(e).__name__, stage, delay)
+                else:
+                    self.breaker.record_success()
+                    usage = getattr(result, "usage", None)
+                    if usage is not None and getattr(usage, "total_tokens", None):
+                        self.tokens.adjust(usage.total_tokens - estimated_tokens)
+                    return result
+                finally:
+                    self.gate.release()
+            finally:
+                # A probe that was cancelled or failed otherwise must not keep the breaker half open
+                if probe:
+                    self.breaker.end_probe()
+            await asyncio.sleep(delay)
+
+
+governor = GroqGovernor()
+
+registry.register(Gauge(
+    "groq_governor_waiting", "Groq calls waiting for a concurrency slot.", governor.gate.waiting))
+registry.register(Gauge(
+    "groq_circuit_open", "1 while the Groq circuit breaker is open.", lambda: int(governor.breaker.state == "open")))
@@ -0,0 +1,69 @@
+import json
+
+
+class IncrementalJSONObject:
+    """
+    Incrementally scans a streamed JSON object and reports each top-level field
+    as soon as its value is complete, so later stages can start before the
+    whole completion has arrived.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields = {}
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+
+    def feed(self, chunk):
+        """
+        Consume a chunk of the stream and return the newly completed fields as a dict.
+        """
+        self.buffer += chunk
+        completed = {}
+        while self._pos < len(self.buffer):
+            char = self.buffer[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key is None and self._value_start is None:
+                        self._key = json.loads(self.buffer[self._key_start:self._pos + 1])
+            elif char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._key is None and self._value_start is None:
+                    self._key_start = self._pos
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 1:
+                    self._complete(completed, self._pos)
+                self._depth -= 1
+            elif self._depth == 1:
+                if char == ":" and self._key is not None:
+                    self._value_start = self._pos + 1
+                elif char == ",":
+                    self._complete(completed, self._pos)
+            self._pos += 1
+        return completed
+
+    def _complete(self, completed, end):
+        if self._key is None or self._value_start is None:
+            return
+        raw = self.buffer[self._value_start:end].strip()
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = None
+        else:
+            self.fields[self._key] = value
+            completed[self._key] = value
+        self._key = None
+        self._value_start = None
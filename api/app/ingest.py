@@ -0,0 +1,176 @@
+import csv
+import hashlib
+import io
+import json
+from os.path import splitext
+
+import yaml
+
+from app.config import UPLOAD_CHUNK_SIZE, UPLOAD_MAX_BYTES, UPLOAD_MAX_CHARS, UPLOAD_MAX_STRING, UPLOAD_SAMPLE_ITEMS
+from app.util import logger
+
+# Top-level task.yaml sections the Task Analyzer reads, everything else is dropped
+ANALYZER_FIELDS = ("task_type", "input_output", "model_info", "visualization", "dataset")
+
+FORMAT_EXTENSIONS = {
+    ".yaml": "yaml",
+    ".yml": "yaml",
+    ".json": "json",
+    ".csv": "csv",
+    ".tsv": "csv",
+}
+
+
+class Upload:
+    """
+    What is kept of an uploaded file: a digest of the full upload, the first UPLOAD_MAX_BYTES and a few counters.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename or ""
+        self.size = 0
+        self.lines = 0
+        self.head = bytearray()
+        self.truncated = False
+        self._digest = hashlib.sha256()
+
+    def feed(self, chunk):
+        self.size += len(chunk)
+        self.lines += chunk.count(b"\n")
+        self._digest.update(chunk)
+        room = UPLOAD_MAX_BYTES - len(self.head)
+        if room > 0:
+            self.head.extend(chunk[:room])
+        if len(chunk) > room:
+            self.truncated = True
+
+    @property
+    def digest(self):
+        return self._digest.digest()
+
+    def text(self):
+        # A truncated head may end in the middle of a character
+        return self.head.decode("utf-8", errors="replace" if not self.truncated else "ignore")
+
+
+async def read_chunks(file, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Stream an UploadFile into an Upload without ever holding more than UPLOAD_MAX_BYTES of it.
+    """
+    upload = Upload(getattr(file, "filename", None))
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        upload.feed(chunk)
+    return upload
+
+
+def detect_format(filename, text):
+    extension = splitext(filename or "")[1].lower()
+    if extension in FORMAT_EXTENSIONS:
+        return FORMAT_EXTENSIONS[extension]
+    stripped = text.lstrip()
+    if stripped.startswith(("{", "[")):
+        return "json"
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+        first_lines = text.splitlines()[:5]
+        if len(first_lines) > 1 and all(line.count(dialect.delimiter) == first_lines[0].count(dialect.delimiter)
+                                        for line in first_lines if line):
+            return "csv"
+    except csv.Error:
+        pass
+    try:
+        if isinstance(yaml.safe_load(text), (dict, list)):
+            return "yaml"
+    except yaml.YAMLError:
+        pass
+    return "text"
+
+
+def summarize_value(value, depth=0):
+    """
+    Sample bulky parts of a parsed document: long lists and mappings keep their first
+    UPLOAD_SAMPLE_ITEMS entries plus a count, long strings are cut. Only used for documents
+    over the UPLOAD_MAX_CHARS budget and for CSV rows.
+    """
+    if isinstance(value, str):
+        if len(value) > UPLOAD_MAX_STRING:
+            return f"{value[:UPLOAD_MAX_STRING]}... ({len(value)} characters)"
+        return value
+    if depth > 6:
+        return "..."
+    if isinstance(value, list):
+        items = [summarize_value(item, depth + 1) for item in value[:UPLOAD_SAMPLE_ITEMS]]
+        if len(value) > UPLOAD_SAMPLE_ITEMS:
+            items.append(f"... {len(value) - UPLOAD_SAMPLE_ITEMS} more items")
+        return items
+    if isinstance(value, dict):
+        # Label mappings are often thousands of entries, structured specs rarely have more than a few dozen keys
+        limit = UPLOAD_SAMPLE_ITEMS if len(value) > 4 * UPLOAD_SAMPLE_ITEMS else len(value)
+        summary = {str(key): summarize_value(item, depth + 1) for key, item in list(value.items())[:limit]}
+        if len(value) > limit:
+            summary["..."] = f"{len(value) - limit} more entries"
+        return summary
+    return value
+
+
+def _dump_yaml(data):
+    return yaml.safe_dump(data, allow_unicode=True, sort_keys=False)
+
+
+def _dump_json(data):
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _summarize_document(data, dump):
+    if isinstance(data, dict) and any(field in data for field in ANALYZER_FIELDS):
+        data = {field: data[field] for field in ANALYZER_FIELDS if field in data}
+    # A spec within the size budget is kept whole, its label lists and guidance steps are content
+    if len(dump(data)) <= UPLOAD_MAX_CHARS:
+        return data
+    return summarize_value(data)
+
+
+def _summarize_csv(upload, text):
+    rows = list(csv.reader(io.StringIO(text)))
+    if upload.truncated and rows:
+        # The last row of a truncated head is most likely incomplete
+        rows = rows[:-1]
+    header, body = (rows[0], rows[1:]) if rows else ([], [])
+    return {
+        "columns": header,
+        "sample_rows": [summarize_value(row) for row in body[:UPLOAD_SAMPLE_ITEMS]],
+        "total_rows": max(upload.lines - 1, len(body)),
+    }
+
+
+def summarize_upload(upload):
+    """
+    Turn an Upload into the bounded text appended to the Task Analyzer input.
+    """
+    text = upload.text()
+    file_format = detect_format(upload.filename, text)
+    summary = None
+    try:
+        if file_format == "csv":
+            summary = _summarize_csv(upload, text)
+        elif file_format == "json":
+            summary = _summarize_document(json.loads(text), _dump_json)
+        elif file_format == "yaml":
+            summary = _summarize_document(yaml.safe_load(text), _dump_yaml)
+    except (ValueError, yaml.YAMLError, csv.Error) as e:
+        # Typically a document cut by the size cap, fall back to its beginning
+        logger.info('[Ingest] - Could not parse %s upload %s: %s', file_format, upload.filename, e)
+    if summary is None:
+        body = text
+    elif file_format == "yaml":
+        body = _dump_yaml(summary)
+    else:
+        body = _dump_json(summary)
+    if len(body) > UPLOAD_MAX_CHARS:
+        body = f"{body[:UPLOAD_MAX_CHARS]}\n... ({len(body) - UPLOAD_MAX_CHARS} more characters)"
+    note = f" (first {len(upload.head)} of {upload.size} bytes)" if upload.truncated else ""
+    logger.info('[Ingest] - %s upload of %s bytes summarized to %s characters', file_format, upload.size, len(body))
+    return f"[{file_format}{note}]\n{body}"
@@ -0,0 +1,227 @@
+import asyncio
+import json
+import time
+import uuid
+from enum import Enum
+
+from app.config import JOB_MAX_IN_FLIGHT, JOB_MAX_WORKERS, JOB_OVERFLOW, JOB_POLL_INTERVAL, JOB_RETENTION
+from app.metrics import Gauge, registry
+from app.shared import shared_backend
+from app.util import logger
+
+
+class JobStatus(Enum):
+    """
+    Represents the status of a background /chat job.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATUSES = (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """
+    Raised when a job is submitted while the maximum number of in-flight jobs is reached.
+    """
+
+
+class Job:
+    def __init__(self, on_change=None):
+        self.id = str(uuid.uuid4())
+        self.status = JobStatus.QUEUED
+        self.stage = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.events = []
+        self.task = None
+        self._on_change = on_change
+        self._changed = asyncio.Condition()
+
+    async def publish(self, event, **data):
+        self.events.append({"event": event, "data": data, "at": time.time()})
+        if self._on_change is not None:
+            await self._on_change(self)
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def wait_for_event(self, seen):
+        """
+        Wait until more than `seen` events were published or the job finished.
+        """
+        async with self._changed:
+            await self._changed.wait_for(lambda: len(self.events) > seen or self.status in FINISHED_STATUSES)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status.value,
+            "stage": self.stage,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    def snapshot(self):
+        return {**self.to_dict(), "events": self.events}
+
+
+class JobManager:
+    """
+    Runs /chat generations in the background on a bounded pool of workers.
+    At most `max_workers` jobs run at once and at most `max_in_flight` are queued or running.
+    When full, `overflow="reject"` raises JobQueueFull and `overflow="wait"` holds the
+    submitter until a slot frees up.
+    With a shared backend every job is also saved there on each event, so any worker can report
+    it, and a cancellation received by another worker is picked up by the owner's watcher.
+    The limits apply per worker.
+    """
+
+    def __init__(self, max_workers=JOB_MAX_WORKERS, max_in_flight=JOB_MAX_IN_FLIGHT,
+                 overflow=JOB_OVERFLOW, retention=JOB_RETENTION, backend=shared_backend,
+                 poll_interval=JOB_POLL_INTERVAL):
+        if overflow not in ("reject", "wait"):
+            raise ValueError(f"Unknown job overflow policy: {overflow}")
+        self.max_workers = max_workers
+        self.max_in_flight = max(max_in_flight, max_workers)
+        self.overflow = overflow
+        self.retention = retention
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.jobs = {}
+        self._workers = None
+        self._slots = None
+        self._watcher = None
+
+    def _ensure_semaphores(self):
+        # Created lazily so they bind to the loop serving requests
+        if self._workers is None:
+            self._workers = asyncio.Semaphore(self.max_workers)
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        if self.backend is not None and (self._watcher is None or self._watcher.done()):
+            self._watcher = asyncio.create_task(self._watch_cancellations())
+
+    def in_flight(self):
+        return sum(1 for job in self.jobs.values() if job.status not in FINISHED_STATUSES)
+
+    def _prune(self):
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.retention
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    async def submit(self, run):
+        """
+        Schedule `run(job)`, a coroutine function returning the job result, and return the Job.
+        """
+        self._ensure_semaphores()
+        self._prune()
+        if self._slots.locked() and self.overflow == "reject":
+            raise JobQueueFull(f"{self.max_in_flight} jobs are already in flight")
+        await self._slots.acquire()
+        job = Job(on_change=self._save if self.backend is not None else None)
+        self.jobs[job.id] = job
+        if self.backend is not None:
+            await self._save(job)
+        job.task = asyncio.create_task(self._run(job, run))
+        return job
+
+    async def _run(self, job, run):
+        try:
+            async with self._workers:
+                job.status = JobStatus.RUNNING
+                await job.publish("status", status=job.status.value)
+                job.result = await run(job)
+                job.status = JobStatus.SUCCEEDED
+        except asyncio.CancelledError:
+            job.status = JobStatus.CANCELLED
+        except Exception as e:
+            logger.error('[JobManager] - Job %s failed: %s', job.id, e)
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            self._slots.release()
+            await job.publish("status", status=job.status.value, result=job.result, error=job.error)
+
+    async def _save(self, job):
+        try:
+            await asyncio.to_thread(self.backend.set, f"job:{job.id}", json.dumps(job.snapshot()), self.retention)
+        except Exception as e:
+            logger.warning('[JobManager] - Could not save job %s: %s', job.id, e)
+
+    async def _watch_cancellations(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for job in list(self.jobs.values()):
+                if job.status in FINISHED_STATUSES or job.task is None:
+                    continue
+                try:
+                    requested = await asyncio.to_thread(self.backend.get, f"job:{job.id}:cancel")
+                except Exception:
+                    continue
+                if requested:
+                    logger.info('[JobManager] - Job %s cancelled from another worker', job.id)
+                    job.task.cancel()
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    async def snapshot(self, job_id):
+        """
+        The job as a dict with its events, whichever worker runs it, or None when unknown.
+        """
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job.snapshot()
+        if self.backend is None:
+            return None
+        raw = await asyncio.to_thread(self.backend.get, f"job:{job_id}")
+        return json.loads(raw) if raw else None
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job, which also cancels its pending Groq calls.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if job.status not in FINISHED_STATUSES and job.task is not None:
+            job.task.cancel()
+        return job
+
+    async def cancel_anywhere(self, job_id):
+        """
+        Cancel a job run by this or another worker and return its snapshot, or None when unknown.
+        """
+        job = self.cancel(job_id)
+        if job is not None:
+            return job.snapshot()
+        snapshot = await self.snapshot(job_id)
+        if snapshot is not None and snapshot["status"] not in {status.value for status in FINISHED_STATUSES}:
+            await asyncio.to_thread(self.backend.set, f"job:{job_id}:cancel", "1", self.retention)
+        return snapshot
+
+    async def shutdown(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+        tasks = [job.task for job in self.jobs.values() if job.task is not None and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+job_manager = JobManager()
+
+registry.register(Gauge(
+    "jobs_in_flight", "Background jobs queued or running.", job_manager.in_flight))
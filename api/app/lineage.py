@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from os.path import dirname
+
+import yaml
+
+from app.compaction import compact_json
+from app.config import LINEAGE_MAX_PATCH_CHANGES, LINEAGE_PATH
+from app.repair import extract_json
+from app.schema import TaskAnalyzerOutput
+from app.spec_index import adapt_page
+from app.util import logger
+
+# Texts a page may show verbatim, swapped in place
+TEXT_PATHS = {
+    "task_type.description": "description",
+    "input_output.input": "input",
+    "input_output.output": "output",
+    "model_info.name": "model_name",
+    "visualization.description": "visualization",
+}
+URL_PATH = "model_info.api_url"
+# A different problem type is a different page
+REBUILD_PATHS = ("task_type.type",)
+_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def spec_title(content):
+    """
+    The title (or name) a task.yaml declares at its top level, or None.
+    """
+    try:
+        spec = yaml.load(content or "", Loader=_LOADER)
+    except yaml.YAMLError:
+        return None
+    if not isinstance(spec, dict):
+        return None
+    for key, value in spec.items():
+        if str(key).lower() in ("title", "name") and isinstance(value, str) and value.strip():
+            return value.strip()
+    return None
+
+
+def lineage_key(lineage, *context):
+    """
+    Key of a spec lineage: the id the client sent, or the title of the spec (see spec_title).
+    None without either, specs are only patched when they name the page they replace.
+    `context` (model, temperature, prompt fingerprint) keeps pages of other settings apart.
+    """
+    if not lineage:
+        return None
+    parts = [str(lineage), *(str(part) for part in context)]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def lineage_analysis(task: TaskAnalyzerOutput):
+    """
+    The form an analysis is stored and compared in: the validated output, pruned like compact_json.
+    """
+    return json.loads(compact_json(task.model_dump(mode="json")))
+
+
+def _flatten(value, prefix=""):
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    # Lists are compared as a whole, their items have no stable identity
+    return {prefix: value}
+
+
+def diff_analysis(old, new):
+    """
+    Structural diff of two analyses (dicts): {dotted path: (old value, new value)} of every leaf that
+    changed, was added (old None) or removed (new None). Key order and formatting do not matter.
+    """
+    old_flat, new_flat = _flatten(old), _flatten(new)
+    return {
+        path: (old_flat.get(path), new_flat.get(path))
+        for path in sorted(old_flat.keys() | new_flat.keys())
+        if old_flat.get(path) != new_flat.get(path)
+    }
+
+
+def _find(page, text):
+    """
+    (start, end) of the first occurrence of `text` in the page, exact or up to whitespace
+    (the model may reindent or squeeze the snippets it quotes), or None.
+    """
+    start = page.find(text)
+    if start >= 0:
+        return start, start + len(text)
+    words = text.split()
+    if not words:
+        return None
+    match = re.search(r"\s+".join(re.escape(word) for word in words), page)
+    return match.span() if match else None
+
+
+def apply_edits(page, edits):
+    """
+    Apply [{"find", "replace"}] edits, each `find` must occur in the page. Returns None when one does not.
+    """
+    for edit in edits:
+        if not isinstance(edit, dict) or not isinstance(edit.get("find"), str) or not edit["find"].strip():
+            return None
+        span = _find(page, edit["find"])
+        if span is None:
+            logger.info('[Lineage] - Edit does not apply: %s', edit["find"])
+            return None
+        page = page[:span[0]] + str(edit.get("replace", "")) + page[span[1]:]
+    return page
+
+
+def parse_edits(content):
+    data = extract_json(content) or {}
+    edits = data.get("edits")
+    return edits if isinstance(edits, list) else None
+
+
+class PagePatch:
+    """
+    How the stored page of a lineage (`record`) becomes the page of the new analysis: `page` after
+    the local text and URL swaps, and `changes` left for the patch call (empty when the swaps were enough).
+    """
+
+    def __init__(self, record, page, changes, changed, plan=None):
+        self.record = record
+        self.page = page
+        self.changes = changes
+        self.changed = changed
+        self.plan = plan if plan is not None else record["plan"]
+
+
+def plan_patch(record, task):
+    """
+    Patch the stored page of a lineage locally as far as possible, or return None when the change
+    is too large to patch (another problem type, more than LINEAGE_MAX_PATCH_CHANGES other fields).
+    """
+    changes = diff_analysis(record["analysis"], task)
+    if not changes:
+        return PagePatch(record, record["html"], {}, changed=False)
+    if any(path in changes for path in REBUILD_PATHS):
+        return None
+    page = record["html"]
+    old_texts = {name: changes[path][0] for path, name in TEXT_PATHS.items() if path in changes and changes[path][0]}
+    new_texts = {name: changes[path][1] for path, name in TEXT_PATHS.items() if path in changes and changes[path][1]}
+    page = adapt_page(page, old_texts, new_texts)
+    remaining = {path: change for path, change in changes.items() if path not in TEXT_PATHS}
+    plan = record["plan"]
+    old_url, new_url = remaining.get(URL_PATH, (None, None))
+    if old_url and new_url and old_url in page:
+        page = page.replace(old_url, new_url)
+        plan = plan.replace(old_url, new_url) if plan else plan
+        del remaining[URL_PATH]
+    if len(remaining) > LINEAGE_MAX_PATCH_CHANGES:
+        return None
+    return PagePatch(record, page, remaining, changed=True, plan=plan)
+
+
+class LineageStore:
+    """
+    Last analysis, plan and page of every spec lineage, so an edited spec can patch its page
+    instead of regenerating it. Kept in SQLite (WAL) and shared by the workers of a host.
+    """
+
+    def __init__(self, path=LINEAGE_PATH):
+        self.path = path
+        if dirname(path):
+            os.makedirs(dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS lineages (key TEXT PRIMARY KEY, record TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM lineages WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, analysis, plan, html, url):
+        record = {"analysis": analysis, "plan": plan, "html": html, "url": url}
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO lineages (key, record, updated_at) VALUES (?, ?, ?)",
+                (key, json.dumps(record, ensure_ascii=False), time.time()),
+            )
+            self._conn.commit()
+
+
+lineage_store = LineageStore()
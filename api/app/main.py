@@ -1,22 +1,53 @@
 
-from app.util import supabase
-from app.pipeline import LLMPipeline
+from app.memo import stage_memo
+from app.compaction import prompt_assembler
+from app.prompt_registry import prompt_registry
+from app.executor import optimization_executor
+from app.clients import client_registry
+from app.jobs import FINISHED_STATUSES, JobQueueFull, job_manager
+from app.service import generate_ui, read_upload, stream_ui
+from app.batch import BatchTooLarge, read_specs, run_batch
 from app.schema import Chat
+from app.storage import LocalStorage, storage
 import json
-from fastapi import FastAPI
+from typing import List, Optional
+from fastapi import FastAPI, File, Form, HTTPException, Response, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.staticfiles import StaticFiles
 from sse_starlette.sse import EventSourceResponse
 from fastapi import Request
-from app.util import log_queue
+from app.broadcast import ALL_CHANNEL
+from app.config import BATCH_MAX_BYTES, BATCH_MAX_CONCURRENCY, JOB_POLL_INTERVAL, LOG_REPLAY_SIZE
+from app.metrics import format_server_timing, registry, stage_timer, start_request_timings
+from app.util import log_broadcaster, log_bus, log_channel
 import asyncio
 import uuid
+import zipfile
+from contextlib import asynccontextmanager
 
 origins = [
     "http://localhost",
     "http://localhost:3000",
 ]
 
-app = FastAPI(root_path="/api")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    client_registry.start()
+    # Relays the logs of every worker to this worker's /logs clients
+    relay = asyncio.create_task(log_bus.relay()) if log_bus is not None else None
+    yield
+    if relay is not None:
+        relay.cancel()
+    await job_manager.shutdown()
+    await client_registry.close()
+    await storage.close()
+    optimization_executor.shutdown()
+
+app = FastAPI(root_path="/api", lifespan=lifespan)
+
+if isinstance(storage, LocalStorage):
+    app.mount("/files", StaticFiles(directory=storage.directory), name="files")
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,6 +55,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Server-Timing"],
 )
 
 @app.get("/")
@@ -31,63 +63,199 @@ def read_root():
     return {"message": "Welcome to FastAPI"}
 
 @app.post("/chat")
-async def chat(chat: Chat):
-    pipeline = LLMPipeline()
-    file_content = None
-    if chat.file is not None:
-        file_content = await chat.file.read()
-        file_content = file_content.decode('utf-8')
-        if not file_content:
-            file_content = None
-    if file_content:
-        chat.content = f"{chat.content}\n\nFile content:\n{file_content}"
-        
-    processed_task = await pipeline.task_analyze(chat.content)
-    problem_type = json.loads(processed_task).get('task_type').get('type')
-    plan = await pipeline.ui_planner(processed_task)
-    final_code = await pipeline.ui_builder(problem_type, plan, optimize=True)
-    # Write final_code to a HTML file
-    # Generate a unique filename using uuid
-    unique_id = str(uuid.uuid4())
-    html_filename = f"final_code_{unique_id}.html"
-    html_path = f"./template/{html_filename}"
-
-    with open(html_path, "w", encoding="utf-8") as f:
-        if isinstance(final_code, dict):
-            f.write(json.dumps(final_code, ensure_ascii=False, indent=2))
-        else:
-            f.write(final_code)
-
-    # Upload the HTML file to the Supabase bucket
-    with open(html_path, "rb") as f:
-        upload_result = (
-            supabase.storage
-            .from_("visualization-challenge")
-            .upload(
-                file=f,
-                path=f"public/{html_filename}",
-                file_options={"content-type": "text/html", "upsert": "true"}
-            )
-        )
-        url = (
-            supabase.storage
-            .from_("avatars")
-            .get_public_url(f"public/{html_filename}")
-        )
+async def chat(chat: Chat, request: Request, response: Response):
+    request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
+    log_channel.set(request_id)
+    response.headers["X-Request-ID"] = request_id
+    timings = start_request_timings()
+    file_bytes, file_content = await read_upload(chat.file)
+    with stage_timer("total"):
+        url = await generate_ui(chat.content, file_bytes, file_content, model=chat.model, temperature=chat.temperature,
+                                lineage=chat.lineage)
+    response.headers["Server-Timing"] = format_server_timing(timings)
     return { "url": url }
 
-@app.get("/logs")
-async def logs(request: Request):
+@app.post("/chat/stream")
+async def chat_stream(chat: Chat, request: Request):
+    request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
+    file_bytes, file_content = await read_upload(chat.file)
+
+    async def event_generator():
+        log_channel.set(request_id)
+        try:
+            async for event in stream_ui(chat.content, file_bytes, file_content, model=chat.model,
+                                         temperature=chat.temperature):
+                yield {
+                    "event": event["event"],
+                    "data": json.dumps(event["data"], ensure_ascii=False),
+                }
+        except Exception as e:
+            yield {"event": "error", "data": json.dumps({"error": str(e)})}
+    return EventSourceResponse(event_generator(), headers={"X-Request-ID": request_id})
+
+@app.post("/chat/batch")
+async def chat_batch(files: List[UploadFile] = File(...), model: Optional[str] = Form(None),
+                     temperature: Optional[float] = Form(None), concurrency: Optional[int] = Form(None)):
+    """
+    Generate a UI for every uploaded task.yaml (or zip of them), streaming one NDJSON line per spec.
+    """
+    specs = []
+    for file in files:
+        try:
+            specs.extend(read_specs(file.filename, await file.read(BATCH_MAX_BYTES + 1)))
+        except BatchTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except (UnicodeDecodeError, ValueError, zipfile.BadZipFile) as e:
+            raise HTTPException(status_code=400, detail=f"Could not read {file.filename}: {e}")
+    if not specs:
+        raise HTTPException(status_code=400, detail="No task specs found in the upload")
+    results = run_batch(specs, model=model, temperature=temperature,
+                        concurrency=max(1, min(concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)))
+    try:
+        first = await anext(results)
+    except BatchTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    async def lines():
+        yield json.dumps(first, ensure_ascii=False) + "\n"
+        async for result in results:
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/jobs", status_code=202)
+async def create_job(chat: Chat):
+    # The upload is only readable during the request, so read it before handing off
+    file_bytes, file_content = await read_upload(chat.file)
+
+    async def run(job):
+        log_channel.set(job.id)
+        async def on_progress(stage, **data):
+            job.stage = stage
+            await job.publish("progress", stage=stage, **data)
+        url = await generate_ui(chat.content, file_bytes, file_content, model=chat.model,
+                                temperature=chat.temperature, on_progress=on_progress, lineage=chat.lineage)
+        return { "url": url }
+
+    try:
+        job = await job_manager.submit(run)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    snapshot = await job_manager.snapshot(job_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    snapshot.pop("events")
+    return snapshot
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    snapshot = await job_manager.cancel_anywhere(job_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    snapshot.pop("events")
+    return snapshot
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    job = job_manager.get(job_id)
+    if job is None:
+        snapshot = await job_manager.snapshot(job_id)
+        if snapshot is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return EventSourceResponse(remote_job_events(job_id, snapshot, request))
+
     async def event_generator():
+        seen = 0
         while True:
             if await request.is_disconnected():
                 break
-            try:
-                log = await asyncio.wait_for(log_queue.get(), timeout=30.0)
+            for event in job.events[seen:]:
                 yield {
-                    "event": "log",
-                    "data": log,
+                    "event": event["event"],
+                    "data": json.dumps(event["data"]),
                 }
+            seen = len(job.events)
+            if job.status in FINISHED_STATUSES:
+                break
+            try:
+                await asyncio.wait_for(job.wait_for_event(seen), timeout=30.0)
             except asyncio.TimeoutError:
                 yield {"event": "ping", "data": "keep-alive"}
     return EventSourceResponse(event_generator())
+
+async def remote_job_events(job_id, snapshot, request):
+    """
+    Events of a job run by another worker, polled from the shared backend.
+    """
+    finished = {status.value for status in FINISHED_STATUSES}
+    seen = 0
+    idle_since = asyncio.get_running_loop().time()
+    while snapshot is not None:
+        if await request.is_disconnected():
+            break
+        for event in snapshot["events"][seen:]:
+            yield {
+                "event": event["event"],
+                "data": json.dumps(event["data"]),
+            }
+        if len(snapshot["events"]) > seen:
+            seen = len(snapshot["events"])
+            idle_since = asyncio.get_running_loop().time()
+        if snapshot["status"] in finished:
+            break
+        if asyncio.get_running_loop().time() - idle_since > 30.0:
+            idle_since = asyncio.get_running_loop().time()
+            yield {"event": "ping", "data": "keep-alive"}
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+        snapshot = await job_manager.snapshot(job_id)
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+def cache_stats():
+    return { "stages": stage_memo.stats }
+
+@app.get("/prompts/stats")
+def prompt_stats():
+    return prompt_assembler.stats
+
+@app.post("/prompts/reload")
+def reload_prompts():
+    """
+    Reload the prompt drop-in files now instead of at the next periodic check.
+    """
+    snapshot = prompt_registry.reload()
+    return { "fingerprint": snapshot.fingerprint, "problem_types": prompt_registry.problem_types() }
+
+@app.get("/optimizer/stats")
+def optimizer_stats():
+    return optimization_executor.stats()
+
+@app.get("/logs")
+async def logs(request: Request, channel: str = ALL_CHANNEL, replay: int = 0):
+    """
+    Stream log entries of one channel (a request or job id, or "all"), replaying the last `replay` entries first.
+    """
+    subscription = log_broadcaster.subscribe(channel, replay=min(max(replay, 0), LOG_REPLAY_SIZE))
+
+    async def event_generator():
+        try:
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    log = await subscription.get(timeout=30.0)
+                    yield {
+                        "event": "log",
+                        "data": str(log),
+                    }
+                except asyncio.TimeoutError:
+                    yield {"event": "ping", "data": "keep-alive"}
+        finally:
+            log_broadcaster.unsubscribe(subscription)
+    return EventSourceResponse(event_generator())
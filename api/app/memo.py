@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from os.path import dirname
+
+from app.config import CACHE_TTL, STAGE_CACHE_BACKEND, STAGE_CACHE_MAX_ENTRIES, STAGE_CACHE_PATH
+from app.metrics import stage_cache
+from app.shared import shared_backend
+from app.util import logger
+
+
+def _hash(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+class LRUStageStore:
+    """
+    In-process store keeping the most recently used stage outputs.
+    """
+
+    blocking = False
+
+    def __init__(self, max_entries=STAGE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, stage=""):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteStageStore:
+    """
+    File-backed store so stage outputs survive restarts and are shared between workers.
+    Outputs older than `ttl` seconds are ignored and pruned, as are all but the newest `max_entries`.
+    """
+
+    # Called from a thread, so the event loop does not wait on the database
+    blocking = True
+
+    def __init__(self, path=STAGE_CACHE_PATH, max_entries=STAGE_CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        if dirname(path):
+            os.makedirs(dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        # Readers in other workers do not block on the writer
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS stage_outputs ("
+            "key TEXT PRIMARY KEY, stage TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS stage_outputs_created_at ON stage_outputs (created_at)")
+        self._conn.commit()
+
+    def _oldest_fresh(self):
+        return time.time() - self.ttl if self.ttl > 0 else 0
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM stage_outputs WHERE key = ? AND created_at >= ?", (key, self._oldest_fresh())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, stage=""):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stage_outputs (key, stage, value, created_at) VALUES (?, ?, ?, ?)",
+                (key, stage, value, time.time()),
+            )
+            self._conn.execute("DELETE FROM stage_outputs WHERE created_at < ?", (self._oldest_fresh(),))
+            self._conn.execute(
+                "DELETE FROM stage_outputs WHERE key IN "
+                "(SELECT key FROM stage_outputs ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+
+class SharedStageStore:
+    """
+    Stage outputs kept in the shared backend (SHARED_BACKEND), e.g. Redis for workers on several hosts.
+    """
+
+    # Every call is a round-trip to the backend, made from a thread like the result cache does
+    blocking = True
+
+    def __init__(self, backend=None, ttl=CACHE_TTL):
+        self.backend = backend or shared_backend
+        if self.backend is None:
+            raise ValueError("The shared stage cache needs SHARED_BACKEND to be sqlite or redis")
+        self.ttl = ttl
+
+    def get(self, key):
+        return self.backend.get(f"stage:{key}")
+
+    def set(self, key, value, stage=""):
+        self.backend.set(f"stage:{key}", value, self.ttl or None)
+
+
+STAGE_STORES = {
+    "memory": LRUStageStore,
+    "sqlite": SQLiteStageStore,
+    "shared": SharedStageStore,
+}
+
+
+class StageMemo:
+    """
+    Memoizes agent stage outputs on (AgentTask, role prompt, user prompt, model, temperature)
+    and counts hits and misses per stage.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.stats = {}
+        self._inflight = {}
+
+    def make_key(self, task, role_prompt, prompt, model, temperature, variant=None):
+        parts = [task.value, _hash(role_prompt), _hash(prompt), model or "", str(temperature)]
+        if variant is not None:
+            # Distinguishes sampled candidates of the same prompt
+            parts.append(str(variant))
+        return _hash("\x1f".join(parts))
+
+    def _count(self, task, outcome):
+        counters = self.stats.setdefault(task.value, {"hits": 0, "misses": 0})
+        counters[outcome] += 1
+        stage_cache.inc(stage=task.value, result=outcome[:-1])
+
+    async def get(self, task, key):
+        if self.store.blocking:
+            value = await asyncio.to_thread(self.store.get, key)
+        else:
+            value = self.store.get(key)
+        self._count(task, "hits" if value is not None else "misses")
+        logger.info('[StageMemo] - %s %s', task.value, "hit" if value is not None else "miss")
+        return value
+
+    async def set(self, task, key, value):
+        if self.store.blocking:
+            await asyncio.to_thread(self.store.set, key, value, stage=task.value)
+        else:
+            self.store.set(key, value, stage=task.value)
+
+    async def coalesce(self, key, factory):
+        """
+        Run `factory()` once for concurrent misses of the same key, every caller awaits the same task.
+        The task runs on its own, so a cancelled caller does not cancel the others; it is only
+        cancelled when no caller is left waiting for it.
+        """
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = self._inflight[key] = _Inflight(asyncio.ensure_future(factory()))
+            inflight.task.add_done_callback(lambda _: self._forget(key, inflight))
+        inflight.waiters += 1
+        try:
+            return await asyncio.shield(inflight.task)
+        finally:
+            inflight.waiters -= 1
+            if not inflight.waiters and not inflight.task.done():
+                inflight.task.cancel()
+
+
+    def _forget(self, key, inflight):
+        if self._inflight.get(key) is inflight:
+            del self._inflight[key]
+
+
+class _Inflight:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+def create_stage_store(backend=STAGE_CACHE_BACKEND):
+    if backend not in STAGE_STORES:
+        raise ValueError(f"Unknown stage cache backend: {backend}")
+    return STAGE_STORES[backend]()
+
+
+stage_memo = StageMemo(create_stage_store())
@@ -0,0 +1,176 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Timings of the current request, rendered into its Server-Timing header
+request_timings = ContextVar("request_timings", default=None)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return "{" + body + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Gauge:
+    """
+    A gauge whose value is read from `callback` at scrape time.
+    """
+
+    def __init__(self, name, documentation, callback):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def render(self):
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {self.callback()}",
+        ]
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry["buckets"][i] += 1
+        entry["sum"] += value
+        entry["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, entry in self._values.items():
+            for bound, count in zip(self.buckets, entry["buckets"]):
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {entry['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {entry['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {entry['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.register(Histogram(
+    "pipeline_stage_seconds", "Wall time of each pipeline stage."))
+groq_queue_seconds = registry.register(Histogram(
+    "groq_queue_seconds", "Time a Groq request spent queued, as reported by Groq."))
+groq_processing_seconds = registry.register(Histogram(
+    "groq_processing_seconds", "Time Groq spent processing a request, as reported by Groq."))
+groq_tokens = registry.register(Counter(
+    "groq_tokens_total", "Prompt and completion tokens per stage."))
+stage_retries = registry.register(Counter(
+    "pipeline_retries_total", "Retries per pipeline stage."))
+stage_cache = registry.register(Counter(
+    "pipeline_cache_total", "Cache lookups per stage and result."))
+builder_candidates = registry.register(Counter(
+    "builder_candidates_total", "Builder candidates scored locally, by whether they passed every check."))
+critic_runs = registry.register(Counter(
+    "critic_runs_total", "TextGrad critic loops by outcome: skipped, passed, budget or exhausted."))
+prompt_tokens = registry.register(Counter(
+    "prompt_tokens_estimated_total", "Estimated input tokens per stage, before (raw) and after (compact) compaction."))
+
+
+def record_timing(name, seconds):
+    stage_seconds.observe(seconds, stage=name)
+    timings = request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def stage_timer(name):
+    """
+    Time a block as pipeline stage `name`, for /metrics and the current request's Server-Timing.
+    """
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - started_at)
+
+
+def record_usage(stage, usage):
+    """
+    Record the token counts and Groq timings of a completion's `usage` block.
+    """
+    if usage is None:
+        return
+    groq_tokens.inc(getattr(usage, "prompt_tokens", 0) or 0, stage=stage, kind="prompt")
+    groq_tokens.inc(getattr(usage, "completion_tokens", 0) or 0, stage=stage, kind="completion")
+    queue_time = getattr(usage, "queue_time", None)
+    if queue_time is not None:
+        groq_queue_seconds.observe(queue_time, stage=stage)
+    total_time = getattr(usage, "total_time", None)
+    if total_time is not None:
+        groq_processing_seconds.observe(total_time, stage=stage)
+
+
+def start_request_timings():
+    timings = []
+    request_timings.set(timings)
+    return timings
+
+
+def format_server_timing(timings):
+    """
+    Render timings as a Server-Timing header, summing repeated stages (e.g. builder retries).
+    """
+    totals = {}
+    for name, seconds in timings:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
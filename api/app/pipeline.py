@@ -1,267 +1,83 @@
-from app.config import GROQ_API_KEY, MODEL_NAME
+from app.config import (
+    BACKWARD_ENGINE,
+    BUILDER_CANDIDATE_TEMPERATURE,
+    BUILDER_CANDIDATES,
+    BUILDER_MAX_ATTEMPTS,
+    CRITIC_MAX_STEPS,
+    CRITIC_SKIP_PASSING,
+    GROQ_API_KEY,
+    LOCAL_SPEC_MAPPING,
+    MODEL_NAME,
+)
 from groq import AsyncGroq
 
 import json
 import textgrad as tg
 
 from app.util import logger
-from app.constant import AgentTask, ProblemTask
-from app.prompt import set_task_analyzer_prompt, set_task_ui_builder_prompt, set_task_ui_planner_prompt
+from app.compaction import compact_json, prompt_assembler
+from app.prompt_registry import prompt_registry
+from app.memo import stage_memo
+from app.critic import CriticBudget, critic_session, estimate_step_tokens
+from app.executor import optimization_executor
+from app.governor import governor
+from app.metrics import builder_candidates, critic_runs, record_timing, record_usage, stage_retries, stage_timer
+from app.constant import AgentTask
+from app.prompt import (
+    set_task_analyzer_prompt,
+    set_task_json_repair_prompt,
+    set_task_spec_fill_prompt,
+    set_task_ui_builder_prompt,
+    set_task_ui_patch_prompt,
+    set_task_ui_planner_prompt,
+)
+from app.repair import extract_json, repair_output
+from app.lineage import apply_edits, parse_edits
+from app.scoring import required_urls, score_candidate
+from app.spec_mapper import map_spec
 from app.schema import TaskAnalyzerOutput, UIAgentOutput, UIPlannerOutput
 import asyncio
+import time
+
+def _require_json(content):
+    data = extract_json(content)
+    if data is None:
+        raise ValueError("The response is not a JSON object.")
+    return data
+
+
+def _require_ui_output(content):
+    code, _, errors = repair_output(AgentTask.UI_BUILDER, content)
+    if code is None:
+        raise ValueError(errors)
+    return code
+
 
 class LLMPipeline:
   
-    def __init__(self):
-        self.client = AsyncGroq(
-            api_key=GROQ_API_KEY
-        )
-        # set the backward model to evaluate the summaries
-        tg.set_backward_engine("groq-llama-3.3-70b-versatile", override=True)
-
-        self.role_prompts = {
-            AgentTask.TASK_ANALYZER : '''
-                You are a Task Analyzer Agent. Your job is to read a YAML file that defines a machine learning task, and output a standardized JSON format including task type, input/output formats, model information, visualization features, and dataset description.
-                Respond only with JSON using this format:
-                """
-                {
-                    "task_type": {
-                        "type": "string", 
-                        "description": "string"
-                    },
-                    "input_output": {
-                        "input": "string",
-                        "output": "string"
-                    },
-                    "model_info": {
-                        "api_url": "string",
-                        "name": "string",
-                        "input_format": {
-                        "type": "json | base64 | multipart | ...",
-                        "structure": {
-                            "key": {
-                            "type": "string",
-                            "encoding": "optional string",
-                            "description": "string"
-                            }
-                        }
-                        },
-                        "output_format": {
-                        "type": "array | json | string",
-                        "description": "string",
-                        "post_processing": {
-                            "optional string key": "description"
-                        },
-                        "guidance": ["step1", "step2"]
-                        }
-                    },
-                    "visualization": {
-                        "description": "string",
-                        "features": [
-                        {
-                            "name": "list_display | input_function",
-                            "description": "string",
-                            "fields": [
-                            { "name": "string", "description": "string" }
-                            ],
-                            "steps": ["optional steps"]
-                        }
-                        ]
-                    },
-                    "dataset": {
-                        "data_path": "string",
-                        "description": "string",
-                        "supported_formats": ["jpg", "png", ...],
-                        "other_data": "optional string"
-                    }
-                }
-                """
-            ''',
-            AgentTask.UI_PLANNER: '''
-                You are a UI Planner Agent. Based on a task description, generate a clean UI Blueprint schema. The schema should define layout, input fields, output display types, and API interaction settings. 
-                Ensure the task description is clearly kept again and the UI is user-friendly, especially the output format and model input structure.
-                Your output must be valid JSON, matching a UI schema format like this:
-                """
-                    {
-                        "title": "string",
-                        "description": "string",
-                        "task_description": "string",
-                        "layout": "responsive_card | wizard | dashboard",
-                        "navbar": [
-                            { "label": "string", "target": "#anchor_id" }
-                        ],
-                        "inputs": [
-                            {
-                            "type": "file_upload | text_input | dropdown",
-                            "label": "string",
-                            "accept": ["jpg", "png"],
-                            "drag_and_drop": true,
-                            "input_id": "string"
-                            }
-                        ],
-                        "actions": [
-                            {
-                            "type": "button",
-                            "label": "string",
-                            "on_click": "string (handler name)"
-                            }
-                        ],
-                        "api_call": {
-                            "url": "string",
-                            "method": "POST",
-                            "input_structure": {
-                                "field": "value"
-                            },
-                            "response_mapping": {
-                                "label": "predicted_label",
-                                "score": "probability"
-                            }
-                        },
-                        "outputs": [
-                            {
-                            "type": "image_result | table | text_block",
-                            "output_id": "string",
-                            "fields": [
-                                { "name": "string", "label": "string", "type": "text | image | bar" }
-                            ],
-                            "list_display": true
-                            }
-                        ],
-                        "dataset_info": {
-                            "description": "string",
-                            "path": "string",
-                            "formats": ["jpg", "png"],
-                            "label_mapping": "optional string"
-                        },
-                        "footer": {
-                            "info": "string",
-                            "api_url": "string",
-                            "version": "string"
-                        },
-                        "visualization_features": {
-                            "image_preview": true,
-                            "probability_bar": true,
-                            "list_display": true
-                        },
-                        "accessibility": {
-                            "keyboard_navigation": true,
-                            "screen_reader": true
-                        },
-                        "error_handling": {
-                            "invalid_format": "string",
-                            "empty_upload": "string",
-                            "api_error": "string"
-                        }
-                    }
-                """
-            ''',
-            AgentTask.UI_BUILDER: '''
-                You are a UI Generator Agent. Given a UI Blueprint, you must generate working HTML, CSS, JS code with highly interactive components and eye-catching effects. 
-                The component should allow users to input data, call the model API ASYNCHRONOUSLY and avoid CORS errors, then display the output results as specified. 
-                Focus on task description for not missing any steps and ensure the API url correctly.
-                Note that if the task related to image, image must be convert to base64 string and passed to the model API.
-                Double check the input structure and output mapping to ensure the API call is correct.
-                Don't use any external libraries, just use pure HTML, CSS, JS.
-                Respond only in JSON string with html, css, js in only one code block with below format:
-                """
-                {
-                    "code": "<!DOCTYPE html>\\n<html>\\n<head>\\n<style>body { font-family: Arial; }</style>\\n</head>\\n<body>\\n<input type=\\\"file\\\" id=\\\"imageInput\\\" />\\n<button onclick=\\\"sendImage()\\\">Submit</button>\\n<pre id=\\\"output\\\"></pre>\\n<script>async function sendImage() { const reader = new FileReader(); reader.onload = function() { await fetch('/api/model', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ image: reader.result }) }).then(res => res.json()).then(data => document.getElementById('output').innerText = JSON.stringify(data, null, 2)); }; reader.readAsDataURL(document.getElementById('imageInput').files[0]); }</script>\\n</body>\\n</html>"
-                }
-                """
-            ''',
-            AgentTask.UI_CRITIC: '''
-                You are a UI Critic Agent, a master code reviewer. You will review HTML, CSS, JS code in a given code block and provide feedback about its usability, completeness, possible bugs, and improve it. 
-                Respond with the optimized code ensure has enough HTML, CSS, JS, API called ASYNCHRONOUSLY, especially focusing on handling response data from the model API, syntax correctness and displaying it in the UI.
-                Don't use any external libraries, just use pure HTML, CSS, JS, ensure the API url correctly.
-                Based on the following requirements, provide a detailed review and optimization of the code:
-            '''
-        }
-        return None
+    def __init__(self, client=None, model=MODEL_NAME, temperature=0):
+        if client is None:
+            client = AsyncGroq(
+                api_key=GROQ_API_KEY,
+                # Retries are handled by the governor
+                max_retries=0,
+            )
+            # set the backward model to evaluate the summaries
+            tg.set_backward_engine(BACKWARD_ENGINE, override=True)
+        self.client = client
+        self.model_name = model
+        self.temperature = temperature
+
   
     def get_model_schema(self, task):
-        if task == AgentTask.TASK_ANALYZER:
-            return json.dumps(TaskAnalyzerOutput.model_json_schema(), indent=2)
-        elif task == AgentTask.UI_PLANNER:
-            return json.dumps(UIPlannerOutput.model_json_schema(), indent=2)
-        elif task == AgentTask.UI_BUILDER:
-            return json.dumps(UIAgentOutput.model_json_schema(), indent=2)
-        return None
-    
+        return prompt_registry.schema(task)
+
     def get_detailed_requirements(self, problem_type):
-        logger.info('[LLMPipeline] - Getting detailed requirements for problem type: %s compared with %s', problem_type, ProblemTask.IMAGE_CLASSIFICATION)
-        if problem_type == ProblemTask.TEXT_CLASSIFICATION.value:
-            return '''
-                1. Receive a text passage input from the user.,
-                2. Send a POST request to the API endpoint: http://34.142.220.207:8000/api/text-classification with payload: { \"texts\": <text_passage> }.,
-                3. Receive a response which is a list of objects containing:,
-                    - label: the predicted emotion label,
-                    - score: the probability of that emotion,
-                    Below is an example response:
-                        "data": [
-                            [
-                                {
-                                    "label": "anger",
-                                    "score": 0.006408268585801125
-                                },
-                                ...
-                            ]
-                        ]
-                4. Sort the list by 'score' in descending order.,
-                5. Select the emotion with the highest score as the final predicted emotion.,
-                6. Map this predicted emotion to its corresponding emoji:,
-                    - anger: 😠,
-                    - disgust: 🤢,
-                    - fear: 😨,
-                    - joy: 😄,
-                    - neutral: 😐,
-                    - sadness: 😢,
-                    - surprise: 😲,
-                7. Display the following for each input:,
-                    - input_text: The original input text passage.,
-                    - predicted_emotion: The emotion with the highest score.,
-                    - emotion_probabilities: All emotion labels and their scores.,
-                    - emotion_emoji: The emoji corresponding to the predicted emotion.
-            '''
-        elif problem_type == ProblemTask.IMAGE_CLASSIFICATION.value:
-            
-            return '''
-                1. Convert the uploaded image to base64 format.,
-                2. Send a POST request to the API endpoint: http://34.142.220.207:8000/api/image-classification with JSON payload: { \"data\": <base64_string> }.,
-                3. Receive a response with raw logits for 1000 ImageNet classes in the following format:
-                    "data": 
-                        [
-                            [
-                                -2.800873279571533,
-                                -3.0401227474212646,
-                                -3.838620662689209,
-                                ....,
-                            ]
-                        ]
-                4. Convert the logits to a NumPy array.,
-                5. Apply softmax to get class probabilities.,
-                6. Find the index of the highest probability using np.argmax.,
-                7. Load label_mapping.json and map the index to its human-readable label.,
-                8. Display the following for each image:,
-                    - The input image,
-                    - The predicted label (from label_mapping.json),
-                    - The probability score of that label (as a percentage or decimal)
-            '''
-        elif problem_type == ProblemTask.AUDIO_CLASSIFICATION.value:
-            return '''
-        
-            '''
-        elif problem_type == ProblemTask.OBJECT_DETECTION.value:
-            return '''
-        
-            '''
-        elif problem_type == ProblemTask.TABULAR_QUESTION_ANSWERING.value:
-            return '''
-        
-            '''
-        return None
+        return prompt_registry.requirements(problem_type)
 
     def get_role_prompt(self, task):
-        return self.role_prompts.get(task, None)
+        entry = prompt_registry.system_prompt(task)
+        return entry.text if entry else None
     
     def set_prompt(self, input, task):
         match(task):
@@ -299,43 +115,128 @@ class LLMPipeline:
         
         return None
         
-    async def generate_content(self, task, prompt, problem_type=None):
-        print(f"Model name: {MODEL_NAME}")
-        role_prompt = self.get_role_prompt(task)
-        if not MODEL_NAME:
+    def _build_role_prompt(self, task, problem_type=None):
+        if not self.model_name:
             raise ValueError("MODEL_NAME is not set. Please set it in the config file.")
-        if problem_type:
-            detailed_requirements = self.get_detailed_requirements(problem_type)
-            logger.info('[LLMPipeline] - Detailed requirements for problem type %s: %s', problem_type, detailed_requirements)
-            if detailed_requirements:
-                role_prompt = f'''
-                    {role_prompt}
-                    Below are the detailed requirements for the problem type {problem_type}:
-                    {detailed_requirements}
-                '''
-        logger.info('[LLMPipeline] - Role prompt: %s', role_prompt)
-        chat_completion = await self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"{role_prompt}\n"
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    }
-                ],
-                model=MODEL_NAME,
-                temperature=0,
-                stream=False,
+        return prompt_registry.system_prompt(task, problem_type)
+
+    def _build_messages(self, task, system_prompt, prompt):
+        return prompt_assembler.messages(task.value, system_prompt, prompt)
+
+    async def _memoize(self, task, memo_key, content, validator=None):
+        # Only memoize outputs the caller accepts, otherwise retries would replay the same bad output
+        if validator is not None:
+            try:
+                validator(content)
+            except Exception:
+                return
+        await stage_memo.set(task, memo_key, content)
+
+    async def generate_content(self, task, prompt, problem_type=None, validator=None, temperature=None, seed=None):
+        print(f"Model name: {self.model_name}")
+        temperature = self.temperature if temperature is None else temperature
+        # Only sent when set, so single-candidate calls are unchanged
+        sampling = {} if seed is None else {"seed": seed}
+        system_prompt = self._build_role_prompt(task, problem_type)
+        memo_key = stage_memo.make_key(task, system_prompt.text, prompt, self.model_name, temperature, variant=seed)
+        cached = await stage_memo.get(task, memo_key)
+        if cached is not None:
+            return cached
+        messages = self._build_messages(task, system_prompt, prompt)
+
+        async def complete():
+            with stage_timer(task.value):
+                chat_completion = await governor.call(
+                    lambda: self.client.chat.completions.create(
+                        messages=messages,
+                        model=self.model_name,
+                        temperature=temperature,
+                        stream=False,
+                        response_format={"type": "json_object"},
+                        **sampling,
+                    ),
+                    messages,
+                    stage=task.value,
+                )
+            record_usage(task.value, chat_completion.usage)
+            content = chat_completion.choices[0].message.content
+            await self._memoize(task, memo_key, content, validator)
+            return content
+
+        # Identical prompts in flight at the same time (e.g. duplicate specs of a batch) share one completion
+        return await stage_memo.coalesce(memo_key, complete)
+
+    async def stream_content(self, task, prompt, problem_type=None, validator=None):
+        """
+        Same as generate_content, but yields the completion in chunks as they arrive from Groq.
+        """
+        system_prompt = self._build_role_prompt(task, problem_type)
+        memo_key = stage_memo.make_key(task, system_prompt.text, prompt, self.model_name, self.temperature)
+        cached = await stage_memo.get(task, memo_key)
+        if cached is not None:
+            yield cached
+            return
+        started_at = time.perf_counter()
+        messages = self._build_messages(task, system_prompt, prompt)
+        stream = await governor.call(
+            lambda: self.client.chat.completions.create(
+                messages=messages,
+                model=self.model_name,
+                temperature=self.temperature,
+                stream=True,
                 response_format={"type": "json_object"},
-            )
-        return chat_completion.choices[0].message.content
+            ),
+            messages,
+            stage=task.value,
+        )
+        chunks = []
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                chunks.append(delta)
+                yield delta
+            # Groq reports usage on the last chunk
+            x_groq = getattr(chunk, "x_groq", None)
+            if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+                record_usage(task.value, x_groq.usage)
+        record_timing(task.value, time.perf_counter() - started_at)
+        await self._memoize(task, memo_key, "".join(chunks), validator)
+
+    async def analyze_locally(self, task_spec: str):
+        """
+        Map a well-formed task.yaml straight to the Task Analyzer output. The LLM only writes the free-text
+        fields the spec leaves out, in one short call. Returns None when the spec needs the Task Analyzer.
+        """
+        mapping = map_spec(task_spec) if LOCAL_SPEC_MAPPING else None
+        if mapping is None:
+            return None
+        values = {}
+        if mapping.missing:
+            logger.info('[Task Analyzer] - Asking the model for %s', ", ".join(mapping.missing))
+            prompt = set_task_spec_fill_prompt(task_spec, mapping.missing)
+            try:
+                values = _require_json(await self.generate_content(task=AgentTask.SPEC_FILL, prompt=prompt,
+                                                                   validator=_require_json))
+            except Exception as e:
+                logger.warning('[Task Analyzer] - Could not fill %s: %s', ", ".join(mapping.missing), e)
+                return None
+        try:
+            task = mapping.fill(values)
+        except ValueError:
+            return None
+        processed_task = compact_json(task.model_dump(mode="json"))
+        logger.info('[Task Analyzer] - Mapped task locally: %s', processed_task)
+        return processed_task
 
     async def task_analyze(self, task_spec: str) -> TaskAnalyzerOutput | None:
+        processed_task = await self.analyze_locally(task_spec)
+        if processed_task is not None:
+            return processed_task
         prompt = self.set_prompt(task_spec, task=AgentTask.TASK_ANALYZER)
         try:
-            processed_task = await self.generate_content(task=AgentTask.TASK_ANALYZER, prompt=prompt)
+            processed_task = await self.generate_content(task=AgentTask.TASK_ANALYZER, prompt=prompt, validator=_require_json)
+            # Re-serialize without nulls and whitespace, the planner pays for every token of it
+            processed_task = compact_json(_require_json(processed_task))
             logger.info('[Task Analyzer] - Processed task: %s', processed_task)
         except Exception as e:
             print(e)
@@ -345,37 +246,122 @@ class LLMPipeline:
     async def ui_planner(self, task_desc: str) -> UIPlannerOutput | None:
         prompt = self.set_prompt(task_desc, task=AgentTask.UI_PLANNER)
         try:
-            raw_plan = await self.generate_content(task=AgentTask.UI_PLANNER, prompt=prompt)
+            raw_plan = await self.generate_content(task=AgentTask.UI_PLANNER, prompt=prompt, validator=_require_json)
+            raw_plan = compact_json(_require_json(raw_plan))
             logger.info('[UI Planner] - UI Plan: %s', raw_plan)
         except Exception as e:
             print(e)
             return {"error": "Invalid JSON response from the model."}
         return raw_plan
 
+    async def repair(self, task, content):
+        """
+        Turn an invalid stage output into a validated model, locally when possible and
+        otherwise with one short repair call that only carries the validation errors.
+        """
+        code, _, errors = repair_output(task, content)
+        if code is not None:
+            return code
+        logger.info('[Repair] - Asking the model to fix %s output: %s', task.value, errors)
+        stage_retries.inc(stage=AgentTask.JSON_REPAIR.value)
+        prompt = set_task_json_repair_prompt(content, errors)
+        try:
+            repaired = await self.generate_content(task=AgentTask.JSON_REPAIR, prompt=prompt)
+        except Exception as e:
+            logger.error('[Repair] - Repair call failed: %s', e)
+            return None
+        code, _, errors = repair_output(task, repaired)
+        if code is None:
+            logger.warning('[Repair] - %s output still invalid after repair: %s', task.value, errors)
+        return code
+
+    async def patch_page(self, page, changes, urls=()):
+        """
+        Update a generated page for changed analysis fields with one UI_PATCH call returning find/replace
+        edits. The patched page must pass the local candidate checks, otherwise None is returned.
+        """
+        changes = compact_json({path: {"old": old, "new": new} for path, (old, new) in changes.items()})
+        prompt = set_task_ui_patch_prompt(page, changes)
+        try:
+            content = await self.generate_content(task=AgentTask.UI_PATCH, prompt=prompt, validator=_require_json)
+        except Exception as e:
+            logger.error('[UI Patch] - Patch call failed: %s', e)
+            return None
+        edits = parse_edits(content)
+        patched = apply_edits(page, edits) if edits is not None else None
+        if patched is None:
+            return None
+        score = score_candidate(UIAgentOutput(html=patched, css="", js=""), urls)
+        if not score.passed:
+            logger.info('[UI Patch] - Rejected patched page: %s', score)
+            return None
+        logger.info('[UI Patch] - Applied %s edits for %s', len(edits), changes)
+        return patched
+
+    def _required_urls(self, problem_type, plan):
+        urls = required_urls(self.get_detailed_requirements(problem_type))
+        if not urls:
+            api_call = (extract_json(plan) or {}).get("api_call")
+            if isinstance(api_call, dict):
+                urls = required_urls(api_call.get("url"))
+        return urls
+
+    async def _best_candidate(self, problem_type, plan, prompt):
+        """
+        Generate BUILDER_CANDIDATES builder outputs concurrently and keep the best one by local score.
+        Returns (code, CandidateScore), or None when no candidate could be parsed.
+        """
+        urls = self._required_urls(problem_type, plan)
+
+        async def candidate(index):
+            # The first candidate is the regular completion, the others are sampled
+            temperature = self.temperature if index == 0 else max(self.temperature, BUILDER_CANDIDATE_TEMPERATURE)
+            content = await self.generate_content(task=AgentTask.UI_BUILDER, prompt=prompt, problem_type=problem_type,
+                                                  validator=_require_ui_output, temperature=temperature,
+                                                  seed=index or None)
+            code, _, _ = repair_output(AgentTask.UI_BUILDER, content)
+            return None if code is None else (code, score_candidate(code, urls))
+
+        results = await asyncio.gather(*(candidate(i) for i in range(BUILDER_CANDIDATES)), return_exceptions=True)
+        scored = [result for result in results if result and not isinstance(result, BaseException)]
+        for _, score in scored:
+            builder_candidates.inc(result="passed" if score.passed else "failed")
+        if not scored:
+            return None
+        # max keeps the earliest candidate on ties, which is the unsampled one
+        code, score = max(scored, key=lambda item: item[1].score)
+        logger.info('[UI Builder] - Best of %s candidates: %s', len(scored), score)
+        return code, score
+
     async def ui_builder(self, problem_type, plan, optimize=False):
         prompt = self.set_prompt(plan, task=AgentTask.UI_BUILDER)
+        if BUILDER_CANDIDATES > 1:
+            best = await self._best_candidate(problem_type, plan, prompt)
+            if best is not None:
+                code, _ = best
+                if not optimize:
+                    return code
+                # The critic scores the candidate again and skips it when it passes
+                return await self._optimize_code(plan, code, problem_type)
         initial_code = None
-        response_feedback = None
-        try:
-            content = await self.generate_content(task=AgentTask.UI_BUILDER, prompt=prompt, problem_type=problem_type)
-            code = UIAgentOutput.model_validate_json(content)
-            logger.info('[UI Builder] - Generated code: %s', code)
-            initial_code = code
-        except Exception as e:
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    prompt = self.set_prompt(plan, task=AgentTask.UI_BUILDER)
-                    content = await self.generate_content(task=AgentTask.UI_BUILDER, prompt=prompt, problem_type=problem_type)
-                    logger.info('[UI Builder] - Retries generated code: %s', content)
-                    # code = UIAgentOutput.model_validate_json(content)
-                    initial_code = content
-                    break
-                except Exception as retry_e:
-                    if attempt == max_retries - 1:
-                        logger.error('[UI Builder] - Failed to generate code after retries: %s', retry_e)
-                        return {"error": "Invalid JSON response from the model after retries."}
-                    await asyncio.sleep(1.5)
+        # Rate limits and transport errors are retried by the governor, only invalid output is regenerated here
+        for attempt in range(BUILDER_MAX_ATTEMPTS):
+            if attempt:
+                stage_retries.inc(stage=AgentTask.UI_BUILDER.value)
+            try:
+                content = await self.generate_content(task=AgentTask.UI_BUILDER, prompt=prompt, problem_type=problem_type, validator=_require_ui_output)
+            except Exception as e:
+                logger.error('[UI Builder] - Failed to generate code: %s', e)
+                return {"error": "Invalid JSON response from the model after retries."}
+            # Repair before regenerating, a full generation is the most expensive call of the pipeline
+            code = await self.repair(AgentTask.UI_BUILDER, content)
+            if code is not None:
+                initial_code = code
+                logger.info('[UI Builder] - Generated code: %s', initial_code)
+                break
+            logger.warning('[UI Builder] - Invalid code on attempt %s', attempt + 1)
+            # Keep the raw output as a last resort, the critic can still repair it
+            initial_code = content
         if optimize:
             # _optimize_code is async, so just await it directly
             final_code = await self._optimize_code(plan, initial_code, problem_type)
@@ -385,45 +371,69 @@ class LLMPipeline:
     
 
     async def _optimize_code(self, original_input, initial_code, problem_type):
+        """
+        Run the TextGrad critic on the builder output until it passes the local checks, for at most
+        CRITIC_MAX_STEPS steps within the request's CriticBudget. Returns the best-scoring version.
+        """
+        urls = self._required_urls(problem_type, original_input)
+        best, best_score = initial_code, self._score_code(initial_code, urls)
+        if best_score is not None and best_score.passed and CRITIC_SKIP_PASSING:
+            logger.info('[UI Critic] - Skipped, the builder output passes the local checks')
+            critic_runs.inc(result="skipped")
+            return initial_code
         if hasattr(initial_code, "model_dump"):
             serializable_code = initial_code.model_dump()
         else:
             serializable_code = initial_code
-        detailed_requirements = self.get_detailed_requirements(problem_type)
-        role_description = self.get_role_prompt(AgentTask.UI_CRITIC)
-        if detailed_requirements:
-            role_description = f'''
-                {role_description}
-                Below are the detailed requirements for the problem type {problem_type}:
-                {detailed_requirements}
-            '''
+        role_description = prompt_registry.system_prompt(AgentTask.UI_CRITIC, problem_type).text
         input_code = tg.Variable(json.dumps(serializable_code),
                 role_description=role_description,
                 requires_grad=True)
-        self._set_optimization_instruction(original_input, initial_code, response_feedback=None)
-        self.optimizer = tg.TGD(parameters=[input_code])
+        budget = CriticBudget()
+        result = "exhausted"
+        for step in range(CRITIC_MAX_STEPS):
+            feedback = "; ".join(best_score.issues) if best_score is not None else None
+            self._set_optimization_instruction(original_input, input_code.value, response_feedback=feedback)
+            tokens = estimate_step_tokens(self.evaluation_instruction, input_code.value)
+            if not budget.allows(tokens):
+                result = "budget"
+                break
+            budget.spend(tokens)
+            # The TextGrad step makes blocking calls to the backward engine, keep it off the event loop
+            try:
+                with stage_timer(AgentTask.UI_CRITIC.value):
+                    loss = await asyncio.wait_for(
+                        optimization_executor.run(self._run_optimization_step, input_code, self.evaluation_instruction),
+                        timeout=budget.remaining_seconds(),
+                    )
+            except asyncio.TimeoutError:
+                # The step finishes in its thread and keeps its executor slot until then, its result is dropped
+                logger.warning('[UI Critic] - Step %s exceeded the time budget', step + 1)
+                result = "budget"
+                break
+            logger.info("Loss value: %s", loss.value)
+            code, _, _ = repair_output(AgentTask.UI_BUILDER, input_code.value)
+            score = self._score_code(code, urls)
+            logger.info('[UI Critic] - Step %s: %s', step + 1, score)
+            if code is not None and (best_score is None or score.score >= best_score.score):
+                best, best_score = code, score
+            if best_score is not None and best_score.passed:
+                result = "passed"
+                break
+        critic_runs.inc(result=result)
+        logger.info("Optimized code: %s", best)
+        return best
 
-        # TextLoss is a natural-language specified loss function that describes
-        # how we want to evaluate the reasoning.
-        loss_fn = tg.TextLoss(self.evaluation_instruction)
+    def _score_code(self, code, urls):
+        return score_candidate(code, urls) if isinstance(code, UIAgentOutput) else None
+
+    def _run_optimization_step(self, input_code, evaluation_instruction):
+        """
+        Run one blocking TextGrad step on `input_code`, meant to be called from the optimization executor.
+        The optimizer and loss of the executor thread are reused across requests.
+        """
+        return critic_session().step(input_code, evaluation_instruction)
 
-        # Step 3: Do the loss computation, backward pass, and update the punchline.
-        # Exact same syntax as PyTorch!
-        loss = loss_fn(input_code)
-        loss.backward()
-        self.optimizer.step()
-        self.optimizer.zero_grad()
-        
-        logger.info(vars(input_code))
-        logger.info("%s Nothing here", input_code.get_gradient_text())
-        logger.info("Loss value: %s", loss.value)
-    
-        logger.info("Optimized code: %s", input_code.value)
-        try:
-            return json.loads(input_code.value)
-        except Exception:
-            return input_code.value
-    
     def _optimize_prompt(self, article, initial_summary, response_feedback):
         prompt = self.set_prompt(article, task = "summary")
         input_prompt = tg.Variable(prompt,
@@ -1,3 +1,187 @@
+from app.constant import AgentTask
+
+# System prompt of every agent, the per-problem-type requirements are appended by the prompt registry
+ROLE_PROMPTS = {
+    AgentTask.TASK_ANALYZER : '''
+        You are a Task Analyzer Agent. Your job is to read a YAML file that defines a machine learning task, and output a standardized JSON format including task type, input/output formats, model information, visualization features, and dataset description.
+        Respond only with JSON using this format:
+        """
+        {
+            "task_type": {
+                "type": "string", 
+                "description": "string"
+            },
+            "input_output": {
+                "input": "string",
+                "output": "string"
+            },
+            "model_info": {
+                "api_url": "string",
+                "name": "string",
+                "input_format": {
+                "type": "json | base64 | multipart | ...",
+                "structure": {
+                    "key": {
+                    "type": "string",
+                    "encoding": "optional string",
+                    "description": "string"
+                    }
+                }
+                },
+                "output_format": {
+                "type": "array | json | string",
+                "description": "string",
+                "post_processing": {
+                    "optional string key": "description"
+                },
+                "guidance": ["step1", "step2"]
+                }
+            },
+            "visualization": {
+                "description": "string",
+                "features": [
+                {
+                    "name": "list_display | input_function",
+                    "description": "string",
+                    "fields": [
+                    { "name": "string", "description": "string" }
+                    ],
+                    "steps": ["optional steps"]
+                }
+                ]
+            },
+            "dataset": {
+                "data_path": "string",
+                "description": "string",
+                "supported_formats": ["jpg", "png", ...],
+                "other_data": "optional string"
+            }
+        }
+        """
+    ''',
+    AgentTask.UI_PLANNER: '''
+        You are a UI Planner Agent. Based on a task description, generate a clean UI Blueprint schema. The schema should define layout, input fields, output display types, and API interaction settings. 
+        Ensure the task description is clearly kept again and the UI is user-friendly, especially the output format and model input structure.
+        Your output must be valid JSON, matching a UI schema format like this:
+        """
+            {
+                "title": "string",
+                "description": "string",
+                "task_description": "string",
+                "layout": "responsive_card | wizard | dashboard",
+                "navbar": [
+                    { "label": "string", "target": "#anchor_id" }
+                ],
+                "inputs": [
+                    {
+                    "type": "file_upload | text_input | dropdown",
+                    "label": "string",
+                    "accept": ["jpg", "png"],
+                    "drag_and_drop": true,
+                    "input_id": "string"
+                    }
+                ],
+                "actions": [
+                    {
+                    "type": "button",
+                    "label": "string",
+                    "on_click": "string (handler name)"
+                    }
+                ],
+                "api_call": {
+                    "url": "string",
+                    "method": "POST",
+                    "input_structure": {
+                        "field": "value"
+                    },
+                    "response_mapping": {
+                        "label": "predicted_label",
+                        "score": "probability"
+                    }
+                },
+                "outputs": [
+                    {
+                    "type": "image_result | table | text_block",
+                    "output_id": "string",
+                    "fields": [
+                        { "name": "string", "label": "string", "type": "text | image | bar" }
+                    ],
+                    "list_display": true
+                    }
+                ],
+                "dataset_info": {
+                    "description": "string",
+                    "path": "string",
+                    "formats": ["jpg", "png"],
+                    "label_mapping": "optional string"
+                },
+                "footer": {
+                    "info": "string",
+                    "api_url": "string",
+                    "version": "string"
+                },
+                "visualization_features": {
+                    "image_preview": true,
+                    "probability_bar": true,
+                    "list_display": true
+                },
+                "accessibility": {
+                    "keyboard_navigation": true,
+                    "screen_reader": true
+                },
+                "error_handling": {
+                    "invalid_format": "string",
+                    "empty_upload": "string",
+                    "api_error": "string"
+                }
+            }
+        """
+    ''',
+    AgentTask.UI_BUILDER: '''
+        You are a UI Generator Agent. Given a UI Blueprint, you must generate working HTML, CSS, JS code with highly interactive components and eye-catching effects. 
+        The component should allow users to input data, call the model API ASYNCHRONOUSLY and avoid CORS errors, then display the output results as specified. 
+        Focus on task description for not missing any steps and ensure the API url correctly.
+        Note that if the task related to image, image must be convert to base64 string and passed to the model API.
+        Double check the input structure and output mapping to ensure the API call is correct.
+        Don't use any external libraries, just use pure HTML, CSS, JS.
+        Respond only in JSON string with html, css, js in only one code block with below format:
+        """
+        {
+            "code": "<!DOCTYPE html>\\n<html>\\n<head>\\n<style>body { font-family: Arial; }</style>\\n</head>\\n<body>\\n<input type=\\\"file\\\" id=\\\"imageInput\\\" />\\n<button onclick=\\\"sendImage()\\\">Submit</button>\\n<pre id=\\\"output\\\"></pre>\\n<script>async function sendImage() { const reader = new FileReader(); reader.onload = function() { await fetch('/api/model', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ image: reader.result }) }).then(res => res.json()).then(data => document.getElementById('output').innerText = JSON.stringify(data, null, 2)); }; reader.readAsDataURL(document.getElementById('imageInput').files[0]); }</script>\\n</body>\\n</html>"
+        }
+        """
+    ''',
+    AgentTask.UI_CRITIC: '''
+        You are a UI Critic Agent, a master code reviewer. You will review HTML, CSS, JS code in a given code block and provide feedback about its usability, completeness, possible bugs, and improve it. 
+        Respond with the optimized code ensure has enough HTML, CSS, JS, API called ASYNCHRONOUSLY, especially focusing on handling response data from the model API, syntax correctness and displaying it in the UI.
+        Don't use any external libraries, just use pure HTML, CSS, JS, ensure the API url correctly.
+        Based on the following requirements, provide a detailed review and optimization of the code:
+    ''',
+    AgentTask.JSON_REPAIR: '''
+        You are a JSON Repair Agent. You receive an output that failed schema validation and the list of validation errors.
+        Fix only what the errors point at and keep everything else unchanged.
+        Respond only with the corrected JSON object.
+    ''',
+    AgentTask.SPEC_FILL: '''
+        You are a Task Analyzer Agent. You receive a task.yaml file that defines a machine learning task and a list of fields it leaves out.
+        Write each missing field as a short plain-text sentence based only on the task.yaml.
+        Respond only with a JSON object mapping every listed field name to its text.
+    ''',
+    AgentTask.UI_PATCH: '''
+        You are a UI Patch Agent. You receive a working HTML page generated for a machine learning task and the fields of the task that changed since, with their old and new values.
+        Update the page for the new values with the smallest possible edits, keep everything else unchanged, including the API call being asynchronous.
+        Respond only with JSON using this format:
+        """
+        {
+            "edits": [
+                { "find": "exact snippet of the current page, unique in it", "replace": "new snippet" }
+            ]
+        }
+        """
+    '''
+}
+
+
 def set_task_analyzer_prompt(task_spec):
     """
     Set the prompt for the task of analyzing a given task specification.
@@ -26,4 +210,31 @@ def set_task_ui_builder_prompt(task_desc):
 
         Task Description: {task_desc}
         """
-        
\ No newline at end of file
+
+def set_task_json_repair_prompt(content, errors):
+    """Set the prompt for the task of repairing an output that failed schema validation.
+    """
+    return f"""
+        The following output failed validation with these errors:
+        {errors}
+
+        Output: {content}
+        """
+
+def set_task_spec_fill_prompt(task_spec, fields):
+    """Set the prompt for the task of writing the free-text fields a task specification leaves out.
+    """
+    return f"""
+        Missing fields: {", ".join(fields)}
+
+        Task Specification: {task_spec}
+        """
+
+def set_task_ui_patch_prompt(page, changes):
+    """Set the prompt for the task of patching a generated page after its task specification changed.
+    """
+    return f"""
+        Changed fields: {changes}
+
+        Page: {page}
+        """
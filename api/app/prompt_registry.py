@@ -0,0 +1,161 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from os.path import dirname, join
+
+import yaml
+
+from app.compaction import compact_text, count_tokens
+from app.config import PROMPT_DIR, PROMPT_RELOAD_INTERVAL
+from app.constant import AgentTask
+from app.prompt import ROLE_PROMPTS
+from app.schema import TaskAnalyzerOutput, UIAgentOutput, UIPlannerOutput
+from app.util import logger
+
+BUILTIN_PROMPT_DIR = join(dirname(__file__), "prompts")
+
+# Modules whose code shapes the prompts and the templated pages, hashed into the fingerprint with the drop-in files
+_PROMPT_SOURCES = ("prompt.py", "pipeline.py", "prompt_registry.py", "templates.py")
+
+STAGE_SCHEMAS = {
+    AgentTask.TASK_ANALYZER: TaskAnalyzerOutput,
+    AgentTask.UI_PLANNER: UIPlannerOutput,
+    AgentTask.UI_BUILDER: UIAgentOutput,
+}
+
+
+class PromptEntry:
+    """
+    A final system prompt: compacted text plus its estimated token counts before and after compaction.
+    """
+
+    __slots__ = ("text", "raw_tokens", "tokens")
+
+    def __init__(self, raw):
+        self.text = compact_text(raw)
+        self.raw_tokens = count_tokens(raw)
+        self.tokens = count_tokens(self.text)
+
+
+def _with_requirements(role_prompt, problem_type, requirements):
+    return f'''
+        {role_prompt}
+        Below are the detailed requirements for the problem type {problem_type}:
+        {requirements}
+    '''
+
+
+class PromptSnapshot:
+    """
+    Immutable view of every system prompt and schema, swapped as a whole on reload.
+    """
+
+    def __init__(self, requirements, fingerprint):
+        self.requirements = requirements
+        self.fingerprint = fingerprint
+        self.prompts = {}
+        for task, role_prompt in ROLE_PROMPTS.items():
+            self.prompts[(task, None)] = PromptEntry(role_prompt)
+            for problem_type, text in requirements.items():
+                self.prompts[(task, problem_type)] = PromptEntry(_with_requirements(role_prompt, problem_type, text))
+        self.schemas = {task: json.dumps(model.model_json_schema(), indent=2) for task, model in STAGE_SCHEMAS.items()}
+
+
+class PromptRegistry:
+    """
+    System prompts and schema JSON keyed by AgentTask and problem type, built once and shared by every pipeline.
+    Per-problem-type requirements come from YAML drop-in files (`problem_type` and `requirements` keys)
+    in app/prompts and PROMPT_DIR; the files are checked every PROMPT_RELOAD_INTERVAL seconds and the
+    registry is rebuilt when they change, so every worker picks up edits without a restart.
+    """
+
+    def __init__(self, directories, reload_interval=PROMPT_RELOAD_INTERVAL):
+        self.directories = [directory for directory in directories if directory]
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._signature = None
+        self._snapshot = None
+        self.reload()
+
+    def _files(self):
+        files = []
+        for directory in self.directories:
+            files.extend(sorted(glob.glob(join(directory, "*.yaml")) + glob.glob(join(directory, "*.yml"))))
+        return files
+
+    def _signature_of(self, files):
+        signature = []
+        for path in files:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def reload(self):
+        """
+        Rebuild the snapshot from the drop-in files. A broken file is logged and skipped.
+        """
+        with self._lock:
+            files = self._files()
+            digest = hashlib.sha256()
+            sources = [join(dirname(__file__), name) for name in _PROMPT_SOURCES]
+            sources.extend(sorted(glob.glob(join(dirname(__file__), "templates", "*.html"))))
+            for path in sources:
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+            requirements = {}
+            for path in files:
+                try:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                    spec = yaml.safe_load(data)
+                    problem_type = str(spec["problem_type"])
+                    text = (spec.get("requirements") or "").strip()
+                except (OSError, yaml.YAMLError, KeyError, TypeError) as e:
+                    logger.error('[PromptRegistry] - Skipping %s: %s', path, e)
+                    continue
+                digest.update(data)
+                # Later directories override earlier ones, blank requirements remove a built-in entry
+                if text:
+                    requirements[problem_type] = text
+                else:
+                    requirements.pop(problem_type, None)
+            self._snapshot = PromptSnapshot(requirements, digest.hexdigest()[:16])
+            self._signature = self._signature_of(files)
+            self._checked_at = time.monotonic()
+        logger.info('[PromptRegistry] - Loaded %s problem types, fingerprint %s',
+                    len(requirements), self._snapshot.fingerprint)
+        return self._snapshot
+
+    def snapshot(self):
+        if self.reload_interval > 0 and time.monotonic() - self._checked_at >= self.reload_interval:
+            self._checked_at = time.monotonic()
+            if self._signature_of(self._files()) != self._signature:
+                return self.reload()
+        return self._snapshot
+
+    @property
+    def fingerprint(self):
+        return self.snapshot().fingerprint
+
+    def system_prompt(self, task, problem_type=None):
+        prompts = self.snapshot().prompts
+        return prompts.get((task, problem_type)) or prompts.get((task, None))
+
+    def requirements(self, problem_type):
+        return self.snapshot().requirements.get(problem_type)
+
+    def schema(self, task):
+        return self.snapshot().schemas.get(task)
+
+    def problem_types(self):
+        return sorted(self.snapshot().requirements)
+
+
+prompt_registry = PromptRegistry([BUILTIN_PROMPT_DIR, PROMPT_DIR])
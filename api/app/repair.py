@@ -0,0 +1,200 @@
+import json
+import re
+from typing import Union, get_args, get_origin
+
+from pydantic import BaseModel, ValidationError
+
+from app.constant import AgentTask
+from app.schema import TaskAnalyzerOutput, UIAgentOutput, UIPlannerOutput
+from app.util import logger
+
+STAGE_MODELS = {
+    AgentTask.TASK_ANALYZER: TaskAnalyzerOutput,
+    AgentTask.UI_PLANNER: UIPlannerOutput,
+    AgentTask.UI_BUILDER: UIAgentOutput,
+}
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*\n?(.*?)```", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+_MAX_COERCION_PASSES = 5
+
+
+def _balanced_object(text):
+    """
+    Return the first balanced {...} block of `text`, ignoring braces inside strings.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def extract_json(text):
+    """
+    Tolerantly parse a JSON object out of a completion: code fences, surrounding prose,
+    raw control characters in strings and trailing commas are accepted. Returns None when nothing parses.
+    """
+    if not text:
+        return None
+    candidates = [text]
+    candidates.extend(match.group(1) for match in _FENCE.finditer(text))
+    block = _balanced_object(text)
+    if block:
+        candidates.append(block)
+    for candidate in candidates:
+        for attempt in (candidate, _TRAILING_COMMA.sub(r"\1", candidate)):
+            try:
+                # strict=False accepts raw newlines and tabs inside strings
+                value = json.loads(attempt.strip(), strict=False)
+            except ValueError:
+                continue
+            if isinstance(value, dict):
+                return value
+    return None
+
+
+def _set_at(data, loc, value):
+    target = data
+    for key in loc[:-1]:
+        target = target[key]
+    target[loc[-1]] = value
+
+
+def _get_at(data, loc):
+    target = data
+    for key in loc:
+        target = target[key]
+    return target
+
+
+def _annotation_at(model, loc):
+    """
+    Type annotation of the field `loc` points at in `model`, or None when it cannot be resolved.
+    """
+    annotation = model
+    for key in loc:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if get_origin(annotation) is Union and len(args) == 1:
+            annotation = args[0]
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            field = annotation.model_fields.get(key)
+            if field is None:
+                return None
+            annotation = field.annotation
+        elif get_origin(annotation) is list and isinstance(key, int):
+            annotation = get_args(annotation)[0]
+        elif get_origin(annotation) is dict and isinstance(key, str):
+            annotation = get_args(annotation)[1]
+        else:
+            return None
+    return annotation
+
+
+def _nullable(model, loc):
+    return type(None) in get_args(_annotation_at(model, loc))
+
+
+def coerce_model(model: type[BaseModel], data):
+    """
+    Validate `data` against `model`, patching the usual LLM slips between passes:
+    missing Optional fields, scalars where lists are expected and non-string values in string fields.
+    Required fields that are missing or null are never invented. Returns the model instance,
+    or raises the last ValidationError.
+    """
+    for _ in range(_MAX_COERCION_PASSES):
+        try:
+            return model.model_validate(data)
+        except ValidationError as e:
+            error = e
+        patched = False
+        for item in error.errors():
+            loc = item["loc"]
+            if not loc:
+                continue
+            try:
+                if item["type"] == "missing":
+                    if not _nullable(model, loc):
+                        continue
+                    _set_at(data, loc, None)
+                elif item["type"] in ("string_type", "list_type"):
+                    current = _get_at(data, loc)
+                    if current is None:
+                        # A null required field is as missing as an absent one
+                        continue
+                    if item["type"] == "string_type":
+                        _set_at(data, loc, json.dumps(current, ensure_ascii=False))
+                    else:
+                        _set_at(data, loc, [current])
+                else:
+                    continue
+                patched = True
+            except (KeyError, IndexError, TypeError):
+                continue
+        if not patched:
+            break
+    raise error
+
+
+def _ui_output_shape(data):
+    """
+    Map the {"code": "<!DOCTYPE html>..."} shape the builder role prompt asks for onto UIAgentOutput.
+    """
+    if "code" in data and "html" not in data:
+        code = data["code"]
+        if isinstance(code, dict):
+            return code
+        # The whole document stays in html so nothing is duplicated when the parts are combined
+        return {"html": code, "css": data.get("css", ""), "js": data.get("js", "")}
+    return data
+
+
+def repair_output(task, content):
+    """
+    Repair a stage completion locally. Returns (model instance or None, parsed dict or None, error text).
+    """
+    model = STAGE_MODELS.get(task)
+    data = extract_json(content)
+    if data is None:
+        stripped = (content or "").strip()
+        if task == AgentTask.UI_BUILDER and stripped.lower().startswith(("<!doctype", "<html")):
+            return UIAgentOutput(html=stripped, css="", js=""), {"html": stripped}, None
+        return None, None, "The response is not a JSON object."
+    if task == AgentTask.UI_BUILDER:
+        data = _ui_output_shape(data)
+    if model is None:
+        return None, data, None
+    try:
+        return coerce_model(model, data), data, None
+    except ValidationError as e:
+        logger.info('[Repair] - %s output still invalid after coercion: %s', task.value, e.error_count())
+        return None, data, _summarize_errors(e)
+
+
+def _summarize_errors(error: ValidationError, limit=10):
+    lines = []
+    for item in error.errors()[:limit]:
+        path = ".".join(str(part) for part in item["loc"]) or "<root>"
+        lines.append(f"- {path}: {item['msg']}")
+    if error.error_count() > limit:
+        lines.append(f"- ... {error.error_count() - limit} more")
+    return "\n".join(lines)
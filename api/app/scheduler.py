@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from app.util import logger
+
+
+class StageGraph:
+    """
+    Runs the stages of one request as a DAG: every stage is started at once and only waits for
+    its own dependencies, so independent work (warm-ups, speculative branches) overlaps with the
+    critical path. Stages are coroutines `fn(graph)` and read upstream results from `graph.results`.
+    """
+
+    def __init__(self):
+        self._stages = {}
+        self._tasks = {}
+        self.results = {}
+
+    def add(self, name, fn, deps=()):
+        for dep in deps:
+            if dep not in self._stages:
+                raise ValueError(f"Stage {name} depends on unknown stage {dep}")
+        self._stages[name] = (fn, tuple(deps))
+
+    async def _run_stage(self, name):
+        fn, deps = self._stages[name]
+        for dep in deps:
+            await self._tasks[dep]
+        started_at = time.perf_counter()
+        result = await fn(self)
+        self.results[name] = result
+        logger.info('[StageGraph] - %s done in %.3fs', name, time.perf_counter() - started_at)
+        return result
+
+    async def speculation(self, name):
+        """
+        Result of a speculative stage, or None when it failed or was cancelled. Never raises.
+        """
+        task = self._tasks[name]
+        await asyncio.wait([task])
+        if task.cancelled() or task.exception() is not None:
+            return None
+        return task.result()
+
+    def cancel(self, name):
+        """
+        Cancel a stage whose result is no longer needed, e.g. a speculative branch that guessed wrong.
+        """
+        task = self._tasks.get(name)
+        if task is not None and not task.done():
+            logger.info('[StageGraph] - Cancelling %s', name)
+            task.cancel()
+
+    async def run(self, target):
+        """
+        Start every stage and return the result of `target`. Stages still running once it is known are cancelled.
+        """
+        self._tasks = {name: asyncio.create_task(self._run_stage(name)) for name in self._stages}
+        try:
+            return await self._tasks[target]
+        finally:
+            pending = [task for task in self._tasks.values() if not task.done()]
+            for task in pending:
+                task.cancel()
+            # Also retrieves the exceptions of stages nobody awaited
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
@@ -5,6 +5,11 @@ from fastapi import UploadFile, File, Form
 class Chat(BaseModel):
     content: Optional[str]
     file: Optional[UploadFile] = File(None)
+    # Per-request overrides of the shared pipeline settings
+    model: Optional[str] = None
+    temperature: Optional[float] = None
+    # Edits of the same spec share a lineage, its previous page is patched instead of regenerated
+    lineage: Optional[str] = None
 
 # === Task Analyzer Agent ===
 
@@ -175,3 +180,11 @@ class UIAgentOutput(BaseModel):
     html: str
     css: str
     js: str
+
+    def page(self):
+        """
+        The single HTML document to publish, with the css and js parts inlined.
+        """
+        if not self.css and not self.js:
+            return self.html
+        return f"{self.html}\n<style>{self.css}</style>\n<script>{self.js}</script>"
@@ -0,0 +1,185 @@
+import re
+from html.parser import HTMLParser
+
+from app.schema import UIAgentOutput
+
+_URL = re.compile(r"https?://[^\s\"'<>`)\]}]+")
+_ID_REFERENCE = re.compile(r"""getElementById\(\s*["']([\w-]+)["']\s*\)|querySelector(?:All)?\(\s*["']#([\w-]+)["']\s*\)""")
+_VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr",
+}
+# Closing tags browsers infer, their absence is not an error
+_OPTIONAL_END_TAGS = {"p", "li", "td", "th", "tr", "thead", "tbody", "tfoot", "option", "dt", "dd", "colgroup"}
+_BRACKETS = {")": "(", "]": "[", "}": "{"}
+
+
+def required_urls(*texts):
+    """
+    API URLs spelled out in the requirements (or the plan), trailing punctuation removed.
+    """
+    urls = []
+    for text in texts:
+        for url in _URL.findall(text or ""):
+            url = url.rstrip(".,;:")
+            if url not in urls:
+                urls.append(url)
+    return urls
+
+
+class _PageParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.ids = set()
+        self.scripts = []
+        self.errors = []
+        self._stack = []
+        self._in_script = False
+
+    def handle_starttag(self, tag, attrs):
+        for name, value in attrs:
+            if name == "id" and value:
+                self.ids.add(value)
+        if tag == "script":
+            self._in_script = True
+            self.scripts.append("")
+        if tag not in _VOID_TAGS:
+            self._stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        for name, value in attrs:
+            if name == "id" and value:
+                self.ids.add(value)
+
+    def handle_endtag(self, tag):
+        if tag == "script":
+            self._in_script = False
+        if tag in _VOID_TAGS:
+            return
+        if tag not in self._stack:
+            self.errors.append(f"unexpected </{tag}>")
+            return
+        while self._stack:
+            open_tag = self._stack.pop()
+            if open_tag == tag:
+                break
+            if open_tag not in _OPTIONAL_END_TAGS:
+                self.errors.append(f"<{open_tag}> is not closed")
+
+    def handle_data(self, data):
+        if self._in_script:
+            self.scripts[-1] += data
+
+    def close(self):
+        super().close()
+        for tag in self._stack:
+            if tag not in _OPTIONAL_END_TAGS | {"html", "body", "head"}:
+                self.errors.append(f"<{tag}> is not closed")
+
+
+def js_syntax_errors(source):
+    """
+    Cheap JS sanity check without a JS engine: brackets must balance outside of strings,
+    template literals, comments and regex literals. Catches the truncated or mangled
+    scripts LLMs produce, not every syntax error.
+    """
+    stack = []
+    i = 0
+    n = len(source)
+    previous = ""
+    while i < n:
+        char = source[i]
+        if char in "\"'`":
+            quote = char
+            i += 1
+            while i < n and source[i] != quote:
+                if source[i] == "\\":
+                    i += 1
+                elif quote != "`" and source[i] == "\n":
+                    return [f"unterminated string at offset {i}"]
+                i += 1
+            if i >= n:
+                return ["unterminated string"]
+        elif source.startswith("//", i):
+            end = source.find("\n", i)
+            i = n if end < 0 else end
+            continue
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            if end < 0:
+                return ["unterminated comment"]
+            i = end + 2
+            continue
+        elif char == "/" and (not previous or previous in "(,=:[!&|?{};+-*%<>~^"):
+            # A slash where an operand is expected starts a regex literal
+            i += 1
+            in_class = False
+            while i < n and (source[i] != "/" or in_class):
+                if source[i] == "\\":
+                    i += 1
+                elif source[i] == "[":
+                    in_class = True
+                elif source[i] == "]":
+                    in_class = False
+                elif source[i] == "\n":
+                    return [f"unterminated regex at offset {i}"]
+                i += 1
+        elif char in "([{":
+            stack.append(char)
+        elif char in ")]}":
+            if not stack or stack.pop() != _BRACKETS[char]:
+                return [f"unbalanced '{char}' at offset {i}"]
+        if not char.isspace():
+            previous = char
+        i += 1
+    if stack:
+        return [f"'{stack[-1]}' is not closed"]
+    return []
+
+
+class CandidateScore:
+    """
+    Result of the local checks on one builder candidate. `passed` means no check failed.
+    """
+
+    def __init__(self, issues, checks):
+        self.issues = issues
+        self.checks = checks
+
+    @property
+    def passed(self):
+        return not self.issues
+
+    @property
+    def score(self):
+        return self.checks - len(self.issues)
+
+    def __repr__(self):
+        return f"CandidateScore(score={self.score}, issues={self.issues})"
+
+
+def score_candidate(code: UIAgentOutput, urls=()):
+    """
+    Check a builder candidate without calling any model: the HTML parses, the scripts have balanced
+    syntax, every required API URL is used and every element id the scripts look up exists.
+    """
+    page = code.page()
+    parser = _PageParser()
+    issues = []
+    try:
+        parser.feed(page)
+        parser.close()
+    except Exception as e:
+        issues.append(f"HTML does not parse: {e}")
+    issues.extend(f"HTML: {error}" for error in parser.errors[:5])
+    scripts = "\n".join(parser.scripts)
+    if not scripts.strip():
+        issues.append("no script")
+    for index, script in enumerate(parser.scripts):
+        issues.extend(f"script {index}: {error}" for error in js_syntax_errors(script))
+    for url in urls:
+        if url not in page:
+            issues.append(f"API URL {url} is missing")
+    referenced = {match.group(1) or match.group(2) for match in _ID_REFERENCE.finditer(scripts)}
+    for element_id in sorted(referenced - parser.ids):
+        issues.append(f"element #{element_id} does not exist")
+    return CandidateScore(issues, checks=4 + len(urls))
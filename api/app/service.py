@@ -0,0 +1,358 @@
+import asyncio
+import json
+import uuid
+
+import yaml
+
+from app.cache import make_cache_key, result_cache
+from app.clients import client_registry
+from app.compaction import compact_json
+from app.config import (
+    INCREMENTAL_REGENERATION,
+    MODEL_NAME,
+    SPEC_INDEX_REUSE,
+    SPECULATIVE_PLANNER,
+    TEMPLATE_FAST_PATH,
+)
+from app.constant import AgentTask
+from app.incremental import IncrementalJSONObject
+from app.ingest import read_chunks, summarize_upload
+from app.lineage import lineage_analysis, lineage_key, lineage_store, plan_patch, spec_title
+from app.metrics import stage_cache, stage_timer
+from app.pipeline import _require_json, _require_ui_output
+from app.prompt_registry import prompt_registry
+from app.repair import coerce_model, repair_output
+from app.scheduler import StageGraph
+from app.schema import TaskAnalyzerOutput, UIAgentOutput
+from app.spec_index import adapt_page, display_texts, spec_index
+from app.storage import storage
+from app.templates import TEMPLATES, TemplateError, has_template, load_template, render, template_values
+from app.util import logger
+
+
+async def read_upload(file):
+    """
+    Stream an uploaded task file in chunks, returning a digest of its bytes (for the cache key)
+    and a bounded summary of its content for the Task Analyzer (None when empty).
+    """
+    if file is None:
+        return None, None
+    upload = await read_chunks(file)
+    if not upload.size:
+        return None, None
+    return upload.digest, summarize_upload(upload)
+
+
+async def _report(on_progress, stage, **data):
+    if on_progress is not None:
+        await on_progress(stage, **data)
+
+
+def page_html(final_code):
+    if isinstance(final_code, UIAgentOutput):
+        return final_code.page()
+    if isinstance(final_code, dict):
+        return json.dumps(final_code, ensure_ascii=False, indent=2)
+    return final_code
+
+
+async def publish(cache_key, final_code):
+    """
+    Upload the generated code, remember it in the result cache and return its public URL.
+    """
+    # Generate a unique filename using uuid
+    unique_id = str(uuid.uuid4())
+    html_filename = f"final_code_{unique_id}.html"
+    html = page_html(final_code)
+
+    # Upload the in-memory HTML straight to storage, without a temp file round trip
+    with stage_timer("upload"):
+        url = await storage.upload(f"public/{html_filename}", html.encode("utf-8"), content_type="text/html")
+
+    # Failed generations are returned as {"error": ...} and must not be served again
+    if not (isinstance(final_code, dict) and "error" in final_code):
+        await result_cache.set(cache_key, html, url)
+    return url
+
+
+async def render_from_template(pipeline, problem_type, processed_task):
+    """
+    Render the vetted template of a known problem type from the analyzed task. The LLM is only asked
+    to fill what the analysis is missing (one repair call), None means the full pipeline has to run.
+    """
+    task = await pipeline.repair(AgentTask.TASK_ANALYZER, processed_task)
+    if task is None:
+        return None
+    try:
+        with stage_timer("template"):
+            return render(problem_type, task)
+    except TemplateError as e:
+        logger.warning('[Templates] - Falling back to the full pipeline: %s', e)
+        return None
+
+
+def parse_spec(content):
+    """
+    Read the task.yaml directly: the problem type it declares and, when it already has the analyzer's
+    shape, the validated TaskAnalyzerOutput. Used to guess ahead while the Task Analyzer runs.
+    """
+    try:
+        data = yaml.safe_load(content)
+        problem_type = str(data["task_type"]["type"])
+    except Exception:
+        return None, None
+    try:
+        return problem_type, coerce_model(TaskAnalyzerOutput, data)
+    except ValueError:
+        return problem_type, None
+
+
+def build_stage_graph(pipeline, content, cache_key, on_progress=None, lineage=None):
+    """
+    Express task_analyze -> (template | ui_planner -> ui_builder -> optimize) -> upload as a StageGraph.
+    While the Task Analyzer runs, the problem type is guessed from the YAML: the builder and critic
+    prompts and the template are warmed up, and the likeliest page (or plan) is generated speculatively.
+    Speculative results are only used when the analysis confirms them, otherwise they are cancelled.
+    A near duplicate of an earlier spec (see SpecIndex) reuses its page instead, with the texts swapped,
+    and an edit of a spec of the same lineage patches the previous page of that lineage.
+    """
+    graph = StageGraph()
+    # Pages are only reused between requests with the same settings
+    index_context = (pipeline.model_name, pipeline.temperature, prompt_registry.fingerprint)
+
+    async def spec(graph):
+        return parse_spec(content)
+
+    async def analyze(graph):
+        await _report(on_progress, "task_analyzer")
+        processed_task = await pipeline.task_analyze(content)
+        return processed_task, json.loads(processed_task).get('task_type').get('type')
+
+    async def warm(graph):
+        problem_type, _ = graph.results["spec"]
+        for task in (AgentTask.UI_BUILDER, AgentTask.UI_CRITIC):
+            prompt_registry.system_prompt(task, problem_type)
+        if has_template(problem_type):
+            load_template(TEMPLATES[problem_type])
+
+    async def speculative_page(graph):
+        problem_type, spec_task = graph.results["spec"]
+        if not (TEMPLATE_FAST_PATH and has_template(problem_type) and spec_task):
+            return None
+        return spec_task, render(problem_type, spec_task)
+
+    async def speculative_plan(graph):
+        problem_type, spec_task = graph.results["spec"]
+        if not SPECULATIVE_PLANNER or spec_task is None or (TEMPLATE_FAST_PATH and has_template(problem_type)):
+            return None
+        task_input = compact_json(spec_task.model_dump(mode="json"))
+        return task_input, await pipeline.ui_planner(task_input)
+
+    async def similar(graph):
+        processed_task, _ = graph.results["analyze"]
+        task, _, _ = repair_output(AgentTask.TASK_ANALYZER, processed_task)
+        if task is None or not SPEC_INDEX_REUSE:
+            return task, None
+        match = await asyncio.to_thread(spec_index.lookup, task, index_context)
+        cached = await result_cache.get(match.cache_key) if match is not None else None
+        if cached is None:
+            return task, None
+        page = adapt_page(cached["html"], match.texts, display_texts(task))
+        return task, (match, page, page != cached["html"])
+
+    async def incremental(graph):
+        processed_task, problem_type = graph.results["analyze"]
+        if not INCREMENTAL_REGENERATION or (TEMPLATE_FAST_PATH and has_template(problem_type)):
+            # Templated pages are rendered again for free
+            return None, None
+        task, _, _ = repair_output(AgentTask.TASK_ANALYZER, processed_task)
+        key = lineage_key(lineage or spec_title(content), *index_context) if task is not None else None
+        if key is None:
+            return None, None
+        analysis = lineage_analysis(task)
+        record = await asyncio.to_thread(lineage_store.get, key)
+        patch = plan_patch(record, analysis) if record is not None else None
+        if patch is None or not patch.changes:
+            return key, patch
+        await _report(on_progress, "ui_patch", fields=sorted(patch.changes))
+        api_url = (analysis.get("model_info") or {}).get("api_url")
+        patch.page = await pipeline.patch_page(patch.page, patch.changes, [api_url] if api_url else [])
+        return key, patch if patch.page is not None else None
+
+    async def page(graph):
+        processed_task, problem_type = graph.results["analyze"]
+        guessed_type, _ = graph.results["spec"]
+        _, patch = graph.results["incremental"]
+        if patch is not None:
+            graph.cancel("speculative_page")
+            await _report(on_progress, "incremental", changed=patch.changed)
+            return patch.page
+        _, reuse = graph.results["similar"]
+        if reuse is not None:
+            graph.cancel("speculative_page")
+            await _report(on_progress, "reuse", similarity=round(reuse[0].similarity, 3))
+            return reuse[1]
+        if not (TEMPLATE_FAST_PATH and has_template(problem_type)):
+            graph.cancel("speculative_page")
+            return None
+        speculation = await graph.speculation("speculative_page") if problem_type == guessed_type else None
+        if speculation is not None:
+            spec_task, spec_page = speculation
+            task, _, _ = repair_output(AgentTask.TASK_ANALYZER, processed_task)
+            # The YAML is the source of truth, an analysis that cannot be validated locally does not need repairing
+            if task is None or template_values(task) == template_values(spec_task):
+                logger.info('[Scheduler] - Using the speculative %s page', problem_type)
+                return spec_page
+        return await render_from_template(pipeline, problem_type, processed_task)
+
+    async def plan(graph):
+        processed_task, problem_type = graph.results["analyze"]
+        if graph.results["page"] is not None:
+            graph.cancel("speculative_plan")
+            return None
+        await _report(on_progress, "ui_planner", problem_type=problem_type)
+        speculation = await graph.speculation("speculative_plan")
+        if speculation is not None and speculation[0] == processed_task:
+            logger.info('[Scheduler] - Using the speculative plan')
+            return speculation[1]
+        return await pipeline.ui_planner(processed_task)
+
+    async def build(graph):
+        _, problem_type = graph.results["analyze"]
+        if graph.results["page"] is not None:
+            return graph.results["page"]
+        await _report(on_progress, "ui_builder")
+        return await pipeline.ui_builder(problem_type, graph.results["plan"], optimize=True)
+
+    async def upload(graph):
+        task, reuse = graph.results["similar"]
+        key, patch = graph.results["incremental"]
+        final_code = graph.results["build"]
+        url = None
+        if patch is not None and not patch.changed:
+            # The spec did not change, serve the same page
+            url = patch.record["url"]
+        elif patch is None and reuse is not None and not reuse[2]:
+            # Nothing was adapted, serve the same page
+            url = reuse[0].url
+        if url is not None:
+            await result_cache.set(cache_key, final_code, url)
+        else:
+            await _report(on_progress, "upload", template=graph.results["page"] is not None)
+            url = await publish(cache_key, final_code)
+            if isinstance(final_code, dict) and "error" in final_code:
+                return url
+            if task is not None:
+                await asyncio.to_thread(spec_index.add, task, cache_key, url, index_context)
+        if key is not None:
+            plan = graph.results["plan"] or (patch.plan if patch is not None else None)
+            await asyncio.to_thread(lineage_store.set, key, lineage_analysis(task), plan, page_html(final_code), url)
+        return url
+
+    graph.add("spec", spec)
+    graph.add("analyze", analyze)
+    graph.add("warm", warm, deps=("spec",))
+    graph.add("speculative_page", speculative_page, deps=("spec",))
+    graph.add("speculative_plan", speculative_plan, deps=("spec",))
+    graph.add("similar", similar, deps=("analyze",))
+    graph.add("incremental", incremental, deps=("analyze",))
+    graph.add("page", page, deps=("spec", "analyze", "similar", "incremental"))
+    graph.add("plan", plan, deps=("page",))
+    graph.add("build", build, deps=("plan",))
+    graph.add("upload", upload, deps=("build",))
+    return graph
+
+
+async def generate_ui(content, file_bytes=None, file_content=None, model=None, temperature=None, on_progress=None,
+                      lineage=None):
+    """
+    Run the task_analyze -> ui_planner -> ui_builder -> optimize -> upload chain and return the public URL.
+    `on_progress` is awaited with the name of every stage as it starts. `lineage` names the spec this one
+    is an edit of, by default the model and problem type of the analysis.
+    """
+    model_name = model or MODEL_NAME
+    temperature = 0 if temperature is None else temperature
+    cache_key = make_cache_key(content, file_bytes, model_name=model_name, temperature=temperature)
+    cached = await result_cache.get(cache_key)
+    stage_cache.inc(stage="result", result="hit" if cached is not None else "miss")
+    if cached is not None:
+        await _report(on_progress, "cached", url=cached["url"])
+        return cached["url"]
+
+    pipeline = client_registry.pipeline(model=model_name, temperature=temperature)
+    if file_content:
+        content = f"{content}\n\nFile content:\n{file_content}"
+
+    graph = build_stage_graph(pipeline, content, cache_key, on_progress, lineage=lineage)
+    return await graph.run("upload")
+
+
+async def stream_ui(content, file_bytes=None, file_content=None, model=None, temperature=None):
+    """
+    Streaming variant of generate_ui yielding SSE-ready events: `stage` when a stage starts,
+    `token` for every completion chunk, `field` when a top-level analyzer field is complete,
+    and finally `done` with the public URL.
+    """
+    model_name = model or MODEL_NAME
+    temperature = 0 if temperature is None else temperature
+    cache_key = make_cache_key(content, file_bytes, model_name=model_name, temperature=temperature)
+    cached = await result_cache.get(cache_key)
+    stage_cache.inc(stage="result", result="hit" if cached is not None else "miss")
+    if cached is not None:
+        yield {"event": "done", "data": {"url": cached["url"], "cached": True}}
+        return
+
+    pipeline = client_registry.pipeline(model=model_name, temperature=temperature)
+    if file_content:
+        content = f"{content}\n\nFile content:\n{file_content}"
+
+    yield {"event": "stage", "data": {"stage": AgentTask.TASK_ANALYZER.value}}
+    processed_task = await pipeline.analyze_locally(content)
+    if processed_task is not None:
+        for name, value in json.loads(processed_task).items():
+            yield {"event": "field", "data": {"stage": AgentTask.TASK_ANALYZER.value, "name": name, "value": value}}
+    else:
+        analysis = IncrementalJSONObject()
+        prompt = pipeline.set_prompt(content, task=AgentTask.TASK_ANALYZER)
+        async for delta in pipeline.stream_content(AgentTask.TASK_ANALYZER, prompt, validator=_require_json):
+            yield {"event": "token", "data": {"stage": AgentTask.TASK_ANALYZER.value, "delta": delta}}
+            for name, value in analysis.feed(delta).items():
+                # Only the client gets the fields early, every later stage needs the whole analysis
+                yield {"event": "field", "data": {"stage": AgentTask.TASK_ANALYZER.value, "name": name, "value": value}}
+        processed_task = compact_json(_require_json(analysis.buffer))
+    problem_type = json.loads(processed_task).get('task_type').get('type')
+    if TEMPLATE_FAST_PATH and has_template(problem_type):
+        page = await render_from_template(pipeline, problem_type, processed_task)
+        if page is not None:
+            yield {"event": "stage", "data": {"stage": "upload", "problem_type": problem_type, "template": True}}
+            url = await publish(cache_key, page)
+            yield {"event": "done", "data": {"url": url, "cached": False}}
+            return
+
+    yield {"event": "stage", "data": {"stage": AgentTask.UI_PLANNER.value, "problem_type": problem_type}}
+    prompt = pipeline.set_prompt(processed_task, task=AgentTask.UI_PLANNER)
+    chunks = []
+    async for delta in pipeline.stream_content(AgentTask.UI_PLANNER, prompt, validator=_require_json):
+        chunks.append(delta)
+        yield {"event": "token", "data": {"stage": AgentTask.UI_PLANNER.value, "delta": delta}}
+    plan = compact_json(_require_json("".join(chunks)))
+
+    yield {"event": "stage", "data": {"stage": AgentTask.UI_BUILDER.value}}
+    prompt = pipeline.set_prompt(plan, task=AgentTask.UI_BUILDER)
+    chunks = []
+    async for delta in pipeline.stream_content(AgentTask.UI_BUILDER, prompt, problem_type=problem_type,
+                                               validator=_require_ui_output):
+        chunks.append(delta)
+        yield {"event": "token", "data": {"stage": AgentTask.UI_BUILDER.value, "delta": delta}}
+    # Falls back to the non-streaming builder and its retries when the output cannot be repaired
+    code = await pipeline.repair(AgentTask.UI_BUILDER, "".join(chunks))
+
+    yield {"event": "stage", "data": {"stage": AgentTask.UI_CRITIC.value}}
+    if code is None:
+        final_code = await pipeline.ui_builder(problem_type, plan, optimize=True)
+    else:
+        final_code = await pipeline._optimize_code(plan, code, problem_type)
+
+    yield {"event": "stage", "data": {"stage": "upload"}}
+    url = await publish(cache_key, final_code)
+    yield {"event": "done", "data": {"url": url, "cached": False}}
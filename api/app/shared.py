@@ -0,0 +1,152 @@
+import os
+import sqlite3
+import threading
+import time
+from os.path import dirname
+
+from app.config import REDIS_URL, SHARED_BACKEND, SHARED_SQLITE_PATH
+
+
+class SQLiteBackend:
+    """
+    Shared state for the workers of one host: a key-value table with expiry and append-only
+    streams, in a SQLite database in WAL mode so readers never block the writer.
+    """
+
+    def __init__(self, path=SHARED_SQLITE_PATH):
+        self.path = path
+        if dirname(path):
+            os.makedirs(dirname(path), exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS streams ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, stream TEXT NOT NULL, entry TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS kv_expires_at ON kv (expires_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS streams_stream_id ON streams (stream, id)")
+        conn.commit()
+
+    def _conn(self):
+        # One connection per thread, the log writer and the executor threads use their own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute("SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return row[0]
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)", (key, value, expires_at)
+        )
+        # Expired rows are never read again, nothing else would delete them
+        conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def append(self, stream, entries, maxlen=None):
+        """
+        Append entries to a stream, keeping its last `maxlen` entries.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO streams (stream, entry) VALUES (?, ?)", [(stream, entry) for entry in entries]
+            )
+            if maxlen:
+                # Ids are shared by every stream, so count this stream's own entries
+                conn.execute(
+                    "DELETE FROM streams WHERE id IN "
+                    "(SELECT id FROM streams WHERE stream = ? ORDER BY id DESC LIMIT -1 OFFSET ?)",
+                    (stream, maxlen),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def read(self, stream, after=None, count=500):
+        """
+        Entries of `stream` added after the id `after` (all of them when None), oldest first, as (id, entry).
+        """
+        rows = self._conn().execute(
+            "SELECT id, entry FROM streams WHERE stream = ? AND id > ? ORDER BY id LIMIT ?",
+            (stream, int(after or 0), count),
+        ).fetchall()
+        return [(str(row[0]), row[1]) for row in rows]
+
+    def last_id(self, stream):
+        row = self._conn().execute("SELECT MAX(id) FROM streams WHERE stream = ?", (stream,)).fetchone()
+        return str(row[0]) if row and row[0] is not None else None
+
+
+class RedisBackend:
+    """
+    The same operations on Redis (or anything speaking its protocol), for workers spread over several hosts.
+    Streams map to Redis streams, expiring keys to SET with EX.
+    """
+
+    def __init__(self, url=REDIS_URL):
+        import redis
+
+        self.url = url
+        self.client = redis.Redis.from_url(url, decode_responses=True, protocol=2)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, value, ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def append(self, stream, entries, maxlen=None):
+        pipe = self.client.pipeline(transaction=False)
+        for entry in entries:
+            pipe.xadd(stream, {"entry": entry}, maxlen=maxlen, approximate=True)
+        pipe.execute()
+
+    def read(self, stream, after=None, count=500):
+        start = f"({after}" if after else "-"
+        return [(entry_id, fields["entry"]) for entry_id, fields in self.client.xrange(stream, start, "+", count=count)]
+
+    def last_id(self, stream):
+        entries = self.client.xrevrange(stream, "+", "-", count=1)
+        return entries[0][0] if entries else None
+
+
+SHARED_BACKENDS = {
+    "sqlite": SQLiteBackend,
+    "redis": RedisBackend,
+}
+
+
+def create_shared_backend(backend=SHARED_BACKEND):
+    """
+    The backend shared by every worker, or None in the default single-process ("memory") mode.
+    """
+    if backend == "memory":
+        return None
+    if backend not in SHARED_BACKENDS:
+        raise ValueError(f"Unknown shared backend: {backend}")
+    return SHARED_BACKENDS[backend]()
+
+
+shared_backend = create_shared_backend()
@@ -0,0 +1,279 @@
+import hashlib
+import html
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from os.path import dirname
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from app.config import (
+    SPEC_INDEX_BANDS,
+    SPEC_INDEX_MAX_PER_SIGNATURE,
+    SPEC_INDEX_PATH,
+    SPEC_INDEX_PERMUTATIONS,
+    SPEC_INDEX_SHINGLE_SIZE,
+    SPEC_INDEX_THRESHOLD,
+)
+from app.schema import TaskAnalyzerOutput
+from app.util import logger
+
+_WORD = re.compile(r"\w+")
+_MERSENNE_PRIME = (1 << 61) - 1
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+# Scripts, styles, comments and tags split a page into the text nodes between them
+_SEGMENT = re.compile(r"(<script\b.*?</script\s*>|<style\b.*?</style\s*>|<!--.*?-->|<[^>]*>)", re.IGNORECASE | re.DOTALL)
+_RAW_SEGMENT = re.compile(r"<(script|style|!--)", re.IGNORECASE)
+# Shorter texts ("image", "label") are only swapped when they are a whole text node or attribute value
+_MIN_SWAP_CHARS = 20
+
+
+def canonical_url(url):
+    """
+    Lowercase scheme and host, drop the default port and the trailing slash, sort the query.
+    """
+    parts = urlsplit(str(url).strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path.rstrip("/"), query, ""))
+
+
+def _word(text):
+    return " ".join(_WORD.findall((text or "").lower()))
+
+
+def structural_key(task: TaskAnalyzerOutput, *context):
+    """
+    Hash of what a generated page hard-codes: the API URL, the input and output formats and
+    the problem type, canonicalized so field order, case and spacing do not matter.
+    `context` (model, temperature, prompt fingerprint) keeps pages of other settings apart.
+    """
+    model_info = task.model_info
+    canonical = {
+        "api_url": canonical_url(model_info.api_url),
+        "input_format": {
+            "type": _word(model_info.input_format.type),
+            "structure": {
+                key: [_word(field.type), _word(field.encoding)]
+                for key, field in sorted(model_info.input_format.structure.items())
+            },
+        },
+        "output_format": _word(model_info.output_format.type),
+        "task_type": _word(task.task_type.type),
+        "context": [str(part) for part in context],
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def display_texts(task: TaskAnalyzerOutput):
+    """
+    The free-text fields a page may show verbatim, by name.
+    """
+    texts = {
+        "description": task.task_type.description,
+        "input": task.input_output.input,
+        "output": task.input_output.output,
+        "model_name": task.model_info.name,
+        "visualization": task.visualization.description,
+    }
+    return {name: text for name, text in texts.items() if text}
+
+
+def description_text(task: TaskAnalyzerOutput):
+    model_info = task.model_info
+    texts = list(display_texts(task).values())
+    texts.extend(field.description or "" for field in model_info.input_format.structure.values())
+    texts.append(model_info.output_format.description or "")
+    texts.extend(model_info.output_format.guidance or [])
+    texts.extend(feature.description for feature in task.visualization.features)
+    if task.dataset is not None:
+        texts.append(task.dataset.description)
+    return "\n".join(texts)
+
+
+def shingles(text, size=SPEC_INDEX_SHINGLE_SIZE):
+    """
+    Word `size`-grams of the lowercased text, so rewording a sentence only changes nearby shingles.
+    """
+    words = _WORD.findall((text or "").lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """
+    MinHash signatures: the share of equal slots of two signatures estimates the Jaccard
+    similarity of their shingle sets.
+    """
+
+    def __init__(self, permutations=SPEC_INDEX_PERMUTATIONS, seed=1):
+        rng = random.Random(seed)
+        self.permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(permutations)
+        ]
+
+    def signature(self, items):
+        hashes = [
+            int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big")
+            for item in items
+        ]
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self.permutations]
+
+
+def similarity(left, right):
+    return sum(1 for a, b in zip(left, right) if a == b) / len(left)
+
+
+def _swap_text(text, old, new):
+    """
+    Swap `old` for `new` in a text node: the whole node, or a substring when `old` is long enough
+    not to be part of unrelated words.
+    """
+    for old_form, new_form in ((html.escape(old, quote=False), html.escape(new, quote=False)), (old, new)):
+        if text.strip() == old_form:
+            return text.replace(old_form, new_form)
+        if len(old) >= _MIN_SWAP_CHARS and old_form in text:
+            return text.replace(old_form, new_form)
+    return text
+
+
+def _swap_attributes(tag, old, new):
+    # Only attribute values that are exactly the text (a title, a placeholder), never part of an id or class
+    for old_form, new_form in ((html.escape(old), html.escape(new)), (old, new)):
+        pattern = re.compile(r"""(=\s*)(["'])""" + re.escape(old_form) + r"\2")
+        tag = pattern.sub(lambda match: f"{match.group(1)}{match.group(2)}{new_form}{match.group(2)}", tag)
+    return tag
+
+
+def adapt_page(page, old_texts, new_texts):
+    """
+    Swap the free-text fields that changed where they appear verbatim (HTML-escaped or not) in a page
+    generated for `old_texts`. Only text nodes and whole attribute values are changed, scripts, styles
+    and markup are left alone. Texts the page does not show need no change.
+    """
+    swaps = [(old, new_texts[name]) for name, old in old_texts.items()
+             if old and new_texts.get(name) is not None and new_texts[name] != old]
+    if not swaps:
+        return page
+    parts = []
+    for segment in _SEGMENT.split(page):
+        if not segment or _RAW_SEGMENT.match(segment):
+            parts.append(segment)
+            continue
+        for old, new in swaps:
+            segment = _swap_attributes(segment, old, new) if segment.startswith("<") else _swap_text(segment, old, new)
+        parts.append(segment)
+    return "".join(parts)
+
+
+class SpecMatch:
+    def __init__(self, cache_key, url, similarity, texts):
+        self.cache_key = cache_key
+        self.url = url
+        self.similarity = similarity
+        self.texts = texts
+
+
+class SpecIndex:
+    """
+    Persistent near-duplicate index of the analyzed specs of generated pages. Specs only match when their
+    structural key is equal and the MinHash of their descriptions is at least `threshold` similar.
+    Lookups go through LSH buckets (bands of the signature), so only likely matches are compared.
+    """
+
+    def __init__(self, path=SPEC_INDEX_PATH, threshold=SPEC_INDEX_THRESHOLD, permutations=SPEC_INDEX_PERMUTATIONS,
+                 bands=SPEC_INDEX_BANDS, max_per_signature=SPEC_INDEX_MAX_PER_SIGNATURE):
+        if permutations % bands:
+            raise ValueError("SPEC_INDEX_PERMUTATIONS must be a multiple of SPEC_INDEX_BANDS")
+        self.path = path
+        self.threshold = threshold
+        self.bands = bands
+        self.max_per_signature = max_per_signature
+        self.hasher = MinHasher(permutations)
+        if dirname(path):
+            os.makedirs(dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS specs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, structural_key TEXT NOT NULL, minhash TEXT NOT NULL, "
+            "cache_key TEXT NOT NULL UNIQUE, url TEXT NOT NULL, texts TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS specs_structural_key ON specs (structural_key)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spec_buckets (bucket TEXT NOT NULL, spec_id INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS spec_buckets_bucket ON spec_buckets (bucket)")
+        self._conn.commit()
+
+    def _buckets(self, key, signature):
+        rows = len(signature) // self.bands
+        return [
+            hashlib.sha1(f"{key}:{band}:{signature[band * rows:(band + 1) * rows]}".encode("utf-8")).hexdigest()
+            for band in range(self.bands)
+        ]
+
+    def _signature(self, task):
+        return self.hasher.signature(shingles(description_text(task)))
+
+    def add(self, task: TaskAnalyzerOutput, cache_key, url, context=()):
+        key = structural_key(task, *context)
+        signature = self._signature(task)
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM spec_buckets WHERE spec_id IN (SELECT id FROM specs WHERE cache_key = ?)", (cache_key,)
+            )
+            cursor = self._conn.execute(
+                "INSERT OR REPLACE INTO specs (structural_key, minhash, cache_key, url, texts, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(signature), cache_key, url, json.dumps(display_texts(task)), time.time()),
+            )
+            spec_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO spec_buckets (bucket, spec_id) VALUES (?, ?)",
+                [(bucket, spec_id) for bucket in self._buckets(key, signature)],
+            )
+            # Keep the newest entries of a structural key, older pages are rarely the best match
+            stale = [row[0] for row in self._conn.execute(
+                "SELECT id FROM specs WHERE structural_key = ? ORDER BY id DESC LIMIT -1 OFFSET ?",
+                (key, self.max_per_signature),
+            )]
+            if stale:
+                marks = ",".join("?" * len(stale))
+                self._conn.execute(f"DELETE FROM specs WHERE id IN ({marks})", stale)
+                self._conn.execute(f"DELETE FROM spec_buckets WHERE spec_id IN ({marks})", stale)
+            self._conn.commit()
+
+    def lookup(self, task: TaskAnalyzerOutput, context=()):
+        """
+        The most similar indexed spec at or above the threshold, or None.
+        """
+        key = structural_key(task, *context)
+        signature = self._signature(task)
+        buckets = self._buckets(key, signature)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT specs.cache_key, specs.url, specs.minhash, specs.texts FROM spec_buckets "
+                f"JOIN specs ON specs.id = spec_buckets.spec_id WHERE bucket IN ({','.join('?' * len(buckets))}) "
+                "AND specs.structural_key = ?",
+                (*buckets, key),
+            ).fetchall()
+        best = None
+        for cache_key, url, minhash, texts in rows:
+            score = similarity(signature, json.loads(minhash))
+            if score >= self.threshold and (best is None or score > best.similarity):
+                best = SpecMatch(cache_key, url, score, json.loads(texts))
+        if best is not None:
+            logger.info('[SpecIndex] - Near duplicate of %s (similarity %.2f)', best.cache_key, best.similarity)
+        return best
+
+
+spec_index = SpecIndex()
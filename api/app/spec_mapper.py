@@ -0,0 +1,204 @@
+import copy
+import re
+
+import yaml
+from pydantic import ValidationError
+
+from app.constant import ProblemTask
+from app.prompt_registry import prompt_registry
+from app.repair import coerce_model
+from app.schema import TaskAnalyzerOutput
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+# The libyaml loader is about ten times faster when PyYAML was built with it
+_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Accepted spellings of each key, after lowercasing and turning separators into "_"
+_TOP_LEVEL = {
+    "task_type": ("task_type", "task", "problem", "problem_type"),
+    "input_output": ("input_output", "io", "inputs_outputs"),
+    "model_info": ("model_info", "model", "model_information"),
+    "visualization": ("visualization", "visualisation", "ui"),
+    "dataset": ("dataset", "data"),
+}
+# Top-level keys that carry nothing the analysis needs
+_IGNORED = ("title", "name", "version", "metadata", "notes", "author")
+_TASK_TYPE = {"type": ("type", "name"), "description": ("description", "desc", "summary")}
+_INPUT_OUTPUT = {"input": ("input", "inputs"), "output": ("output", "outputs")}
+_MODEL_INFO = {
+    "api_url": ("api_url", "url", "endpoint", "api"),
+    "name": ("name", "model_name", "id", "model"),
+    "input_format": ("input_format", "request", "request_format"),
+    "output_format": ("output_format", "response", "response_format"),
+}
+_INPUT_FORMAT = {"type": ("type",), "structure": ("structure", "fields", "schema")}
+_OUTPUT_FORMAT = {
+    "type": ("type",),
+    "description": ("description",),
+    "post_processing": ("post_processing",),
+    "guidance": ("guidance", "steps"),
+}
+_VISUALIZATION = {"description": ("description",), "features": ("features",)}
+_DATASET = {
+    "data_path": ("data_path", "path"),
+    "description": ("description",),
+    "supported_formats": ("supported_formats", "formats"),
+    "other_data": ("other_data",),
+}
+
+# Free text the LLM may write when the spec leaves it out, everything else has to come from the spec
+FREE_TEXT_FIELDS = (
+    "task_type.description",
+    "input_output.input",
+    "input_output.output",
+    "visualization.description",
+)
+
+
+def _key(name):
+    return _NON_WORD.sub("_", str(name).lower()).strip("_")
+
+
+def _pick(section, aliases, unknown=None):
+    """
+    Rename the keys of `section` to their canonical names. Keys matching no alias are listed in `unknown`.
+    """
+    if not isinstance(section, dict):
+        return {}
+    lookup = {alias: name for name, names in aliases.items() for alias in names}
+    picked = {}
+    for key, value in section.items():
+        name = lookup.get(_key(key))
+        if name is None:
+            if unknown is not None:
+                unknown.append(key)
+            continue
+        picked.setdefault(name, value)
+    return picked
+
+
+def _as_list(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(",") if part.strip()]
+    return value if isinstance(value, list) else [value]
+
+
+def _has_text(data, path):
+    section, field = path.split(".")
+    value = data[section].get(field)
+    return isinstance(value, str) and bool(value.strip())
+
+
+def normalize_problem_type(value):
+    """
+    The registered problem type `value` names, ignoring case and punctuation, or None when unknown.
+    """
+    known = {member.value for member in ProblemTask} | set(prompt_registry.problem_types())
+    wanted = _key(value)
+    for problem_type in known:
+        if _key(problem_type) == wanted:
+            return problem_type
+    return None
+
+
+class SpecMapping:
+    """
+    A task.yaml mapped onto the TaskAnalyzerOutput shape. `missing` lists the free-text fields
+    the spec does not provide, they need the LLM before the data validates.
+    """
+
+    def __init__(self, data, missing, problem_type):
+        self.data = data
+        self.missing = missing
+        self.problem_type = problem_type
+
+    def fill(self, values):
+        """
+        Set missing free-text fields from `values` (dotted path -> text) and return the validated
+        TaskAnalyzerOutput. Only Optional fields are left to coercion, raises ValueError when a
+        required field is still missing.
+        """
+        data = copy.deepcopy(self.data)
+        for path in self.missing:
+            value = values.get(path)
+            section, field = path.split(".")
+            data.setdefault(section, {})[field] = value if isinstance(value, str) else ""
+        try:
+            return coerce_model(TaskAnalyzerOutput, data)
+        except ValidationError as e:
+            raise ValueError(str(e)) from e
+
+
+def map_spec(content):
+    """
+    Map a well-formed task.yaml onto the TaskAnalyzerOutput shape without calling any model.
+    Returns None when the spec is not YAML, declares an unknown problem type, lacks the model's
+    API details, has keys the mapping does not know at any level or leaves out a required field
+    other than the free text: the Task Analyzer reads those.
+    """
+    try:
+        spec = yaml.load(content, Loader=_LOADER)
+    except yaml.YAMLError:
+        return None
+    if not isinstance(spec, dict):
+        return None
+    unknown = []
+    top = _pick(spec, {**_TOP_LEVEL, "input": ("input", "inputs"), "output": ("output", "outputs"),
+                       "description": ("description",), "ignored": _IGNORED}, unknown)
+    if unknown:
+        return None
+
+    task_type = top.get("task_type")
+    task_type = _pick({"type": task_type} if isinstance(task_type, str) else task_type, _TASK_TYPE, unknown)
+    problem_type = normalize_problem_type(task_type.get("type") or "")
+    if problem_type is None:
+        return None
+    task_type["type"] = problem_type
+    if not task_type.get("description") and isinstance(top.get("description"), str):
+        task_type["description"] = top["description"]
+
+    input_output = _pick(top.get("input_output"), _INPUT_OUTPUT, unknown)
+    for name in ("input", "output"):
+        if name not in input_output and isinstance(top.get(name), str):
+            input_output[name] = top[name]
+
+    model_info = _pick(top.get("model_info"), _MODEL_INFO, unknown)
+    input_format = _pick(model_info.get("input_format"), _INPUT_FORMAT, unknown)
+    structure = input_format.get("structure")
+    if not model_info.get("api_url") or not model_info.get("name") or not isinstance(structure, dict) or not structure:
+        return None
+    input_format["structure"] = {
+        key: {"type": field} if isinstance(field, str) else field for key, field in structure.items()
+    }
+    output_format = _pick(model_info.get("output_format"), _OUTPUT_FORMAT, unknown)
+    output_format["guidance"] = _as_list(output_format.get("guidance"))
+    model_info.update(input_format=input_format, output_format=output_format)
+
+    visualization = _pick(top.get("visualization"), _VISUALIZATION, unknown)
+    visualization.setdefault("features", [])
+
+    dataset = top.get("dataset")
+    if dataset is not None:
+        dataset = _pick(dataset, _DATASET, unknown)
+        dataset["supported_formats"] = _as_list(dataset.get("supported_formats")) or []
+    if unknown:
+        # Keys like model_info.headers or dataset.label_mapping carry information the mapping would drop
+        return None
+
+    data = {
+        "task_type": task_type,
+        "input_output": input_output,
+        "model_info": model_info,
+        "visualization": visualization,
+        "dataset": dataset,
+    }
+    missing = [path for path in FREE_TEXT_FIELDS if not _has_text(data, path)]
+    mapping = SpecMapping(data, missing, problem_type)
+    try:
+        # Anything but the free text has to validate as is
+        mapping.fill({path: "-" for path in missing})
+    except ValueError:
+        return None
+    return mapping
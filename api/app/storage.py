@@ -0,0 +1,121 @@
+import asyncio
+import os
+import random
+from os.path import dirname, join
+
+import aiofiles
+import httpx
+
+from app.config import (
+    STORAGE_BACKEND,
+    STORAGE_BUCKET,
+    STORAGE_LOCAL_DIR,
+    STORAGE_MAX_RETRIES,
+    STORAGE_PUBLIC_BASE_URL,
+    STORAGE_RETRY_BACKOFF,
+    SUPABASE_KEY,
+    SUPABASE_URL,
+)
+from app.util import logger
+
+
+class StorageError(Exception):
+    """
+    Raised when an artifact cannot be stored after all retries.
+    """
+
+
+class SupabaseStorage:
+    """
+    Uploads artifacts to a Supabase Storage bucket through its REST API on a pooled async client,
+    sending the in-memory bytes directly and retrying transient failures with backoff.
+    """
+
+    def __init__(self, url=SUPABASE_URL, key=SUPABASE_KEY, bucket=STORAGE_BUCKET,
+                 max_retries=STORAGE_MAX_RETRIES, backoff=STORAGE_RETRY_BACKOFF):
+        if not url or not key:
+            raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set to use the supabase storage backend.")
+        self.url = url.rstrip("/")
+        self.key = key
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.url}/storage/v1",
+                headers={"Authorization": f"Bearer {self.key}", "apikey": self.key},
+                timeout=30.0,
+            )
+        return self._client
+
+    def public_url(self, path):
+        return f"{self.url}/storage/v1/object/public/{self.bucket}/{path}"
+
+    async def upload(self, path, data, content_type="text/html"):
+        client = self._get_client()
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await client.post(
+                    f"/object/{self.bucket}/{path}",
+                    content=data,
+                    headers={"Content-Type": content_type, "x-upsert": "true"},
+                )
+                if response.status_code < 500 and response.status_code != 429:
+                    response.raise_for_status()
+                    return self.public_url(path)
+                error = StorageError(f"Upload of {path} failed with status {response.status_code}")
+            except httpx.TransportError as e:
+                error = e
+            if attempt == self.max_retries:
+                raise StorageError(f"Upload of {path} failed after {attempt + 1} attempts: {error}")
+            delay = self.backoff * (2 ** attempt) * (1 + random.random())
+            logger.warning('[SupabaseStorage] - Upload of %s failed (%s), retrying in %.2fs', path, error, delay)
+            await asyncio.sleep(delay)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class LocalStorage:
+    """
+    Stores artifacts on the local filesystem, for development and tests without Supabase.
+    The directory is served by the API under STORAGE_PUBLIC_BASE_URL.
+    """
+
+    def __init__(self, directory=STORAGE_LOCAL_DIR, base_url=STORAGE_PUBLIC_BASE_URL):
+        self.directory = directory
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(self.directory, exist_ok=True)
+
+    def public_url(self, path):
+        return f"{self.base_url}/{path}"
+
+    async def upload(self, path, data, content_type="text/html"):
+        target = join(self.directory, path)
+        os.makedirs(dirname(target), exist_ok=True)
+        async with aiofiles.open(target, "wb") as f:
+            await f.write(data)
+        return self.public_url(path)
+
+    async def close(self):
+        return None
+
+
+STORAGE_BACKENDS = {
+    "supabase": SupabaseStorage,
+    "local": LocalStorage,
+}
+
+
+def create_storage(backend=STORAGE_BACKEND):
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    return STORAGE_BACKENDS[backend]()
+
+
+storage = create_storage()
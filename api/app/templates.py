@@ -0,0 +1,97 @@
+import html
+import json
+import re
+from functools import lru_cache
+from os.path import dirname, join
+
+from app.constant import ProblemTask
+from app.schema import TaskAnalyzerOutput
+from app.util import logger
+
+TEMPLATE_DIR = join(dirname(__file__), "templates")
+
+# Vetted templates, rendered without the planner, builder and critic stages
+TEMPLATES = {
+    ProblemTask.TEXT_CLASSIFICATION.value: "text_classification.html",
+    ProblemTask.IMAGE_CLASSIFICATION.value: "image_classification.html",
+}
+
+# Emotion labels named in the text classification requirements
+LABEL_EMOJI = {
+    "anger": "😠",
+    "disgust": "🤢",
+    "fear": "😨",
+    "joy": "😄",
+    "neutral": "😐",
+    "sadness": "😢",
+    "surprise": "😲",
+}
+
+_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class TemplateError(Exception):
+    """
+    Raised when a template cannot be filled from the analyzed task.
+    """
+
+
+@lru_cache(maxsize=None)
+def load_template(name):
+    with open(join(TEMPLATE_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def _json(value):
+    # Safe inside a <script> element
+    return json.dumps(value, ensure_ascii=False).replace("</", "<\\/")
+
+
+def render_template(source, values):
+    """
+    Fill the {{name}} placeholders of `source`. Names ending in _json are inserted as JS literals,
+    everything else is HTML-escaped. A placeholder without a value raises TemplateError.
+    """
+    def replace(match):
+        name = match.group(1)
+        if name not in values:
+            raise TemplateError(f"No value for template placeholder {name}")
+        value = values[name]
+        return _json(value) if name.endswith("_json") else html.escape(str(value))
+    return _PLACEHOLDER.sub(replace, source)
+
+
+def template_values(task: TaskAnalyzerOutput):
+    model_info = task.model_info
+    structure = model_info.input_format.structure
+    if not structure:
+        raise TemplateError("The model input structure has no field")
+    input_key, input_field = next(iter(structure.items()))
+    formats = task.dataset.supported_formats if task.dataset and task.dataset.supported_formats else ["jpg", "jpeg", "png"]
+    return {
+        "title": task.task_type.type,
+        "description": task.task_type.description,
+        "model_name": model_info.name,
+        "input_label": input_field.description or task.input_output.input,
+        "api_url_json": str(model_info.api_url),
+        "input_key_json": input_key,
+        "label_emoji_json": LABEL_EMOJI,
+        "accept": ",".join(f".{fmt.lstrip('.').lower()}" for fmt in formats),
+        "accept_label": ", ".join(fmt.lstrip(".").lower() for fmt in formats),
+    }
+
+
+def has_template(problem_type):
+    return problem_type in TEMPLATES
+
+
+def render(problem_type, task: TaskAnalyzerOutput):
+    """
+    Render the vetted template of `problem_type` for an analyzed task, or return None when there is none.
+    """
+    name = TEMPLATES.get(problem_type)
+    if name is None:
+        return None
+    page = render_template(load_template(name), template_values(task))
+    logger.info('[Templates] - Rendered %s for %s', name, task.model_info.name)
+    return page
@@ -1,22 +1,190 @@
-import os
-from supabase import create_client, Client
 import json
 import logging
 import asyncio
+import os
+import queue
+import threading
+import uuid
+from contextvars import ContextVar
+from os.path import join
+
+from app.broadcast import LogBroadcaster
+from app.config import (
+    LOG_ARTIFACT_DIR,
+    LOG_MAX_CHANNELS,
+    LOG_MAX_PAYLOAD_CHARS,
+    LOG_POLL_INTERVAL,
+    LOG_REPLAY_SIZE,
+    LOG_STREAM_MAXLEN,
+    LOG_SUBSCRIBER_BUFFER,
+)
+from app.shared import shared_backend
+
+log_broadcaster = LogBroadcaster(
+    buffer_size=LOG_SUBSCRIBER_BUFFER,
+    replay_size=LOG_REPLAY_SIZE,
+    max_channels=LOG_MAX_CHANNELS,
+)
+# Channel (request or job id) the current task logs to
+log_channel = ContextVar("log_channel", default=None)
+
+
+class ArtifactStore:
+    """
+    Writes full log payloads to files on a background thread, so truncated log lines
+    can point to the complete prompt or HTML without blocking the caller.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write_loop, name="log-artifacts", daemon=True)
+        self._thread.start()
+
+    def save(self, payload, channel=None):
+        artifact_id = uuid.uuid4().hex
+        path = join(self.directory, channel or "all", f"{artifact_id}.txt")
+        self._queue.put_nowait((path, payload))
+        return path
+
+    def _write_loop(self):
+        while True:
+            path, payload = self._queue.get()
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(payload)
+            except OSError:
+                pass
+
+
+artifact_store = ArtifactStore(LOG_ARTIFACT_DIR) if LOG_ARTIFACT_DIR else None
+
+
+def _summarize(payload, channel=None, limit=LOG_MAX_PAYLOAD_CHARS):
+    """
+    Truncate a large payload, saving the full text to the artifact store when one is configured.
+    """
+    if len(payload) <= limit:
+        return payload
+    summary = f"{payload[:limit]}... [{len(payload) - limit} chars truncated"
+    if artifact_store is not None:
+        summary = f"{summary}, full payload in {artifact_store.save(payload, channel)}"
+    return f"{summary}]"
+
 
-from app.config import SUPABASE_KEY, SUPABASE_URL
+def _summarize_arg(arg, channel=None):
+    """
+    A log argument the replay history can hold: numbers as they are (for %d and %f), anything
+    else as its truncated text, so no page or model output is kept alive until formatting.
+    """
+    if arg is None or isinstance(arg, (bool, int, float)):
+        return arg
+    return _summarize(arg if isinstance(arg, str) else str(arg), channel)
+
+
+class LazyLogEntry:
+    """
+    A log record that is only formatted when a /logs client actually reads it.
+    """
+    __slots__ = ("record", "formatter", "channel", "_text")
+
+    def __init__(self, record, formatter, channel=None):
+        self.record = record
+        self.formatter = formatter
+        self.channel = channel
+        self._text = None
+
+    def __str__(self):
+        if self._text is None:
+            # Arguments are already truncated, this only caps messages that are not %-style
+            self._text = _summarize(self.formatter.format(self.record), self.channel, limit=2 * LOG_MAX_PAYLOAD_CHARS)
+            # Drop the references to the (possibly large) arguments once formatted
+            self.record = None
+        return self._text
+
+
+class SharedLogBus:
+    """
+    Carries log entries between workers through the shared backend. A background thread formats
+    and appends them to one stream in batches, and every worker relays that stream into its own
+    broadcaster, so /logs shows the logs of all workers whichever worker serves it.
+    """
+
+    def __init__(self, backend, stream="logs", maxlen=LOG_STREAM_MAXLEN, poll_interval=LOG_POLL_INTERVAL):
+        self.backend = backend
+        self.stream = stream
+        self.maxlen = maxlen
+        self.poll_interval = poll_interval
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write_loop, name="log-bus", daemon=True)
+        self._thread.start()
+
+    def publish(self, entry, channel=None):
+        self._queue.put_nowait((entry, channel))
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 500:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            entries = [json.dumps({"channel": channel, "text": str(entry)}, ensure_ascii=False)
+                       for entry, channel in batch]
+            try:
+                self.backend.append(self.stream, entries, maxlen=self.maxlen)
+            except Exception:
+                # Logging the failure would only feed the bus again
+                pass
+
+    async def relay(self):
+        """
+        Publish the entries appended by every worker to the local broadcaster, starting from now.
+        """
+        cursor = await asyncio.to_thread(self.backend.last_id, self.stream)
+        while True:
+            try:
+                entries = await asyncio.to_thread(self.backend.read, self.stream, cursor)
+            except Exception:
+                entries = []
+            for entry_id, raw in entries:
+                cursor = entry_id
+                entry = json.loads(raw)
+                log_broadcaster.publish(entry["text"], channel=entry["channel"])
+            if not entries:
+                await asyncio.sleep(self.poll_interval)
+
+
+log_bus = SharedLogBus(shared_backend) if shared_backend is not None else None
 
-log_queue = asyncio.Queue()
 
 class QueueHandler(logging.Handler):
+    """
+    Publishes log records to the broadcaster without formatting them and without creating
+    a task per record. Arguments are turned into truncated text up front so the replay history
+    never holds whole prompts, pages or model outputs. Safe to call from executor threads.
+    With a shared backend, records go to the log bus instead and come back through its relay.
+    """
+
     def emit(self, record):
-        log_entry = self.format(record)
-        asyncio.create_task(log_queue.put(log_entry))
+        try:
+            channel = log_channel.get()
+            if isinstance(record.args, tuple):
+                record.args = tuple(_summarize_arg(arg, channel) for arg in record.args)
+            if not isinstance(record.msg, str):
+                record.msg = _summarize_arg(record.msg, channel)
+            entry = LazyLogEntry(record, self.formatter, channel)
+            if log_bus is not None:
+                log_bus.publish(entry, channel=channel)
+            else:
+                log_broadcaster.publish_threadsafe(entry, channel=channel)
+        except Exception:
+            self.handleError(record)
 
 queue_handler = QueueHandler()
 queue_handler.setFormatter(logging.Formatter('[%(levelname)s] %(message)s'))
 logger = logging.getLogger("app")
 logger.addHandler(queue_handler)
 logger.setLevel(logging.INFO)
-
-supabase: Client = create_client(supabase_key=SUPABASE_KEY, supabase_url=SUPABASE_URL)
\ No newline at end of file
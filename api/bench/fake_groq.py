@@ -0,0 +1,128 @@
+"""
+Local stand-in for the Groq chat completions API, with configurable latency, token rate and error rate.
+
+    python -m bench.fake_groq --port 8090 --latency 0.3 --token-rate 400 --error-rate 0.02
+
+Point the API at it with GROQ_BASE_URL=http://127.0.0.1:8090.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from bench.responses import pick_response
+
+
+def count_tokens(text):
+    # Rough estimate, close enough to pace the fake completions
+    return max(1, len(text) // 4)
+
+
+def create_app(latency=0.3, token_rate=400.0, error_rate=0.0, seed=None):
+    """
+    Build the fake server. `latency` is the time to first token in seconds,
+    `token_rate` the completion tokens per second and `error_rate` the share of
+    requests answered with a 429 or 503.
+    """
+    app = FastAPI()
+    rng = random.Random(seed)
+    app.state.requests = 0
+
+    def usage(prompt_tokens, completion_tokens, elapsed):
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "queue_time": latency / 2,
+            "prompt_time": latency / 2,
+            "completion_time": elapsed - latency,
+            "total_time": elapsed,
+        }
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        app.state.requests += 1
+        body = await request.json()
+        if rng.random() < error_rate:
+            if rng.random() < 0.5:
+                return JSONResponse(
+                    {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}},
+                    status_code=429,
+                    headers={"retry-after": "1"},
+                )
+            return JSONResponse({"error": {"message": "Service unavailable"}}, status_code=503)
+
+        messages = body.get("messages", [])
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        content = pick_response(messages, json_mode)
+        prompt_tokens = sum(count_tokens(m.get("content") or "") for m in messages)
+        completion_tokens = count_tokens(content)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model")
+        started_at = time.perf_counter()
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency + completion_tokens / token_rate)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage(prompt_tokens, completion_tokens, time.perf_counter() - started_at),
+            }
+
+        async def stream():
+            await asyncio.sleep(latency)
+            step = 16
+            for i in range(0, len(content), step):
+                piece = content[i:i + step]
+                await asyncio.sleep(count_tokens(piece) / token_rate)
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            final = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "x_groq": {"usage": usage(prompt_tokens, completion_tokens, time.perf_counter() - started_at)},
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--token-rate", type=float, default=400.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency, args.token_rate, args.error_rate), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Local stand-in for Redis implementing the commands of the shared backend, kept in memory.
+
+    python -m bench.fake_redis --port 6390
+
+Point the API at it with SHARED_BACKEND=redis REDIS_URL=redis://127.0.0.1:6390/0.
+"""
+import argparse
+import asyncio
+import time
+
+
+class FakeRedis:
+    """
+    Strings with expiry and streams, enough for GET, SET [EX], DEL, XADD [MAXLEN [~] n],
+    XRANGE and XREVRANGE [COUNT n]. Any other command is answered with an error.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.streams = {}
+        self._last_ms = 0
+        self._seq = 0
+
+    def _value(self, key):
+        value, expires_at = self.values.get(key, (None, None))
+        if expires_at is not None and expires_at < time.time():
+            del self.values[key]
+            return None
+        return value
+
+    def _next_id(self):
+        now = int(time.time() * 1000)
+        if now <= self._last_ms:
+            self._seq += 1
+        else:
+            self._last_ms, self._seq = now, 0
+        return f"{self._last_ms}-{self._seq}"
+
+    @staticmethod
+    def _id_key(entry_id, default_seq):
+        ms, _, seq = entry_id.partition("-")
+        return int(ms), int(seq) if seq else default_seq
+
+    def _range(self, stream, start, end, count, reverse=False):
+        entries = self.streams.get(stream, [])
+        exclusive_start = start.startswith("(")
+        low = (0, 0) if start == "-" else self._id_key(start.lstrip("("), 0)
+        high = (float("inf"), 0) if end == "+" else self._id_key(end, float("inf"))
+        selected = [
+            (entry_id, fields) for entry_id, fields in entries
+            if (low < self._id_key(entry_id, 0) if exclusive_start else low <= self._id_key(entry_id, 0))
+            and self._id_key(entry_id, 0) <= high
+        ]
+        if reverse:
+            selected.reverse()
+        return selected[:count] if count is not None else selected
+
+    def execute(self, command, args):
+        if command == "PING":
+            return "+PONG"
+        if command in ("CLIENT", "SELECT"):
+            # Connection setup sent by clients, there is a single database
+            return "+OK"
+        if command == "GET":
+            return self._value(args[0])
+        if command == "SET":
+            ttl = None
+            options = [arg.upper() for arg in args[2:]]
+            if "EX" in options:
+                ttl = int(args[2 + options.index("EX") + 1])
+            self.values[args[0]] = (args[1], time.time() + ttl if ttl else None)
+            return "+OK"
+        if command == "DEL":
+            removed = 0
+            for key in args:
+                removed += self.values.pop(key, None) is not None or self.streams.pop(key, None) is not None
+            return removed
+        if command == "XADD":
+            stream, rest = args[0], list(args[1:])
+            maxlen = None
+            if rest and rest[0].upper() == "MAXLEN":
+                rest.pop(0)
+                if rest[0] in ("~", "="):
+                    rest.pop(0)
+                maxlen = int(rest.pop(0))
+            if rest.pop(0) != "*":
+                return Exception("only auto-generated ids are supported")
+            entry_id = self._next_id()
+            entries = self.streams.setdefault(stream, [])
+            entries.append((entry_id, rest))
+            if maxlen is not None and len(entries) > maxlen:
+                del entries[:len(entries) - maxlen]
+            return entry_id
+        if command in ("XRANGE", "XREVRANGE"):
+            count = None
+            if len(args) >= 5 and args[3].upper() == "COUNT":
+                count = int(args[4])
+            if command == "XRANGE":
+                return self._range(args[0], args[1], args[2], count)
+            return self._range(args[0], args[2], args[1], count, reverse=True)
+        return Exception(f"unknown command '{command}'")
+
+
+def encode(value):
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, Exception):
+        return f"-ERR {value}\r\n".encode()
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, str) and value.startswith("+"):
+        return f"{value}\r\n".encode()
+    if isinstance(value, (list, tuple)):
+        return f"*{len(value)}\r\n".encode() + b"".join(encode(item) for item in value)
+    data = str(value).encode()
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+async def read_command(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # Inline command, e.g. from redis-cli or telnet
+        return line.decode().split()
+    args = []
+    for _ in range(int(line[1:])):
+        length = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(length + 2))[:-2].decode())
+    return args
+
+
+async def serve(host="127.0.0.1", port=6390):
+    store = FakeRedis()
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                args = await read_command(reader)
+                if args is None:
+                    break
+                if not args:
+                    continue
+                writer.write(encode(store.execute(args[0].upper(), args[1:])))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
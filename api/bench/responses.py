@@ -0,0 +1,101 @@
+"""
+Canned completions replayed by the fake Groq server, one set per ProblemTask.
+"""
+import json
+from os.path import dirname, join
+
+import yaml
+
+from app.constant import ProblemTask
+
+SPECS_DIR = join(dirname(__file__), "specs")
+
+SPEC_FILES = {
+    ProblemTask.TEXT_CLASSIFICATION: "text_classification.yaml",
+    ProblemTask.IMAGE_CLASSIFICATION: "image_classification.yaml",
+}
+
+
+def load_spec(problem_type):
+    with open(join(SPECS_DIR, SPEC_FILES[problem_type]), encoding="utf-8") as f:
+        return f.read()
+
+
+def _analysis(problem_type):
+    return json.dumps(yaml.safe_load(load_spec(problem_type)))
+
+
+def _plan(problem_type, api_url, input_id, input_type, output_id):
+    return json.dumps({
+        "title": f"{problem_type.value} playground",
+        "description": f"Try the {problem_type.value.lower()} model.",
+        "task_description": f"{problem_type.value} with a hosted model.",
+        "layout": "responsive_card",
+        "inputs": [{"type": input_type, "label": "Input", "input_id": input_id}],
+        "actions": [{"type": "button", "label": "Predict", "on_click": "predict"}],
+        "api_call": {"url": api_url, "method": "POST"},
+        "outputs": [{"type": "table", "output_id": output_id, "list_display": True}],
+    })
+
+
+def _code(title, api_url, input_tag, payload, output_id):
+    html = (
+        f"<!DOCTYPE html>\n<html>\n<head>\n<title>{title}</title>\n</head>\n<body>\n{input_tag}\n"
+        f"<button id=\"predictButton\" onclick=\"predict()\">Predict</button>\n<div id=\"{output_id}\"></div>\n"
+        f"<script>async function predict() {{ const res = await fetch('{api_url}', {{ method: 'POST', "
+        f"headers: {{ 'Content-Type': 'application/json' }}, body: JSON.stringify({payload}) }}); "
+        f"document.getElementById('{output_id}').innerText = JSON.stringify(await res.json()); }}</script>\n"
+        f"</body>\n</html>"
+    )
+    return json.dumps({"html": html, "css": "body { font-family: Arial; }", "js": ""})
+
+
+RESPONSES = {
+    ProblemTask.TEXT_CLASSIFICATION: {
+        "analysis": _analysis(ProblemTask.TEXT_CLASSIFICATION),
+        "plan": _plan(ProblemTask.TEXT_CLASSIFICATION, "http://34.142.220.207:8000/api/text-classification",
+                      "textInput", "text_input", "results"),
+        "code": _code("Emotion classification", "http://34.142.220.207:8000/api/text-classification",
+                      "<textarea id=\"textInput\"></textarea>",
+                      "{ texts: document.getElementById('textInput').value }", "results"),
+    },
+    ProblemTask.IMAGE_CLASSIFICATION: {
+        "analysis": _analysis(ProblemTask.IMAGE_CLASSIFICATION),
+        "plan": _plan(ProblemTask.IMAGE_CLASSIFICATION, "http://34.142.220.207:8000/api/image-classification",
+                      "imageInput", "file_upload", "results"),
+        "code": _code("Image classification", "http://34.142.220.207:8000/api/image-classification",
+                      "<input type=\"file\" id=\"imageInput\" accept=\"image/*\" />",
+                      "{ data: window.imageBase64 }", "results"),
+    },
+}
+
+
+def pick_response(messages, json_mode):
+    """
+    Choose the canned completion for a chat request from its system prompt and problem type.
+    """
+    system = next((m["content"] for m in messages if m["role"] == "system"), "")
+    text = " ".join(m["content"] for m in messages if isinstance(m.get("content"), str))
+    problem_type = ProblemTask.TEXT_CLASSIFICATION
+    if ProblemTask.IMAGE_CLASSIFICATION.value.lower() in text.lower() or "image-classification" in text:
+        problem_type = ProblemTask.IMAGE_CLASSIFICATION
+    responses = RESPONSES[problem_type]
+
+    if "IMPROVED_VARIABLE" in text:
+        # TextGrad optimizer step, which expects the new value between these tags
+        return f"<IMPROVED_VARIABLE>{responses['code']}</IMPROVED_VARIABLE>"
+    if not json_mode:
+        # TextGrad loss and gradient calls
+        return "The code is complete and calls the API asynchronously. Consider clearer error messages."
+    if "Missing fields:" in text:
+        # Free-text fields the spec mapper could not fill
+        fields = text.split("Missing fields:", 1)[1].split("\n", 1)[0]
+        return json.dumps({field.strip(): f"Generated {field.strip()}." for field in fields.split(",")})
+    if "UI Patch" in system:
+        # No edit, the page is served as patched
+        return json.dumps({"edits": []})
+    if "Task Analyzer" in system:
+        return responses["analysis"]
+    if "UI Planner" in system:
+        return responses["plan"]
+    return responses["code"]
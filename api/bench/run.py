@@ -0,0 +1,196 @@
+"""
+Offline /chat benchmark: drives main.app with concurrent clients against the local fake Groq server.
+
+    python -m bench.run --requests 50 --concurrency 10 --spec mixed --output bench_results/latest.json
+
+Add --no-template-fast-path --no-local-mapper to benchmark the full Task Analyzer -> planner -> builder -> critic chain.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+
+import uvicorn
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(values):
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+        "mean": statistics.fmean(values) if values else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def max_rss_kb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def start_fake_groq(args):
+    from bench.fake_groq import create_app
+
+    config = uvicorn.Config(
+        create_app(args.latency, args.token_rate, args.error_rate, seed=args.seed),
+        host="127.0.0.1", port=args.groq_port, log_level="warning",
+    )
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def monitor_loop_lag(samples, stop, interval=0.01):
+    """
+    Measure how late the event loop wakes up from short sleeps.
+    """
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started_at = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - started_at - interval))
+
+
+async def run_benchmark(args):
+    import httpx
+
+    from app.main import app
+    from bench.responses import SPEC_FILES, load_spec
+
+    specs = [load_spec(problem_type) for problem_type in SPEC_FILES]
+    if args.spec == "text":
+        specs = specs[:1]
+    elif args.spec == "image":
+        specs = specs[1:]
+    rng = random.Random(args.seed)
+
+    latencies = []
+    statuses = {}
+    lag_samples = []
+    stop = asyncio.Event()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+            async def one_request(index):
+                content = rng.choice(specs)
+                if args.unique:
+                    # Defeat the result cache so every request runs the pipeline
+                    content = f"{content}\n# request {index}"
+                async with semaphore:
+                    started_at = time.perf_counter()
+                    try:
+                        response = await client.post(f"/{args.endpoint}", json={"content": content})
+                        await response.aread()
+                        status = str(response.status_code)
+                    except Exception as e:
+                        status = type(e).__name__
+                    latencies.append(time.perf_counter() - started_at)
+                    statuses[status] = statuses.get(status, 0) + 1
+
+            lag_task = asyncio.create_task(monitor_loop_lag(lag_samples, stop))
+            rss_before = max_rss_kb()
+            started_at = time.perf_counter()
+            await asyncio.gather(*(one_request(i) for i in range(args.requests)))
+            elapsed = time.perf_counter() - started_at
+            rss_after = max_rss_kb()
+            stop.set()
+            await lag_task
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "config": vars(args),
+        "requests": args.requests,
+        "elapsed_seconds": elapsed,
+        "requests_per_second": args.requests / elapsed if elapsed else None,
+        "statuses": statuses,
+        "latency_seconds": summarize(latencies),
+        "event_loop_lag_seconds": summarize(lag_samples),
+        "max_rss_kb": rss_after,
+        "rss_growth_per_request_kb": (rss_after - rss_before) / args.requests,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--spec", choices=["text", "image", "mixed"], default="mixed")
+    parser.add_argument("--endpoint", choices=["chat", "chat/stream"], default="chat")
+    parser.add_argument("--unique", action=argparse.BooleanOptionalAction, default=True,
+                        help="make every request unique so the result cache is bypassed")
+    parser.add_argument("--template-fast-path", action=argparse.BooleanOptionalAction, default=True,
+                        help="render the bundled specs from templates, --no-template-fast-path runs the planner, "
+                             "builder and critic")
+    parser.add_argument("--local-mapper", action=argparse.BooleanOptionalAction, default=True,
+                        help="map the specs locally, --no-local-mapper calls the Task Analyzer")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--token-rate", type=float, default=400.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--groq-port", type=int, default=8090)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON to this path")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    # Configure the API before it is imported, everything stays local
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{args.groq_port}"
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    os.environ.setdefault("GROQ_MODEL_NAME", "llama-3.1-8b-instant")
+    os.environ["STORAGE_BACKEND"] = "local"
+    os.environ["STORAGE_LOCAL_DIR"] = os.path.join(workdir, "files")
+    os.environ["CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["STAGE_CACHE_PATH"] = os.path.join(workdir, "cache", "stages.sqlite3")
+    os.environ["SPEC_INDEX_PATH"] = os.path.join(workdir, "cache", "spec_index.sqlite3")
+    os.environ["LINEAGE_PATH"] = os.path.join(workdir, "cache", "lineages.sqlite3")
+    # The bundled specs are all templated, the fast paths hide any change to the LLM stages
+    os.environ["TEMPLATE_FAST_PATH"] = str(args.template_fast_path).lower()
+    os.environ["LOCAL_SPEC_MAPPING"] = str(args.local_mapper).lower()
+    if args.unique:
+        # Unique requests differ by a comment only, they would all reuse the first page
+        os.environ["SPEC_INDEX_REUSE"] = "false"
+        os.environ["INCREMENTAL_REGENERATION"] = "false"
+
+    server = start_fake_groq(args)
+    try:
+        results = asyncio.run(run_benchmark(args))
+    finally:
+        server.should_exit = True
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
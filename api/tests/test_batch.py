@@ -0,0 +1,73 @@
+import asyncio
+import io
+import zipfile
+
+import pytest
+
+import app.service
+from app import batch
+from app.batch import BatchTooLarge, read_specs, run_batch
+
+
+def _zip(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, text in entries.items():
+            archive.writestr(name, text)
+    return buffer.getvalue()
+
+
+def test_read_specs_expands_archives():
+    data = _zip({"a/task.yaml": "a: 1", "notes.txt": "skip", "b.yml": "b: 2"})
+    assert read_specs("bundle.zip", data) == [("bundle.zip/a/task.yaml", "a: 1"), ("bundle.zip/b.yml", "b: 2")]
+    assert read_specs("task.yaml", b"c: 3") == [("task.yaml", "c: 3")]
+
+
+def test_read_specs_caps_files_and_archives(monkeypatch):
+    monkeypatch.setattr(batch, "BATCH_MAX_BYTES", 4096)
+    with pytest.raises(BatchTooLarge):
+        read_specs("task.yaml", b"x" * 4097)
+    # Compresses far below the cap but unpacks above it
+    with pytest.raises(BatchTooLarge):
+        read_specs("bomb.zip", _zip({f"{i}.yaml": "x" * 1000 for i in range(5)}))
+
+    monkeypatch.setattr(batch, "UPLOAD_MAX_BYTES", 100)
+    with pytest.raises(BatchTooLarge):
+        read_specs("big.zip", _zip({"task.yaml": "x" * 101}))
+
+    monkeypatch.setattr(batch, "BATCH_MAX_SPECS", 2)
+    with pytest.raises(BatchTooLarge):
+        read_specs("many.zip", _zip({f"{i}.yaml": "a: 1" for i in range(3)}))
+
+
+def test_run_batch_generates_identical_specs_once(monkeypatch):
+    calls = []
+
+    async def generate_ui(content, model=None, temperature=None):
+        calls.append(content)
+        if content == "bad":
+            raise ValueError("invalid spec")
+        return f"https://example.com/{content}"
+
+    monkeypatch.setattr(app.service, "generate_ui", generate_ui)
+
+    async def scenario():
+        specs = [("one", "a"), ("two", "b"), ("three", "a"), ("four", "bad")]
+        return [result async for result in run_batch(specs, model="m", temperature=0)]
+
+    results = {result["name"]: result for result in asyncio.run(scenario())}
+    assert sorted(calls) == ["a", "b", "bad"]
+    assert results["one"] == {"name": "one", "url": "https://example.com/a"}
+    assert results["three"] == {"name": "three", "url": "https://example.com/a", "duplicate_of": "one"}
+    assert results["four"] == {"name": "four", "error": "invalid spec"}
+
+
+def test_run_batch_rejects_too_many_specs(monkeypatch):
+    monkeypatch.setattr(batch, "BATCH_MAX_SPECS", 1)
+
+    async def scenario():
+        async for _ in run_batch([("one", "a"), ("two", "b")]):
+            pass
+
+    with pytest.raises(BatchTooLarge):
+        asyncio.run(scenario())
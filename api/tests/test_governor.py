@@ -0,0 +1,66 @@
+import asyncio
+
+import groq
+import httpx
+import pytest
+
+from app.governor import CircuitOpenError, GroqGovernor
+
+REQUEST = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def _governor():
+    return GroqGovernor(requests_per_minute=0, tokens_per_minute=0, max_concurrency=4, max_retries=0,
+                        breaker_threshold=1, breaker_reset_timeout=0)
+
+
+def _raise(error):
+    async def create():
+        raise error
+    return create
+
+
+async def _ok():
+    return "ok"
+
+
+def test_bad_request_probe_closes_the_breaker():
+    governor = _governor()
+
+    async def scenario():
+        with pytest.raises(groq.APIConnectionError):
+            await governor.call(_raise(groq.APIConnectionError(request=REQUEST)), MESSAGES)
+        assert governor.breaker.state == "half_open"
+        bad_request = groq.BadRequestError("json_validate_failed", response=httpx.Response(400, request=REQUEST),
+                                           body=None)
+        with pytest.raises(groq.BadRequestError):
+            await governor.call(_raise(bad_request), MESSAGES)
+        assert governor.breaker.state == "closed"
+        assert await governor.call(_ok, MESSAGES) == "ok"
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_probe_lets_the_next_call_probe():
+    governor = _governor()
+
+    async def scenario():
+        with pytest.raises(groq.APIConnectionError):
+            await governor.call(_raise(groq.APIConnectionError(request=REQUEST)), MESSAGES)
+
+        async def hang():
+            await asyncio.sleep(3600)
+
+        probe = asyncio.create_task(governor.call(hang, MESSAGES))
+        await asyncio.sleep(0.01)
+        # Only one probe at a time while half open
+        with pytest.raises(CircuitOpenError):
+            await governor.call(_ok, MESSAGES)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        assert await governor.call(_ok, MESSAGES) == "ok"
+        assert governor.breaker.state == "closed"
+
+    asyncio.run(scenario())
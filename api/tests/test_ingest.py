@@ -0,0 +1,73 @@
+import asyncio
+import io
+
+import pytest
+
+from app import ingest
+from app.ingest import Upload, detect_format, read_chunks, summarize_upload, summarize_value
+
+
+class _File:
+    def __init__(self, filename, data):
+        self.filename = filename
+        self._data = io.BytesIO(data)
+
+    async def read(self, size):
+        return self._data.read(size)
+
+
+def _upload(filename, data):
+    upload = Upload(filename)
+    upload.feed(data)
+    return upload
+
+
+def test_read_chunks_keeps_only_the_head(monkeypatch):
+    monkeypatch.setattr(ingest, "UPLOAD_MAX_BYTES", 10)
+    data = b"line\n" * 100
+    upload = asyncio.run(read_chunks(_File("data.csv", data), chunk_size=7))
+    assert bytes(upload.head) == data[:10]
+    assert upload.truncated and upload.size == len(data) and upload.lines == 100
+    assert upload.digest == _upload("data.csv", data).digest
+
+
+@pytest.mark.parametrize("filename, text, expected", [
+    ("task.yml", "a: 1", "yaml"),
+    ("upload", '{"a": 1}', "json"),
+    ("upload", "a,b\n1,2\n3,4\n", "csv"),
+    ("upload", "task_type:\n  type: x\n", "yaml"),
+    ("upload", "just some words", "text"),
+])
+def test_detect_format(filename, text, expected):
+    assert detect_format(filename, text) == expected
+
+
+def test_summarize_value_samples_bulky_parts(monkeypatch):
+    monkeypatch.setattr(ingest, "UPLOAD_SAMPLE_ITEMS", 2)
+    monkeypatch.setattr(ingest, "UPLOAD_MAX_STRING", 5)
+    summary = summarize_value({"labels": list(range(10)), "note": "abcdefgh"})
+    assert summary == {"labels": [0, 1, "... 8 more items"], "note": "abcde... (8 characters)"}
+    mapping = summarize_value({str(i): i for i in range(20)})
+    assert list(mapping) == ["0", "1", "..."] and mapping["..."] == "18 more entries"
+
+
+def test_small_spec_is_kept_whole_without_unused_sections():
+    text = "task_type:\n  type: Text classification\nlabels: [a, b, c, d, e, f, g]\nnotes: internal\n"
+    summary = summarize_upload(_upload("task.yaml", text.encode()))
+    assert summary == "[yaml]\ntask_type:\n  type: Text classification\n"
+
+
+def test_csv_upload_is_sampled(monkeypatch):
+    monkeypatch.setattr(ingest, "UPLOAD_SAMPLE_ITEMS", 2)
+    data = "text,label\n" + "".join(f"row {i},joy\n" for i in range(50))
+    summary = summarize_upload(_upload("data.csv", data.encode()))
+    assert summary.startswith("[csv]\n")
+    assert '"sample_rows": [["row 0", "joy"], ["row 1", "joy"]]' in summary
+    assert '"total_rows": 50' in summary
+
+
+def test_truncated_upload_falls_back_to_its_head(monkeypatch):
+    monkeypatch.setattr(ingest, "UPLOAD_MAX_BYTES", 12)
+    summary = summarize_upload(_upload("data.json", b'{"text": "' + b"x" * 100 + b'"}'))
+    assert summary.startswith("[json (first 12 of")
+    assert summary.endswith('{"text": "xx')
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from app.jobs import JobManager, JobQueueFull, JobStatus
+from app.shared import SQLiteBackend
+
+
+def _manager(**kwargs):
+    return JobManager(backend=None, **kwargs)
+
+
+def test_job_runs_and_records_its_events():
+    async def run(job):
+        job.stage = "build"
+        await job.publish("stage", stage="build")
+        return "https://example.com/page"
+
+    async def scenario():
+        manager = _manager()
+        job = await manager.submit(run)
+        await job.task
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status is JobStatus.SUCCEEDED
+    assert job.result == "https://example.com/page"
+    assert [event["event"] for event in job.events] == ["status", "stage", "status"]
+    assert job.snapshot()["events"][-1]["data"]["status"] == "succeeded"
+
+
+def test_failed_job_keeps_its_error():
+    async def run(job):
+        raise ValueError("no spec")
+
+    async def scenario():
+        manager = _manager()
+        job = await manager.submit(run)
+        await job.task
+        return manager, job
+
+    manager, job = asyncio.run(scenario())
+    assert job.status is JobStatus.FAILED and job.error == "no spec"
+    assert manager.in_flight() == 0
+
+
+def test_full_queue_rejects_or_waits():
+    async def scenario(overflow):
+        done = asyncio.Event()
+
+        async def run(job):
+            await done.wait()
+            return "ok"
+
+        manager = _manager(max_workers=1, max_in_flight=1, overflow=overflow)
+        first = await manager.submit(run)
+        if overflow == "reject":
+            with pytest.raises(JobQueueFull):
+                await manager.submit(run)
+            done.set()
+            await first.task
+            return
+        second = asyncio.create_task(manager.submit(run))
+        await asyncio.sleep(0.01)
+        assert not second.done()
+        done.set()
+        job = await second
+        await job.task
+        assert job.result == "ok" and manager.in_flight() == 0
+
+    asyncio.run(scenario("reject"))
+    asyncio.run(scenario("wait"))
+
+
+def test_cancel_stops_a_running_job():
+    async def scenario():
+        manager = _manager()
+        started = asyncio.Event()
+
+        async def run(job):
+            started.set()
+            await asyncio.sleep(10)
+
+        job = await manager.submit(run)
+        await started.wait()
+        assert manager.cancel(job.id) is job
+        await asyncio.gather(job.task, return_exceptions=True)
+        assert manager.cancel("unknown") is None
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status is JobStatus.CANCELLED and job.finished_at is not None
+
+
+def test_other_worker_reports_and_cancels_a_shared_job(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "shared.db"))
+
+    async def scenario():
+        owner = JobManager(backend=backend, poll_interval=0.01)
+        other = JobManager(backend=backend, poll_interval=0.01)
+        started = asyncio.Event()
+
+        async def run(job):
+            started.set()
+            await asyncio.sleep(10)
+
+        job = await owner.submit(run)
+        await started.wait()
+        snapshot = await other.cancel_anywhere(job.id)
+        assert snapshot["status"] == "running"
+        await asyncio.wait_for(asyncio.gather(job.task, return_exceptions=True), 1)
+        assert (await other.snapshot(job.id))["status"] == "cancelled"
+        assert await other.snapshot("unknown") is None
+        await owner.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,123 @@
+import copy
+
+from app.lineage import (
+    LineageStore,
+    apply_edits,
+    diff_analysis,
+    lineage_key,
+    parse_edits,
+    plan_patch,
+    spec_title,
+)
+
+ANALYSIS = {
+    "task_type": {"type": "Text classification", "description": "Classify the emotion of an English passage."},
+    "input_output": {"input": "A passage", "output": "An emotion"},
+    "model_info": {
+        "api_url": "http://localhost:8000/api/emotions",
+        "name": "emotion-model",
+        "output_format": {"type": "json", "guidance": ["Sort by score"]},
+    },
+}
+PAGE = (
+    '<nav>emotion-model</nav><p class="description">Classify the emotion of an English passage.</p>'
+    '<label for="text_input">A passage</label>'
+    '<script>const apiUrl = "http://localhost:8000/api/emotions";</script>'
+)
+
+
+def _record():
+    return {"analysis": copy.deepcopy(ANALYSIS), "plan": '{"url":"http://localhost:8000/api/emotions"}',
+            "html": PAGE, "url": "http://files/page.html"}
+
+
+def test_diff_analysis_reports_leaf_changes():
+    new = copy.deepcopy(ANALYSIS)
+    new["model_info"]["name"] = "other-model"
+    new["model_info"]["output_format"]["guidance"].append("Show the top emotion")
+    del new["input_output"]["output"]
+    new["dataset"] = {"data_path": "data/"}
+    assert diff_analysis(ANALYSIS, new) == {
+        "dataset.data_path": (None, "data/"),
+        "input_output.output": ("An emotion", None),
+        "model_info.name": ("emotion-model", "other-model"),
+        "model_info.output_format.guidance": (["Sort by score"], ["Sort by score", "Show the top emotion"]),
+    }
+    assert diff_analysis(ANALYSIS, copy.deepcopy(ANALYSIS)) == {}
+
+
+def test_apply_edits_exact_and_whitespace_insensitive():
+    page = "<div>\n    <p class=\"x\">Hello   world</p>\n</div>"
+    assert apply_edits(page, [{"find": "Hello   world", "replace": "Hi"}]) == "<div>\n    <p class=\"x\">Hi</p>\n</div>"
+    assert apply_edits(page, [{"find": "<div>\n<p class=\"x\">Hello world</p>", "replace": "<p>Hi</p>"}]) \
+        == "<p>Hi</p>\n</div>"
+    assert apply_edits(page, []) == page
+
+
+def test_apply_edits_rejects_edits_that_do_not_apply():
+    page = "<p>Hello</p>"
+    assert apply_edits(page, [{"find": "Goodbye", "replace": "Hi"}]) is None
+    assert apply_edits(page, [{"find": "   ", "replace": "Hi"}]) is None
+    assert apply_edits(page, ["not an edit"]) is None
+
+
+def test_parse_edits():
+    assert parse_edits('{"edits": [{"find": "a", "replace": "b"}]}') == [{"find": "a", "replace": "b"}]
+    assert parse_edits('{"edits": []}') == []
+    assert parse_edits('{"edits": "a"}') is None
+    assert parse_edits("not json") is None
+
+
+def test_plan_patch_unchanged_spec_serves_the_same_page():
+    patch = plan_patch(_record(), copy.deepcopy(ANALYSIS))
+    assert not patch.changed and patch.page == PAGE and patch.changes == {}
+
+
+def test_plan_patch_swaps_texts_and_url_locally():
+    new = copy.deepcopy(ANALYSIS)
+    new["task_type"]["description"] = "Detect the feelings expressed in any English text."
+    new["model_info"]["api_url"] = "http://10.0.0.1:9000/api/emotions"
+    patch = plan_patch(_record(), new)
+    assert patch.changed and patch.changes == {}
+    assert "Detect the feelings expressed in any English text." in patch.page
+    assert "http://10.0.0.1:9000/api/emotions" in patch.page and "localhost" not in patch.page
+    assert patch.plan == '{"url":"http://10.0.0.1:9000/api/emotions"}'
+
+
+def test_plan_patch_leaves_other_changes_to_the_patch_call():
+    new = copy.deepcopy(ANALYSIS)
+    new["model_info"]["output_format"]["guidance"] = ["Show the top three"]
+    patch = plan_patch(_record(), new)
+    assert list(patch.changes) == ["model_info.output_format.guidance"]
+
+
+def test_plan_patch_rebuilds_on_type_change_or_too_many_changes():
+    new = copy.deepcopy(ANALYSIS)
+    new["task_type"]["type"] = "Image classification"
+    assert plan_patch(_record(), new) is None
+    new = copy.deepcopy(ANALYSIS)
+    new["extra"] = {f"field{i}": i for i in range(10)}
+    assert plan_patch(_record(), new) is None
+
+
+def test_lineage_key_needs_an_id_or_title():
+    assert lineage_key(None, "model", 0) is None
+    assert lineage_key("", "model", 0) is None
+    assert lineage_key("emotions", "model", 0) == lineage_key("emotions", "model", 0)
+    assert lineage_key("emotions", "model", 0) != lineage_key("emotions", "model", 0.5)
+    assert lineage_key("emotions", "model", 0) != lineage_key("sentiment", "model", 0)
+
+
+def test_spec_title():
+    assert spec_title("title: Emotions\ntask_type: {type: x}") == "Emotions"
+    assert spec_title("Name: Sentiment\n") == "Sentiment"
+    assert spec_title("task_type: {type: x}") is None
+    assert spec_title("- a\n- b") is None
+    assert spec_title("key: [unclosed") is None
+
+
+def test_lineage_store_round_trip(tmp_path):
+    store = LineageStore(str(tmp_path / "lineages.sqlite3"))
+    assert store.get("key") is None
+    store.set("key", ANALYSIS, "plan", PAGE, "http://files/page.html")
+    assert store.get("key") == {"analysis": ANALYSIS, "plan": "plan", "html": PAGE, "url": "http://files/page.html"}
@@ -0,0 +1,39 @@
+import asyncio
+
+from app.memo import SQLiteStageStore, StageMemo, create_stage_store
+
+
+def test_cancelled_caller_does_not_cancel_coalesced_callers():
+    memo = StageMemo(create_stage_store("memory"))
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        first = asyncio.create_task(memo.coalesce("key", work))
+        second = asyncio.create_task(memo.coalesce("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == "done"
+        assert first.cancelled()
+        assert len(calls) == 1
+        assert not memo._inflight
+
+    asyncio.run(scenario())
+
+
+def test_sqlite_store_prunes_expired_and_oldest_outputs(tmp_path):
+    store = SQLiteStageStore(str(tmp_path / "stages.db"), max_entries=2, ttl=60)
+    store.set("old", "stale")
+    store._conn.execute("UPDATE stage_outputs SET created_at = created_at - 120 WHERE key = 'old'")
+    store._conn.commit()
+    assert store.get("old") is None
+
+    for key in ("a", "b", "c"):
+        store.set(key, key.upper())
+    keys = {row[0] for row in store._conn.execute("SELECT key FROM stage_outputs")}
+    assert keys == {"b", "c"}
+    assert store.get("a") is None and store.get("c") == "C"
@@ -0,0 +1,72 @@
+import pytest
+
+from app.constant import AgentTask
+from app.repair import coerce_model, extract_json, repair_output
+from app.schema import TaskAnalyzerOutput, UIAgentOutput
+
+
+def _analysis():
+    return {
+        "task_type": {"type": "Text classification", "description": "Classify emotions."},
+        "input_output": {"input": "A sentence.", "output": "Emotion scores."},
+        "model_info": {
+            "api_url": "http://localhost:8000/api/emotions",
+            "name": "emotion-model",
+            "input_format": {"type": "json", "structure": {"text": {"type": "string"}}},
+            "output_format": {"type": "json"},
+        },
+        "visualization": {"description": "A ranked list.", "features": []},
+    }
+
+
+@pytest.mark.parametrize("model", [UIAgentOutput, TaskAnalyzerOutput])
+@pytest.mark.parametrize("data", [{}, {"error": "Invalid JSON response from the model."}])
+def test_missing_required_fields_are_rejected(model, data):
+    with pytest.raises(ValueError):
+        coerce_model(model, data)
+
+
+def test_null_required_field_is_rejected():
+    with pytest.raises(ValueError):
+        coerce_model(UIAgentOutput, {"html": None, "css": "", "js": ""})
+
+
+def test_missing_optional_fields_are_filled():
+    task = coerce_model(TaskAnalyzerOutput, _analysis())
+    assert task.dataset is None
+    assert task.model_info.output_format.guidance is None
+    assert task.model_info.input_format.structure["text"].encoding is None
+
+
+def test_missing_required_nested_field_is_rejected():
+    data = _analysis()
+    data["dataset"] = {"data_path": "data/", "supported_formats": ["csv"]}
+    with pytest.raises(ValueError):
+        coerce_model(TaskAnalyzerOutput, data)
+
+
+def test_scalars_are_coerced():
+    data = _analysis()
+    data["model_info"]["output_format"]["guidance"] = "Sort by score"
+    data["task_type"]["description"] = {"text": "Classify"}
+    task = coerce_model(TaskAnalyzerOutput, data)
+    assert task.model_info.output_format.guidance == ["Sort by score"]
+    assert task.task_type.description == '{"text": "Classify"}'
+
+
+def test_extract_json_tolerates_fences_prose_and_trailing_commas():
+    assert extract_json('Here it is:\n```json\n{"a": [1, 2,],}\n```') == {"a": [1, 2]}
+    assert extract_json('prefix {"a": "}"} suffix') == {"a": "}"}
+    assert extract_json("no json") is None
+
+
+def test_repair_output_rejects_error_object_for_builder():
+    code, _, errors = repair_output(AgentTask.UI_BUILDER, '{"error": "x"}')
+    assert code is None and errors
+
+
+def test_repair_output_accepts_code_shape_and_raw_html():
+    code, _, _ = repair_output(AgentTask.UI_BUILDER, '{"code": "<!DOCTYPE html><p>hi</p>"}')
+    assert code == UIAgentOutput(html="<!DOCTYPE html><p>hi</p>", css="", js="")
+    code, _, _ = repair_output(AgentTask.UI_BUILDER, "<html><body></body></html>")
+    assert code.html == "<html><body></body></html>"
@@ -0,0 +1,72 @@
+import pytest
+
+from app.schema import UIAgentOutput
+from app.scoring import js_syntax_errors, required_urls, score_candidate
+
+API_URL = "http://localhost:8000/api/emotions"
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>Emotions</title></head>
+<body>
+<p>Type a passage
+<textarea id="text"></textarea><br>
+<button id="run">Classify</button>
+<ul id="results"></ul>
+</body></html>"""
+
+SCRIPT = """
+document.getElementById('run').addEventListener('click', async () => {
+  const text = document.getElementById("text").value.replace(/\\s+/g, ' ');
+  const response = await fetch(`%s`, {method: 'POST', body: JSON.stringify({texts: [text]})});
+  // Sorted by score (highest first)
+  document.querySelector('#results').innerHTML = (await response.json()).map(r => `<li>${r.label}</li>`).join('');
+});
+""" % API_URL
+
+
+def test_required_urls_strips_punctuation_and_duplicates():
+    text = f"Call {API_URL}. Then call {API_URL}, or (https://example.com/b);"
+    assert required_urls(text, None) == [API_URL, "https://example.com/b"]
+
+
+@pytest.mark.parametrize("source", [
+    "const a = [1, 2, {b: (3)}];",
+    "const s = 'a ) b'; const t = `x ${y} }`;",
+    "// a comment with ( \nconst r = /[)]\\//g; /* } */",
+    "const half = a / b / (c);",
+])
+def test_js_syntax_errors_accepts_balanced_scripts(source):
+    assert js_syntax_errors(source) == []
+
+
+@pytest.mark.parametrize("source", [
+    "function f() { return [1, 2; }",
+    "const s = 'unterminated\n';",
+    "/* never closed",
+    "if (a) {",
+])
+def test_js_syntax_errors_reports_broken_scripts(source):
+    assert js_syntax_errors(source)
+
+
+def test_score_candidate_passes_a_complete_page():
+    score = score_candidate(UIAgentOutput(html=PAGE, css="", js=SCRIPT), urls=[API_URL])
+    assert score.passed, score.issues
+    assert score.score == 5
+
+
+def test_score_candidate_reports_each_failed_check():
+    html = PAGE.replace('<ul id="results"></ul>', "<div><span>")
+    js = SCRIPT.replace(API_URL, "http://localhost:8000/api/other") + "}"
+    score = score_candidate(UIAgentOutput(html=html, css="", js=js), urls=[API_URL])
+    assert not score.passed
+    issues = "\n".join(score.issues)
+    assert "<span> is not closed" in issues or "<div> is not closed" in issues
+    assert "script 0: unbalanced '}'" in issues
+    assert f"API URL {API_URL} is missing" in issues
+    assert "element #results does not exist" in issues
+    assert score.score < 5
+
+
+def test_score_candidate_requires_a_script():
+    assert "no script" in score_candidate(UIAgentOutput(html=PAGE, css="", js="")).issues
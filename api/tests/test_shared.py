@@ -0,0 +1,24 @@
+import time
+
+from app.shared import SQLiteBackend
+
+
+def test_set_purges_expired_keys(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "shared.db"))
+    backend.set("short", "1", ttl=0.01)
+    backend.set("forever", "2")
+    time.sleep(0.02)
+    assert backend.get("short") is None
+    backend.set("other", "3", ttl=60)
+    keys = {row[0] for row in backend._conn().execute("SELECT key FROM kv")}
+    assert keys == {"forever", "other"}
+
+
+def test_append_trims_each_stream_to_maxlen(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "shared.db"))
+    backend.append("a", ["a1", "a2"], maxlen=3)
+    # Entries of another stream must not push "a" out
+    backend.append("b", [f"b{i}" for i in range(10)], maxlen=3)
+    backend.append("a", ["a3", "a4"], maxlen=3)
+    assert [entry for _, entry in backend.read("a")] == ["a2", "a3", "a4"]
+    assert [entry for _, entry in backend.read("b")] == ["b7", "b8", "b9"]
@@ -0,0 +1,114 @@
+import copy
+
+import pytest
+
+from app.repair import coerce_model
+from app.schema import TaskAnalyzerOutput
+from app.spec_index import MinHasher, SpecIndex, adapt_page, canonical_url, shingles, similarity, structural_key
+
+ANALYSIS = {
+    "task_type": {
+        "type": "Text classification",
+        "description": "Classify the emotion expressed in an English text passage into one of seven emotions "
+                       "and show the matching emoji next to the predicted label.",
+    },
+    "input_output": {"input": "A text passage written in English.", "output": "The predicted emotion."},
+    "model_info": {
+        "api_url": "http://localhost:8000/api/emotions",
+        "name": "emotion-model",
+        "input_format": {"type": "json", "structure": {"texts": {"type": "string"}}},
+        "output_format": {"type": "array", "guidance": ["Sort the list by score", "Select the top emotion"]},
+    },
+    "visualization": {"description": "A list of passages with their predicted emotions.", "features": []},
+}
+
+
+def _task(**changes):
+    data = copy.deepcopy(ANALYSIS)
+    for path, value in changes.items():
+        target = data
+        keys = path.split("__")
+        for key in keys[:-1]:
+            target = target[key]
+        target[keys[-1]] = value
+    return coerce_model(TaskAnalyzerOutput, data)
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTP://Example.COM:80/api/", "http://example.com/api"),
+    ("https://example.com:443/a?b=2&a=1", "https://example.com/a?a=1&b=2"),
+    ("http://example.com:8080/a#frag", "http://example.com:8080/a"),
+])
+def test_canonical_url(url, expected):
+    assert canonical_url(url) == expected
+
+
+def test_structural_key_ignores_case_and_url_spelling_but_not_formats():
+    assert structural_key(_task()) == structural_key(_task(model_info__api_url="HTTP://LOCALHOST:8000/api/emotions/"))
+    assert structural_key(_task()) != structural_key(_task(model_info__api_url="http://localhost:8000/api/other"))
+    assert structural_key(_task(), "model-a") != structural_key(_task(), "model-b")
+
+
+def test_minhash_estimates_similarity():
+    hasher = MinHasher(64)
+    text = "classify the emotion of an english passage and show the emoji of the predicted label"
+    same = hasher.signature(shingles(text))
+    assert similarity(same, hasher.signature(shingles(text))) == 1.0
+    assert similarity(same, hasher.signature(shingles("draw a bar chart of the sales per region and month"))) < 0.3
+
+
+def test_index_matches_near_duplicates_only(tmp_path):
+    index = SpecIndex(str(tmp_path / "index.sqlite3"), threshold=0.5, permutations=64, bands=16)
+    index.add(_task(), "first", "http://files/first.html")
+    match = index.lookup(_task(input_output__output="The predicted emotion and its score."))
+    assert match is not None and match.cache_key == "first" and match.url == "http://files/first.html"
+    assert match.texts["output"] == "The predicted emotion."
+    # Another API is another page, however similar the texts
+    assert index.lookup(_task(model_info__api_url="http://localhost:8000/api/other")) is None
+    assert index.lookup(_task(task_type__description="Detect spam in support tickets and route them to a team.",
+                              visualization__description="A table of tickets.",
+                              input_output__input="A ticket.", input_output__output="Spam or not.",
+                              model_info__output_format__guidance=[])) is None
+
+
+def test_index_keeps_the_newest_entries_per_structural_key(tmp_path):
+    index = SpecIndex(str(tmp_path / "index.sqlite3"), threshold=0.5, permutations=64, bands=16, max_per_signature=2)
+    for name in ("a", "b", "c"):
+        index.add(_task(), name, f"http://files/{name}.html")
+    keys = [row[0] for row in index._conn.execute("SELECT cache_key FROM specs ORDER BY id")]
+    assert keys == ["b", "c"]
+
+
+def test_index_rejects_bands_that_do_not_divide_permutations(tmp_path):
+    with pytest.raises(ValueError):
+        SpecIndex(str(tmp_path / "index.sqlite3"), permutations=64, bands=10)
+
+
+def test_adapt_page_swaps_text_nodes_and_whole_attribute_values():
+    page = (
+        '<nav>Model A</nav><p class="description">Classify emotions &amp; tone of any passage.</p>'
+        '<label for="image_input">image</label><input id="image_input" placeholder="image" title="an image file"/>'
+        '<script>if (file.type.startsWith("image/")) {}</script><p>Upload an image here</p>'
+    )
+    adapted = adapt_page(
+        page,
+        {"description": "Classify emotions & tone of any passage.", "input": "image", "model_name": "Model A"},
+        {"description": "Detect feelings & tone.", "input": "photo", "model_name": "Model B"},
+    )
+    assert adapted == (
+        '<nav>Model B</nav><p class="description">Detect feelings &amp; tone.</p>'
+        '<label for="image_input">photo</label><input id="image_input" placeholder="photo" title="an image file"/>'
+        '<script>if (file.type.startsWith("image/")) {}</script><p>Upload an image here</p>'
+    )
+
+
+def test_adapt_page_swaps_long_texts_inside_text_nodes_only():
+    old = "The emotion expressed by the passage"
+    new = "The feeling expressed by the passage"
+    page = f"<p>Output: {old}.</p><style>/* {old} */</style><!-- {old} -->"
+    assert adapt_page(page, {"output": old}, {"output": new}) == f"<p>Output: {new}.</p><style>/* {old} */</style><!-- {old} -->"
+
+
+def test_adapt_page_without_changes_returns_the_page():
+    page = "<p>Same</p>"
+    assert adapt_page(page, {"input": "Same"}, {"input": "Same"}) is page
@@ -0,0 +1,105 @@
+import copy
+from pathlib import Path
+
+import pytest
+import yaml
+
+from app.spec_mapper import map_spec, normalize_problem_type
+
+SPEC = yaml.safe_load((Path(__file__).parent.parent / "bench" / "specs" / "text_classification.yaml").read_text())
+
+
+def _map(spec):
+    return map_spec(yaml.safe_dump(spec, sort_keys=False))
+
+
+def _spec():
+    return copy.deepcopy(SPEC)
+
+
+def test_bundled_spec_maps_without_missing_fields():
+    mapping = _map(_spec())
+    assert mapping is not None and mapping.missing == []
+    task = mapping.fill({})
+    assert task.task_type.type == "Text classification"
+    assert str(task.model_info.api_url) == SPEC["model_info"]["api_url"]
+    assert task.model_info.output_format.guidance == SPEC["model_info"]["output_format"]["guidance"]
+    assert len(task.visualization.features) == 2
+
+
+def test_aliases_case_and_separators():
+    spec = _spec()
+    spec["Task"] = spec.pop("task_type")
+    spec["Task"]["Name"] = "text-classification"
+    spec["model"] = spec.pop("model_info")
+    spec["model"]["Endpoint"] = spec["model"].pop("api_url")
+    spec["model"]["request"] = spec["model"].pop("input_format")
+    spec["model"]["request"]["fields"] = {"texts": "string"}
+    del spec["model"]["request"]["structure"]
+    spec["model"]["response"] = spec["model"].pop("output_format")
+    spec["model"]["response"]["steps"] = "Sort by score, Keep the best"
+    del spec["model"]["response"]["guidance"]
+    spec["data"] = spec.pop("dataset")
+    spec["data"]["formats"] = "txt, csv"
+    del spec["data"]["supported_formats"]
+    task = _map(spec).fill({})
+    assert task.task_type.type == "Text classification"
+    assert task.model_info.input_format.structure["texts"].type == "string"
+    assert task.model_info.output_format.guidance == ["Sort by score", "Keep the best"]
+    assert task.dataset.supported_formats == ["txt", "csv"]
+
+
+def test_normalize_problem_type():
+    assert normalize_problem_type("IMAGE_classification") == "Image classification"
+    assert normalize_problem_type("protein folding") is None
+
+
+def test_missing_free_text_is_filled():
+    spec = _spec()
+    del spec["input_output"]
+    del spec["task_type"]["description"]
+    mapping = _map(spec)
+    assert mapping.missing == ["task_type.description", "input_output.input", "input_output.output"]
+    task = mapping.fill({"task_type.description": "Classify emotions.", "input_output.input": "Text"})
+    assert task.task_type.description == "Classify emotions."
+    assert task.input_output.output == ""
+
+
+@pytest.mark.parametrize("path", [
+    ("extra_section",),
+    ("model_info", "headers"),
+    ("model_info", "auth"),
+    ("model_info", "output_format", "classes"),
+    ("dataset", "label_mapping"),
+    ("task_type", "difficulty"),
+])
+def test_unknown_keys_go_to_the_analyzer(path):
+    spec = _spec()
+    target = spec
+    for key in path[:-1]:
+        target = target[key]
+    target[path[-1]] = {"x": "y"}
+    assert _map(spec) is None
+
+
+@pytest.mark.parametrize("path", [
+    ("task_type", "type"),
+    ("model_info", "api_url"),
+    ("model_info", "name"),
+    ("model_info", "input_format", "structure"),
+    ("model_info", "input_format", "type"),
+    ("dataset", "description"),
+    ("dataset", "data_path"),
+])
+def test_missing_required_fields_go_to_the_analyzer(path):
+    spec = _spec()
+    target = spec
+    for key in path[:-1]:
+        target = target[key]
+    del target[path[-1]]
+    assert _map(spec) is None
+
+
+@pytest.mark.parametrize("content", ["", "- a list", "key: [unclosed", "task_type: {type: Protein folding}"])
+def test_unusable_specs_go_to_the_analyzer(content):
+    assert map_spec(content) is None
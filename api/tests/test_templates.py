@@ -0,0 +1,68 @@
+import copy
+
+import pytest
+
+from app.repair import coerce_model
+from app.schema import TaskAnalyzerOutput, UIAgentOutput
+from app.scoring import score_candidate
+from app.templates import TemplateError, has_template, render, render_template, template_values
+
+ANALYSIS = {
+    "task_type": {"type": "Text classification", "description": "Detect <b>emotions</b> & show an emoji."},
+    "input_output": {"input": "A text passage.", "output": "The predicted emotion."},
+    "model_info": {
+        "api_url": "http://localhost:8000/api/emotions",
+        "name": "emotion-model",
+        "input_format": {"type": "json", "structure": {"texts": {"type": "string", "description": "Passages"}}},
+        "output_format": {"type": "array"},
+    },
+    "visualization": {"description": "A list of passages with their emotions.", "features": []},
+}
+
+
+def _task(problem_type="Text classification", dataset=None, structure=None):
+    data = copy.deepcopy(ANALYSIS)
+    data["task_type"]["type"] = problem_type
+    if dataset is not None:
+        data["dataset"] = dataset
+    if structure is not None:
+        data["model_info"]["input_format"]["structure"] = structure
+    return coerce_model(TaskAnalyzerOutput, data)
+
+
+def test_render_template_escapes_html_and_json():
+    source = "<h1>{{ title }}</h1><script>const v = {{value_json}};</script>"
+    page = render_template(source, {"title": "a < b", "value_json": "</script><script>alert(1)"})
+    assert page == '<h1>a &lt; b</h1><script>const v = "<\\/script><script>alert(1)";</script>'
+
+
+def test_render_template_rejects_missing_values():
+    with pytest.raises(TemplateError):
+        render_template("{{title}} {{missing}}", {"title": "x"})
+
+
+def test_template_values_default_formats_and_first_input_field():
+    values = template_values(_task())
+    assert values["input_key_json"] == "texts"
+    assert values["input_label"] == "Passages"
+    assert values["accept"] == ".jpg,.jpeg,.png"
+
+    task = _task(dataset={"data_path": "data/", "description": "Images", "supported_formats": [".PNG", "webp"]})
+    assert template_values(task)["accept"] == ".png,.webp"
+    with pytest.raises(TemplateError):
+        template_values(_task(structure={}))
+
+
+@pytest.mark.parametrize("problem_type", ["Text classification", "Image classification"])
+def test_rendered_templates_pass_the_local_checks(problem_type):
+    assert has_template(problem_type)
+    page = render(problem_type, _task(problem_type))
+    assert "{{" not in page
+    assert "&lt;b&gt;emotions&lt;/b&gt; &amp; show" in page
+    score = score_candidate(UIAgentOutput(html=page, css="", js=""), urls=["http://localhost:8000/api/emotions"])
+    assert score.passed, score.issues
+
+
+def test_render_without_template():
+    assert not has_template("Audio classification")
+    assert render("Audio classification", _task("Audio classification")) is None
@@ -0,0 +1,38 @@
+import logging
+
+from app.config import LOG_MAX_PAYLOAD_CHARS
+from app.schema import UIAgentOutput
+from app.util import LazyLogEntry, QueueHandler, log_broadcaster
+
+
+def _emit(msg, *args):
+    captured = []
+    original = log_broadcaster.publish_threadsafe
+    log_broadcaster.publish_threadsafe = lambda entry, channel=None: captured.append(entry)
+    try:
+        handler = QueueHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        handler.emit(logging.LogRecord("app", logging.INFO, __file__, 1, msg, args, None))
+    finally:
+        log_broadcaster.publish_threadsafe = original
+    return captured[0]
+
+
+def test_objects_are_truncated_text_at_emit_time():
+    code = UIAgentOutput(html="<p>" + "x" * (3 * LOG_MAX_PAYLOAD_CHARS) + "</p>", css="", js="")
+    entry = _emit("Generated code: %s", code)
+    (arg,) = entry.record.args
+    assert isinstance(arg, str) and "chars truncated" in arg and len(arg) < LOG_MAX_PAYLOAD_CHARS + 100
+    assert str(entry).startswith("Generated code: html=")
+
+
+def test_numbers_keep_their_type():
+    entry = _emit("Step %d took %.2fs, ok=%s, none=%s", 3, 1.5, True, None)
+    assert entry.record.args == (3, 1.5, True, None)
+    assert str(entry) == "Step 3 took 1.50s, ok=True, none=None"
+
+
+def test_non_string_message_is_summarized():
+    entry = _emit({"html": "y" * (3 * LOG_MAX_PAYLOAD_CHARS)})
+    assert isinstance(entry.record.msg, str) and "chars truncated" in entry.record.msg
+    assert isinstance(entry, LazyLogEntry)
@@ -0,0 +1,46 @@
+export type StreamEvent = {
+  event: string;
+  data: any;
+};
+
+// EventSource only supports GET, so POST streams are parsed by hand
+export async function postEventStream(
+  url: string,
+  body: unknown,
+  onEvent: (event: StreamEvent) => void
+) {
+  const response = await fetch(url, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body),
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`Stream request failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const messages = buffer.split(/\r?\n\r?\n/);
+    buffer = messages.pop() ?? "";
+    for (const message of messages) {
+      let event = "message";
+      const data: string[] = [];
+      for (const line of message.split(/\r?\n/)) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data.push(line.slice(5).trimStart());
+      }
+      if (!data.length) continue;
+      const raw = data.join("\n");
+      try {
+        onEvent({ event, data: JSON.parse(raw) });
+      } catch {
+        onEvent({ event, data: raw });
+      }
+    }
+  }
+}
@@ -14,7 +14,7 @@ import {
 } from "@/components/ui/card";
 import { Globe, Paperclip, Send, Loader2 } from "lucide-react";
 import { IconPaperclip, IconX } from "@tabler/icons-react";
-import axios from "axios";
+import { postEventStream } from "@/lib/sse";
 
 // Mock backend logs for demonstration
 const mockLogs = [
@@ -38,8 +38,12 @@ export default function HomePage() {
   const [isProcessing, setIsProcessing] = useState(false);
   const [isFinished, setIsFinished] = useState(false);
   const [currentLogs, setCurrentLogs] = useState<string[]>([]);
+  const [stageOutputs, setStageOutputs] = useState<Record<string, string>>(
+    {}
+  );
   const [iframeLoading, setIframeLoading] = useState(true);
   const [iframeUrl, setIframeUrl] = useState("");
+  const [errorMessage, setErrorMessage] = useState<string | null>(null);
   const logsEndRef = useRef<HTMLDivElement>(null);
 
   useEffect(() => {
@@ -94,27 +98,51 @@ export default function HomePage() {
         setCurrentLogs([]);
         setIframeLoading(true);
         setIframeUrl("");
+        setStageOutputs({});
+        setErrorMessage(null);
 
-        // Simulate API call
+        // Stream stage progress and model output as it is generated
+        let settled = false;
         try {
-          const rs = await axios.post(
-            "http://localhost:8000/api/chat",
+          await postEventStream(
+            "http://localhost:8000/api/chat/stream",
             {
               content: inputValue,
               file: selectedFile,
             },
-            {
-              headers: {
-                "Content-Type": "application/json",
-              },
+            ({ event, data }) => {
+              if (event === "stage") {
+                setCurrentLogs((prev) => [...prev, `▶ ${data.stage}`]);
+              } else if (event === "field") {
+                setCurrentLogs((prev) => [...prev, `✔ ${data.name} ready`]);
+              } else if (event === "token") {
+                setStageOutputs((prev) => ({
+                  ...prev,
+                  [data.stage]: (prev[data.stage] ?? "") + data.delta,
+                }));
+              } else if (event === "done") {
+                settled = true;
+                console.log("Response:", data.url);
+                setIsProcessing(false);
+                setIsFinished(true);
+                setIframeUrl(data.url);
+              } else if (event === "error") {
+                settled = true;
+                console.error("Error:", data.error);
+                setIsProcessing(false);
+                setErrorMessage(data.error || "Generation failed");
+              }
             }
           );
-          console.log("Response:", rs.data.url);
-          setIsProcessing(false);
-          setIsFinished(true);
-          setIframeUrl(rs.data.url); // Replace with your actual URL
+          if (!settled) {
+            throw new Error("The connection closed before the page was ready");
+          }
         } catch (error) {
           console.error("Error:", error);
+          setIsProcessing(false);
+          setErrorMessage(
+            error instanceof Error ? error.message : "Generation failed"
+          );
         }
       }
     },
@@ -124,10 +152,12 @@ export default function HomePage() {
   const resetToInitialState = () => {
     setIsProcessing(false);
     setCurrentLogs([]);
+    setStageOutputs({});
     setIframeLoading(true);
     setIframeUrl("");
     setInputValue("");
     setSelectedFile(null);
+    setErrorMessage(null);
   };
 
   return (
@@ -165,6 +195,15 @@ export default function HomePage() {
               What can I help you power with AI?
             </h1>
 
+            {errorMessage && (
+              <div
+                role="alert"
+                className="mb-4 rounded-lg border border-red-200 bg-red-50 px-4 py-3 text-sm text-red-700"
+              >
+                {errorMessage}
+              </div>
+            )}
+
             {/* Input Section */}
             <form onSubmit={handleSubmit} className="mb-8">
               <div className="relative">
@@ -260,6 +299,14 @@ export default function HomePage() {
                           {log}
                         </div>
                       ))}
+                      {Object.entries(stageOutputs).map(([stage, output]) => (
+                        <div key={stage} className="text-gray-300">
+                          <span className="text-gray-500 mr-2">[{stage}]</span>
+                          <pre className="whitespace-pre-wrap break-all">
+                            {output.slice(-2000)}
+                          </pre>
+                        </div>
+                      ))}
                       {currentLogs.length > 0 && (
                         <div className="flex items-center text-green-400">
                           <span className="text-gray-500 mr-2">